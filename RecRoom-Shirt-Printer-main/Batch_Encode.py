@@ -0,0 +1,250 @@
+"""
+Encodes many images at once, using all CPU cores, without opening any windows.
+Every image is converted into RecRoom colors, encoded and saved as `encoded_<image name>.txt` (one string per line,
+same as `image_data.txt`). A summary of all the images is printed and saved as `summary.json`.
+
+Examples:
+    python Batch_Encode.py shirts/ logo.png "designs/*.png" -o encoded
+    python Batch_Encode.py --watch inbox -o encoded --dither
+    python Batch_Encode.py shirts/ --dither-method blue-noise --dither-strength 0.8
+    python Batch_Encode.py logo.png --palette logo-RGB.txt          (custom colors from Color_Compiler.py)
+"""
+import argparse
+import glob
+import json
+import os
+import signal
+import time
+from concurrent.futures import ProcessPoolExecutor, Future
+from pathlib import Path
+from typing import Dict, Iterable, List, Union
+
+from PIL import Image
+
+import Encoding
+import job_history
+from dithering import METHODS
+from palette import Palette
+from scan_order import ORDERS
+
+
+def ignore_interrupts() -> None:
+    # Worker processes leave Ctrl+C to the main process, which stops them cleanly
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def find_images(patterns: Iterable[str]) -> List[Path]:
+    """
+    Collect all PNG images from files, folders and glob patterns
+
+    :param patterns: Paths to images or folders, or glob patterns
+    :return: Paths of the images, without duplicates
+    """
+    paths: List[Path] = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = sorted(Path(pattern).glob("*.png"))
+        else:
+            matches = [Path(match) for match in sorted(glob.glob(pattern))]
+        paths.extend(path for path in matches if path.suffix.lower() == ".png" and path not in paths)
+    return paths
+
+
+def encode_file(path: Path, output_dir: Path, dither: Union[int, str] = 0, vertical_print: bool = False,
+                split_runs: bool = False, row_delta: bool = False, order: str = None, strength: float = 1.0,
+                run_weight: float = 0.0, target_strings: int = None, palette: Palette = None) -> Dict:
+    """
+    Convert and encode one image and save its strings. Runs in a worker process.
+
+    :param path: The image
+    :param output_dir: Folder for the encoded strings
+    :param dither: 1 to dither the image (Floyd-Steinberg), 0 to use the closest colors,
+        or one of `dithering.METHODS` for ordered dithering
+    :param vertical_print: Encode the image vertically
+    :param split_runs: Split runs so that every string is full, see `Encoding.StringPacker`
+    :param row_delta: Use format v2 and compare it to the classic format, see `Encoding.RunLengthEncoder`
+    :param order: Scan order, one of `scan_order.ORDERS` or "auto"; overrides `vertical_print`
+    :param strength: Strength of ordered dithering, see `dithering.ordered_dither`
+    :param run_weight: Trade color error for fewer strings, see `run_quantizer.RunQuantizer`
+    :param target_strings: Use the smallest run weight that gets the image down to this many strings
+    :param palette: Custom palette, defaults to `Encoding.RR_PALETTE`
+    :return: Summary of the image
+    """
+    time_at_start = time.perf_counter()
+    result: Dict = {"image": str(path)}
+    try:
+        with Image.open(path) as img:
+            img = Encoding.quantize(img, ask_for_dither=False, dither=dither, open_image=False, strength=strength,
+                                    run_weight=run_weight, target_strings=target_strings,
+                                    vertical_print=Encoding.resolve_order(order, vertical_print) == "column",
+                                    palette=palette)
+
+        order = Encoding.resolve_order(order, vertical_print)
+        if order == "auto":
+            # This already runs in a worker process, so the orders are tried one after another
+            order = Encoding.encode_best_order(img, split_runs=split_runs, row_delta=row_delta, parallel=False,
+                                               palette=palette)[0]
+
+        output_path = output_dir / f"encoded_{path.stem}.txt"
+        stats = {}
+        img_data = Encoding.write_image_data(
+            Encoding.iter_encode(img, order=order, split_runs=split_runs, row_delta=row_delta, stats=stats,
+                                 palette=palette),
+            output_path)
+
+        result.update(output=str(output_path), width=img.width, height=img.height, order=order,
+                      strings=len(img_data), list_creates=Encoding.count_lists(len(img_data)), runs=stats["runs"],
+                      chars=stats["chars"],
+                      fill_ratio=round(stats["fill_ratio"], 4))
+        if row_delta:
+            classic_stats = {}
+            for _ in Encoding.iter_encode(img, order=order, split_runs=split_runs, stats=classic_stats,
+                                          palette=palette):
+                pass
+            result["classic_strings"] = classic_stats["strings"]
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+
+    result["seconds"] = round(time.perf_counter() - time_at_start, 3)
+    return result
+
+
+def record_result(result: Dict) -> None:
+    # Save the session in the job history (done in the main process, the workers only encode)
+    if "error" not in result:
+        job_history.record("encode", result["seconds"], pixels=result["width"] * result["height"],
+                           strings=result["strings"], chars=result["chars"], runs=result["runs"],
+                           source=result["image"])
+
+
+def print_result(result: Dict) -> None:
+    if "error" in result:
+        print(f"{result['image']}: FAILED - {result['error']}")
+    else:
+        classic = f" (classic format: {result['classic_strings']})" if "classic_strings" in result else ""
+        print(f"{result['image']}: {result['width']}x{result['height']}, {result['order']} order, "
+              f"{result['strings']} strings{classic}, "
+              f"{result['list_creates']} List Creates, {result['seconds']} sec")
+
+
+def write_summary(results: List[Dict], output_dir: Path) -> None:
+    with open(output_dir / "summary.json", "w", encoding="UTF-8") as summary_file:
+        json.dump(results, summary_file, indent=4)
+
+
+def encode_batch(paths: List[Path], output_dir: Path, workers: int = None, **options) -> List[Dict]:
+    """
+    Encode all the images in parallel
+
+    :param paths: The images
+    :param output_dir: Folder for the encoded strings and the summary
+    :param workers: Number of processes, defaults to the number of CPU cores
+    :param options: Passed to `encode_file`
+    :return: Summary of every image
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    time_at_start = time.perf_counter()
+
+    results: List[Dict] = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=ignore_interrupts) as executor:
+        futures = [executor.submit(encode_file, path, output_dir, **options) for path in paths]
+        for future in futures:
+            results.append(future.result())
+            print_result(results[-1])
+            record_result(results[-1])
+
+    write_summary(results, output_dir)
+    encoded = [result for result in results if "error" not in result]
+    print(f"\nEncoded {len(encoded)}/{len(results)} images into {sum(r['strings'] for r in encoded)} strings "
+          f"in {time.perf_counter() - time_at_start:.1f} sec")
+    return results
+
+
+def watch(folder: Path, output_dir: Path, workers: int = None, interval: float = 2.0, **options) -> None:
+    """
+    Encode every PNG image that appears in `folder` until stopped with Ctrl+C.
+    Images already in the folder are encoded too. An image is only picked up once its size stopped changing,
+    so that half-copied files are skipped.
+
+    :param folder: The folder to watch
+    :param output_dir: Folder for the encoded strings and the summary
+    :param workers: Number of processes, defaults to the number of CPU cores
+    :param interval: Seconds between checks of the folder
+    :param options: Passed to `encode_file`
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    print(f"Watching {folder} for new images. Press Ctrl+C to stop.")
+
+    sizes: Dict[Path, int] = {}  # Size of every new file at the last check
+    done: set = set()
+    pending: List[Future] = []
+    results: List[Dict] = []
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=ignore_interrupts) as executor:
+        try:
+            while True:
+                for path in folder.glob("*.png"):
+                    if path in done:
+                        continue
+                    size = path.stat().st_size
+                    if sizes.get(path) == size:
+                        done.add(path)
+                        pending.append(executor.submit(encode_file, path, output_dir, **options))
+                    sizes[path] = size
+
+                for future in [future for future in pending if future.done()]:
+                    pending.remove(future)
+                    results.append(future.result())
+                    print_result(results[-1])
+                    record_result(results[-1])
+                    write_summary(results, output_dir)
+
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            for future in pending:
+                future.cancel()
+
+
+def main(args: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Encode many images at once.")
+    parser.add_argument("images", nargs="*", help="Images, folders or glob patterns")
+    parser.add_argument("-o", "--output", type=Path, default=Path("encoded"), help="Output folder")
+    parser.add_argument("-w", "--watch", type=Path, help="Keep encoding new images that appear in this folder")
+    parser.add_argument("--interval", type=float, default=2.0, help="Seconds between checks of the watched folder")
+    parser.add_argument("-j", "--workers", type=int, help="Number of processes (default: all CPU cores)")
+    parser.add_argument("--dither", action="store_true", help="Dither the images with Floyd-Steinberg")
+    parser.add_argument("--dither-method", choices=("floyd-steinberg",) + METHODS,
+                        help="Dither the images with this method (implies --dither)")
+    parser.add_argument("--dither-strength", type=float, default=1.0, help="Strength of ordered dithering")
+    parser.add_argument("--vertical", action="store_true", help="Encode vertically (for Ashers printer)")
+    parser.add_argument("--order", choices=ORDERS + ("auto",),
+                        help="Scan order; 'auto' uses the one with the fewest strings (overrides --vertical)")
+    parser.add_argument("--run-weight", type=float, default=0.0,
+                        help="Trade color error (in ΔE) for fewer strings; replaces dithering")
+    parser.add_argument("--target-strings", type=int,
+                        help="Use the smallest run weight that gets every image down to this many strings")
+    parser.add_argument("--palette", type=Palette.load,
+                        help="Encode in custom colors, from a -RGB.txt or -Hex.txt file of Color_Compiler.py")
+    parser.add_argument("--split-runs", action="store_true", help="Fill every string completely")
+    parser.add_argument("--row-delta", action="store_true",
+                        help="Use format v2 (copy pixels from the row above) and compare it to the classic format")
+    args = parser.parse_args(args)
+
+    method = args.dither_method or ("floyd-steinberg" if args.dither else None)
+    dither = {None: 0, "floyd-steinberg": 1}.get(method, method)
+    options = dict(dither=dither, strength=args.dither_strength, run_weight=args.run_weight,
+                   target_strings=args.target_strings, vertical_print=args.vertical, split_runs=args.split_runs,
+                   row_delta=args.row_delta, order=args.order, palette=args.palette)
+
+    if args.watch:
+        watch(args.watch, args.output, workers=args.workers, interval=args.interval, **options)
+        return
+
+    paths = find_images(args.images)
+    if not paths:
+        parser.error("No PNG images found")
+    encode_batch(paths, args.output, workers=args.workers, **options)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+"""
+Benchmarks for converting and encoding images, on a generated set of images:
+    logo - a few flat shapes
+    gradient - smooth color gradients
+    noise - random pixels
+    photo - smooth shapes with some grain, similar to a photo
+    pixelart - a small random sprite scaled up
+
+Every stage records wall time, peak memory (tracemalloc), pixels/sec and, for encoding, runs, strings and how full the
+strings are. Results can be saved as a JSON baseline and later compared against it to find regressions.
+
+`--capture` measures the screen checks of the importers instead: capturing the whole screen against capturing only
+the checked region, and checking the pixels one by one against checking them with NumPy. It runs on the real screen,
+or on a `simulated_backend.SimulatedBackend` if there is no desktop.
+
+`--clipboard` measures copying a full string into the clipboard, with and without reading it back, against the time
+one string takes to import.
+
+Examples:
+    python Benchmark.py --save baseline.json
+    python Benchmark.py --compare baseline.json
+    python Benchmark.py --capture
+    python Benchmark.py --clipboard
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+from PIL import Image
+
+import Encoding
+import job_history
+from backend import Backend, get_backend
+from clipboard import Clipboard, MemoryClipboard, summarize, system_clipboard
+from color_lookup import get_lookup
+from common import color_in_coords, corners_to_box
+
+KINDS = ("logo", "gradient", "noise", "photo", "pixelart")
+SIZES = (128, 256, 512, 1024, 2048)
+REPEAT: int = 3  # The fastest of this many runs is used
+MIN_SECONDS: float = 0.005  # Stages faster than this are too noisy to compare
+CAPTURE_REPEAT: int = 50  # Timed runs of every capture stage
+CLIPBOARD_REPEAT: int = 200  # Copies of every clipboard stage
+
+
+def generate_image(kind: str, size: int, seed: int = 0) -> Image:
+    """
+    :param kind: One of `KINDS`
+    :param size: Width and height
+    :param seed: Seed for the random parts of the image
+    :return: RGB image
+    """
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:size, 0:size] / size
+
+    if kind == "logo":
+        pixels = np.zeros((size, size, 3), dtype=np.uint8)
+        pixels[:] = Encoding.PALETTE_COLORS[rng.integers(len(Encoding.PALETTE_COLORS))]
+        for _ in range(6):
+            cx, cy, r = rng.random(3) * [1, 1, 0.3]
+            pixels[(x - cx) ** 2 + (y - cy) ** 2 < r ** 2] = Encoding.PALETTE_COLORS[
+                rng.integers(len(Encoding.PALETTE_COLORS))]
+        return Image.fromarray(pixels)
+
+    if kind == "gradient":
+        pixels = np.stack((x * 255, y * 255, (1 - x) * 255), axis=-1)
+    elif kind == "noise":
+        pixels = rng.integers(0, 256, (size, size, 3))
+    elif kind == "photo":
+        low_res = rng.integers(0, 256, (8, 8, 3)).astype(np.uint8)
+        smooth = np.asarray(Image.fromarray(low_res).resize((size, size), Image.BICUBIC), dtype=np.float64)
+        pixels = smooth + rng.normal(0, 12, smooth.shape)
+    elif kind == "pixelart":
+        sprite = Encoding.PALETTE_COLORS[rng.integers(0, 8, (32, 32))].astype(np.uint8)
+        return Image.fromarray(sprite).resize((size, size), Image.NEAREST)
+    else:
+        raise ValueError(f"Unknown image kind {kind!r}, use one of {KINDS}")
+
+    return Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+
+
+def measure(function: Callable, pixels: int, repeat: int = REPEAT) -> Dict:
+    """
+    Run `function` `repeat` times for the time, then once more under tracemalloc for the peak memory
+
+    :param function: The stage to measure; if it returns a dict, it's added to the measurements
+    :param pixels: Number of pixels the stage works on
+    :param repeat: Number of timed runs, the fastest one is used
+    :return: Measurements
+    """
+    seconds = float("inf")
+    for _ in range(repeat):
+        time_at_start = time.perf_counter()
+        extra = function()
+        seconds = min(seconds, time.perf_counter() - time_at_start)
+    if not isinstance(extra, dict):
+        extra = {}
+
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {"seconds": round(seconds, 5), "peak_mb": round(peak / 1024 ** 2, 3),
+            "pixels_per_sec": round(pixels / seconds) if seconds else None, **extra}
+
+
+def benchmark_image(img: Image, repeat: int = REPEAT) -> Dict[str, Dict]:
+    """
+    :param img: Image from `generate_image`
+    :param repeat: Number of timed runs of every stage
+    :return: Measurements of every stage
+    """
+    pixels = img.width * img.height
+    quantized = Encoding.quantize(img, ask_for_dither=False, dither=0, open_image=False)
+    lookup = get_lookup(list(Encoding.RR_PALETTE), metric="rgb", bits=6)
+
+    def encode() -> Dict:
+        stats = {}
+        for _ in Encoding.iter_encode(quantized, stats=stats):
+            pass
+        return {"runs": stats["runs"], "strings": stats["strings"], "fill_ratio": round(stats["fill_ratio"], 4)}
+
+    stages = {
+        "quantize": lambda: Encoding.quantize(img, ask_for_dither=False, dither=0, open_image=False),
+        "quantize_dither": lambda: Encoding.quantize(img, ask_for_dither=False, dither=1, open_image=False),
+        "quantize_bayer4": lambda: Encoding.quantize(img, ask_for_dither=False, dither="bayer4", open_image=False),
+        "quantize_blue_noise": lambda: Encoding.quantize(img, ask_for_dither=False, dither="blue-noise",
+                                                         open_image=False),
+        "closest_color": lambda: Encoding.palette_indices(img),
+        "lookup": lambda: lookup.map_image(img),
+        "encode": encode,
+    }
+    return {stage: measure(function, pixels, repeat) for stage, function in stages.items()}
+
+
+def run(kinds: List[str], sizes: List[int], seed: int = 0, repeat: int = REPEAT) -> Dict:
+    """
+    :return: Measurements of every stage for every generated image, keyed by "<kind>-<size>"
+    """
+    results = {}
+    for kind in kinds:
+        for size in sizes:
+            name = f"{kind}-{size}"
+            results[name] = benchmark_image(generate_image(kind, size, seed), repeat)
+            encode = results[name]["encode"]
+            print(f"{name:15} encode {encode['seconds']:8.3f} sec {encode['pixels_per_sec'] or 0:>12,} px/s "
+                  f"{encode['strings']:6} strings {encode['fill_ratio']:.1%} full")
+    return {"meta": {"python": sys.version.split()[0], "platform": platform.platform(), "numpy": np.__version__,
+                     "seed": seed, "repeat": repeat, "date": time.strftime("%Y-%m-%d %H:%M:%S")},
+            "results": results}
+
+
+def pixel_loop_check(image: Image, color: Tuple[int, int, int], coordinates: List[Tuple[int, int]],
+                     tolerance: int = 30) -> bool:
+    """
+    `common.color_in_coords` as it was before: a screenshot of the whole screen, checked pixel by pixel
+    """
+    image_colors = image.load()
+    for y in range(coordinates[0][1], coordinates[1][1]):
+        for x in range(coordinates[0][0], coordinates[1][0]):
+            compare_color = image_colors[x, y]
+            if all(abs(compare_color[i] - color[i]) < tolerance for i in range(3)):
+                return True
+    return False
+
+
+def benchmark_capture(backend: Backend, repeat: int = CAPTURE_REPEAT) -> Dict[str, Dict]:
+    """
+    Time the check of the Variable importer (is there text in the "Value" field?) when the text isn't there,
+    the case that checks every pixel
+
+    :param backend: The screen
+    :param repeat: Number of timed runs of every stage
+    :return: Measurements of every stage
+    """
+    from Importing import VariableLayout
+
+    coordinates = VariableLayout.preset(*backend.screen_size()).color_check
+    box = corners_to_box(coordinates)
+    pixels = (box[2] - box[0]) * (box[3] - box[1])
+    color = (255, 0, 255)  # Not on the screen
+    stages = {
+        "grab_full": lambda: backend.grab(),
+        "grab_region": lambda: backend.grab(box),
+        "check_full_loop": lambda: pixel_loop_check(backend.grab(), color, coordinates),
+        "check_region_numpy": lambda: color_in_coords(None, color, coordinates, backend=backend),
+    }
+    return {stage: measure(function, pixels, repeat) for stage, function in stages.items()}
+
+
+def run_capture(repeat: int = CAPTURE_REPEAT) -> Dict[str, Dict]:
+    """
+    `benchmark_capture` on the desktop, or on a simulated screen if there is none
+    """
+    try:
+        backend = get_backend()
+        backend.grab((0, 0, 1, 1))
+    except Exception as e:
+        from simulated_backend import SimulatedBackend
+
+        print(f"No desktop ({type(e).__name__}: {e}), using a simulated screen")
+        backend = SimulatedBackend()
+
+    width, height = backend.screen_size()
+    print(f"Screen: {width}x{height}")
+    results = benchmark_capture(backend, repeat)
+    for stage, result in results.items():
+        print(f"{stage:25} {result['seconds'] * 1000:9.3f} ms")
+    capture = results["grab_full"]["seconds"] / results["grab_region"]["seconds"]
+    check = results["check_full_loop"]["seconds"] / results["check_region_numpy"]["seconds"]
+    print(f"Region instead of the whole screen: {capture:.0f}x faster capture, {check:.0f}x faster check")
+    return results
+
+
+def benchmark_clipboard(clipboard: Clipboard, repeat: int = CLIPBOARD_REPEAT) -> Dict[str, Dict]:
+    """
+    Copy different {`Encoding.MaxStringLength`}-char strings into the clipboard, without and with the read-back check
+
+    :param clipboard: The clipboard
+    :param repeat: Copies of every stage
+    :return: `clipboard.summarize` of every stage
+    """
+    from simulated_backend import sample_strings
+
+    strings = sample_strings(repeat)
+    results = {}
+    for stage, verify in (("copy", False), ("copy_verified", True)):
+        seconds = []
+        for string in strings:
+            started = time.perf_counter()
+            clipboard.copy(string, verify)
+            seconds.append(time.perf_counter() - started)
+        results[stage] = summarize(seconds)
+    results["failed_checks"] = {"count": clipboard.failed_checks}
+    return results
+
+
+def run_clipboard(repeat: int = CLIPBOARD_REPEAT) -> Dict[str, Dict]:
+    """
+    `benchmark_clipboard` on the clipboard of this computer, or on one in memory if there is none
+    """
+    try:
+        clipboard = system_clipboard()
+        clipboard.copy("")
+    except Exception as e:
+        print(f"No clipboard ({type(e).__name__}: {e}), using one in memory")
+        clipboard = MemoryClipboard()
+
+    print(f"Clipboard: {clipboard.name}")
+    results = benchmark_clipboard(clipboard, repeat)
+    # What one string takes to import, from the job history
+    step = job_history.plan(["x" * Encoding.MaxStringLength])["variable"]["import_seconds"]
+    for stage in ("copy", "copy_verified"):
+        result = results[stage]
+        print(f"{stage:15} p50 {result['p50_ms']:8.3f} ms, p95 {result['p95_ms']:8.3f} ms "
+              f"({result['p50_ms'] / 1000 / step:.2%} of an import step of {step:.2f} sec)")
+    print(f"Failed read-back checks: {results['failed_checks']['count']}")
+    return results
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float = 0.25) -> List[str]:
+    """
+    Find regressions: stages that got slower or use more memory by more than `tolerance`,
+    or encodings that need more strings. Stages that took less than `MIN_SECONDS` aren't checked for time.
+
+    :param current: Results of `run`
+    :param baseline: Results of an earlier `run`
+    :param tolerance: Allowed relative slowdown / memory growth (0.25 = 25 %)
+    :return: Descriptions of the regressions
+    """
+    regressions = []
+    for name, stages in current["results"].items():
+        for stage, result in stages.items():
+            old = baseline["results"].get(name, {}).get(stage)
+            if not old:
+                continue
+            for metric in ("seconds", "peak_mb"):
+                if metric == "seconds" and max(old[metric], result[metric]) < MIN_SECONDS:
+                    continue
+                if old[metric] and result[metric] > old[metric] * (1 + tolerance):
+                    regressions.append(f"{name} {stage}: {metric} {old[metric]} -> {result[metric]} "
+                                       f"({result[metric] / old[metric] - 1:+.0%})")
+            if "strings" in old and result["strings"] > old["strings"]:
+                regressions.append(f"{name} {stage}: strings {old['strings']} -> {result['strings']}")
+    return regressions
+
+
+def main(args: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark converting and encoding images.")
+    parser.add_argument("--kinds", nargs="+", choices=KINDS, default=list(KINDS))
+    parser.add_argument("--sizes", nargs="+", type=int, default=[128, 256, 512, 1024])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=REPEAT, help="Timed runs of every stage (the fastest counts)")
+    parser.add_argument("--save", help="Save the results as a JSON baseline")
+    parser.add_argument("--compare", help="Compare the results with a JSON baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown before it's a regression")
+    parser.add_argument("--capture", action="store_true",
+                        help="Only measure capturing the screen and checking colors (full screen against a region)")
+    parser.add_argument("--clipboard", action="store_true",
+                        help="Only measure copying strings into the clipboard, with and without reading them back")
+    args = parser.parse_args(args)
+
+    if args.capture:
+        run_capture()
+        return 0
+    if args.clipboard:
+        run_clipboard()
+        return 0
+
+    results = run(args.kinds, args.sizes, args.seed, args.repeat)
+
+    if args.save:
+        with open(args.save, "w", encoding="UTF-8") as results_file:
+            json.dump(results, results_file, indent=4)
+        print(f"Results saved to {args.save}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="UTF-8") as baseline_file:
+            regressions = compare(results, json.load(baseline_file), args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regressions:")
+            print("\n".join(regressions))
+            return 1
+        print("\nNo regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
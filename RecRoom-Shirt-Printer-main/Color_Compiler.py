@@ -0,0 +1,599 @@
+"""
+Color Compiler. Builds a custom palette for an image, writes it as "-Hex.txt" (for importing the colors into
+Rec Room), "-RGB.txt" (colors and symbols, for encoding with `palette.Palette.load`) and a "-Preview.png",
+and imports a "-Hex.txt" file into Rec Room.
+
+Palette methods:
+    kmeans - k-means in CIELAB, best of `restarts` seeded runs (run in parallel), weighted by how often a color is used
+    median-cut - median cut in CIELAB, splits the box of colors with the largest weighted spread
+    pil-median-cut, pil-maximum-coverage, pil-octree - `Image.quantize` (the methods of version 5)
+
+Importing waits for the color picker to react instead of sleeping, checks that every color took (the custom color
+button, and after saving the slot, have to show it) and enters or saves a color again if it didn't. It runs on a
+`backend.Backend`.
+
+Examples:
+    python Color_Compiler.py                                  (asks, like before)
+    python Color_Compiler.py compile logo.png --colors 24 --method kmeans --seed 1
+    python Color_Compiler.py import logo-Hex.txt --delay 0.3
+
+    >>> img = Image.open("logo.png")
+    >>> palette = compile_palette(img, colors=24)
+    >>> img_data = list(Encoding.iter_encode(Encoding.quantize(img, False, palette=palette), palette=palette))
+"""
+name = 'Color Compiler'
+version = '6.2'
+#5.1 added more symbols, up to 113#
+#5.2 removed # from HEX file and added some extra clicking for the new custom color change#
+#6.0 importable functions and a CLI, k-means and median cut in CIELAB, palettes for `Encoding`#
+#6.1 importing waits for the screen instead of sleeping, checks every color and retries the ones that failed#
+#6.2 checks that every color is saved into its slot and the next slot is selected, --only skips to the right slots#
+
+import argparse
+import csv
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Sequence, Tuple
+
+try:
+    import numpy as np
+    from PIL import Image, ImageFilter  # pip install pillow
+except ModuleNotFoundError:
+    print("")
+    print("Pillow or NumPy may not installed - type: 'pip install pillow numpy' into command prompt")
+    quit(10)
+
+from backend import Backend, Coords, get_backend
+from color_lookup import get_lookup, lab_to_rgb, nearest_indices, rgb_to_lab
+from focus_monitor import get_monitor
+from palette import SYMBOLS, Palette, hex_to_rgb, rgb_to_hex
+from ui_state import region, screen_changed, turns_color
+
+METHODS: Tuple[str, ...] = ("kmeans", "median-cut", "pil-median-cut", "pil-maximum-coverage", "pil-octree")
+PIL_METHODS = {"pil-median-cut": Image.Quantize.MEDIANCUT, "pil-maximum-coverage": Image.Quantize.MAXCOVERAGE,
+               "pil-octree": Image.Quantize.FASTOCTREE}
+MAX_COLORS: int = len(SYMBOLS)  # One symbol per color
+MAX_SAMPLES: int = 20000  # Distinct colors k-means and median cut work on, larger images are sampled
+RESTARTS: int = 4
+
+CLICK_INTERVAL: float = 0.1  # Between the clicks of a triple click
+
+log = logging.getLogger(__name__)
+
+
+def sample_colors(img: Image, max_samples: int = MAX_SAMPLES, seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    The distinct colors of an image and how often they are used.
+    With more than `max_samples` distinct colors, `max_samples` pixels are drawn at random (weighted by use).
+
+    :param img: The image
+    :param max_samples: Maximum number of distinct colors
+    :param seed: Seed for the sampling
+    :return: RGB colors, shape (n, 3), and their weights, shape (n,)
+    """
+    pixels = np.asarray(img.convert("RGB"), dtype=np.int32).reshape(-1, 3)
+    keys = (pixels[:, 0] << 16) | (pixels[:, 1] << 8) | pixels[:, 2]
+    unique_keys, counts = np.unique(keys, return_counts=True)
+    if len(unique_keys) > max_samples:
+        picks = np.random.default_rng(seed).choice(len(unique_keys), size=max_samples, p=counts / counts.sum())
+        picked, counts = np.unique(picks, return_counts=True)
+        unique_keys = unique_keys[picked]
+    colors = np.stack((unique_keys >> 16, (unique_keys >> 8) & 0xFF, unique_keys & 0xFF), axis=-1)
+    return colors, counts.astype(np.float64)
+
+
+def squared_distances(lab: np.ndarray, centers: np.ndarray, lab_norms: np.ndarray = None) -> np.ndarray:
+    """
+    :param lab: Lab colors, shape (n, 3)
+    :param centers: Lab centers, shape (k, 3)
+    :param lab_norms: |lab|² of every color, if it's already known
+    :return: Squared distance of every color to every center, shape (n, k)
+    """
+    lab_norms = (lab ** 2).sum(axis=1) if lab_norms is None else lab_norms
+    # |c - p|² = |c|² - 2 c·p + |p|², as one matrix product
+    return lab_norms[:, None] - 2 * (lab @ centers.T) + (centers ** 2).sum(axis=1)[None, :]
+
+
+def kmeans_plus_plus(lab: np.ndarray, weights: np.ndarray, k: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    k-means++ starting centers: every next center is picked with a probability of weight × squared distance
+    to the closest center so far
+
+    :return: The centers, shape (k, 3)
+    """
+    centers = np.empty((k, 3))
+    centers[0] = lab[rng.choice(len(lab), p=weights / weights.sum())]
+    closest = ((lab - centers[0]) ** 2).sum(axis=1)
+    for i in range(1, k):
+        probabilities = weights * closest
+        total = probabilities.sum()
+        centers[i] = lab[rng.choice(len(lab), p=probabilities / total) if total > 0 else rng.integers(len(lab))]
+        closest = np.minimum(closest, ((lab - centers[i]) ** 2).sum(axis=1))
+    return centers
+
+
+def kmeans_once(lab: np.ndarray, weights: np.ndarray, k: int, seed, iterations: int = 50,
+                tolerance: float = 0.5) -> Tuple[np.ndarray, float]:
+    """
+    One weighted k-means run (Lloyd's algorithm)
+
+    :param lab: Lab colors, shape (n, 3)
+    :param weights: Weight of every color, shape (n,)
+    :param k: Number of centers, at most n
+    :param seed: Seed (or `np.random.SeedSequence`) of the starting centers
+    :param iterations: Maximum number of iterations
+    :param tolerance: Stop once no center moves more than this (ΔE)
+    :return: The centers, shape (k, 3), and the inertia (weighted sum of squared distances)
+    """
+    rng = np.random.default_rng(seed)
+    centers = kmeans_plus_plus(lab, weights, k, rng)
+    lab_norms = (lab ** 2).sum(axis=1)
+    for _ in range(iterations):
+        # |c|² is the same for every center, it's only needed for the actual distances
+        distances = (centers ** 2).sum(axis=1)[None, :] - 2 * (lab @ centers.T)
+        labels = distances.argmin(axis=1)
+        totals = np.bincount(labels, weights, minlength=k)
+        new_centers = np.stack([np.bincount(labels, weights * lab[:, axis], minlength=k) for axis in range(3)], axis=1)
+        used = totals > 0
+        new_centers[used] /= totals[used, None]
+        if not used.all():
+            # Move empty centers to the colors that are served worst
+            worst = np.argsort(weights * (lab_norms + distances[np.arange(len(lab)), labels]))[::-1]
+            new_centers[~used] = lab[worst[:np.count_nonzero(~used)]]
+
+        shift = np.sqrt(((new_centers - centers) ** 2).sum(axis=1)).max()
+        centers = new_centers
+        if shift < tolerance:
+            break
+
+    inertia = float((weights * np.maximum(squared_distances(lab, centers, lab_norms).min(axis=1), 0)).sum())
+    return centers, inertia
+
+
+def kmeans(lab: np.ndarray, weights: np.ndarray, k: int, seed: int = 0, restarts: int = RESTARTS,
+           workers: int = None) -> np.ndarray:
+    """
+    Weighted k-means, the best of `restarts` runs. Every run has its own seed derived from `seed`,
+    so the result doesn't depend on `workers`.
+
+    :param lab: Lab colors, shape (n, 3)
+    :param weights: Weight of every color, shape (n,)
+    :param k: Number of centers
+    :param seed: Seed of all runs
+    :param restarts: Number of runs
+    :param workers: Processes to run them in, defaults to one per run (up to the number of CPU cores); 1 runs them
+        one after another in this process
+    :return: The centers with the lowest inertia, shape (k, 3)
+    """
+    k = min(k, len(lab))
+    seeds = np.random.SeedSequence(seed).spawn(max(1, restarts))
+    if len(seeds) == 1 or workers == 1:
+        results = [kmeans_once(lab, weights, k, run_seed) for run_seed in seeds]
+    else:
+        with ProcessPoolExecutor(max_workers=min(len(seeds), workers or os.cpu_count() or 1)) as executor:
+            results = list(executor.map(kmeans_once, repeat(lab), repeat(weights), repeat(k), seeds))
+    return min(results, key=lambda result: result[1])[0]
+
+
+def median_cut(lab: np.ndarray, weights: np.ndarray, k: int) -> np.ndarray:
+    """
+    Weighted median cut: keep splitting the box with the largest weight × extent at the weighted median of its
+    longest axis
+
+    :param lab: Lab colors, shape (n, 3)
+    :param weights: Weight of every color, shape (n,)
+    :param k: Number of boxes
+    :return: Weighted mean of every box, shape (≤ k, 3)
+    """
+    def score(box: np.ndarray) -> float:
+        return float(weights[box].sum() * np.ptp(lab[box], axis=0).max()) if len(box) > 1 else 0.0
+
+    boxes = [np.arange(len(lab))]
+    scores = [score(boxes[0])]
+    while len(boxes) < k:
+        i = int(np.argmax(scores))
+        if scores[i] <= 0:
+            break  # Every box is a single color
+        box = boxes.pop(i)
+        scores.pop(i)
+
+        axis = int(np.ptp(lab[box], axis=0).argmax())
+        box = box[np.argsort(lab[box, axis], kind="stable")]
+        cumulative = np.cumsum(weights[box])
+        cut = min(max(int(np.searchsorted(cumulative, cumulative[-1] / 2)) + 1, 1), len(box) - 1)
+        for half in (box[:cut], box[cut:]):
+            boxes.append(half)
+            scores.append(score(half))
+
+    return np.array([np.average(lab[box], axis=0, weights=weights[box]) for box in boxes])
+
+
+def compile_palette(img: Image, colors: int = 16, method: str = "kmeans", seed: int = 0,
+                    restarts: int = RESTARTS, workers: int = None, max_samples: int = MAX_SAMPLES,
+                    name: str = "custom") -> Palette:
+    """
+    Build a palette for an image. The colors are sorted by how many pixels are closest to them,
+    so the most used color gets the first symbol.
+
+    :param img: The image
+    :param colors: Number of colors, 1 to `MAX_COLORS`. The palette can have fewer if the image has fewer colors.
+    :param method: One of `METHODS`
+    :param seed: Seed for sampling and k-means; the same seed gives the same palette
+    :param restarts: Number of k-means runs
+    :param workers: Processes for the k-means runs, see `kmeans`
+    :param max_samples: See `sample_colors`
+    :param name: Name of the palette
+    :return: The palette
+    """
+    if not 1 <= colors <= MAX_COLORS:
+        raise ValueError(f"The number of colors has to be between 1 and {MAX_COLORS}")
+    if method not in METHODS:
+        raise ValueError(f"Unknown method {method!r}, use one of {METHODS}")
+
+    img = img.convert("RGB")
+    samples, weights = sample_colors(img, max_samples, seed)
+    if method in PIL_METHODS:
+        quantized = img.quantize(colors=colors, method=PIL_METHODS[method])
+        flat = quantized.getpalette()
+        rgb = np.array([flat[3 * index:3 * index + 3] for _, index in quantized.getcolors()], dtype=np.uint8)
+    else:
+        lab = rgb_to_lab(samples)
+        centers = kmeans(lab, weights, colors, seed, restarts, workers) if method == "kmeans" \
+            else median_cut(lab, weights, colors)
+        rgb = lab_to_rgb(centers)
+
+    # Different centers can round to the same RGB color
+    rgb = np.unique(rgb, axis=0)
+    usage = np.bincount(nearest_indices(samples, rgb, metric="lab"), weights, minlength=len(rgb))
+    rgb = rgb[np.argsort(-usage, kind="stable")]
+    return Palette(rgb.tolist(), name=name)
+
+
+def write_palette(palette: Palette, img: Image, file_name: str) -> List[str]:
+    """
+    Write `file_name`-Hex.txt, `file_name`-RGB.txt and `file_name`-Preview.png
+    (the image in the palette colors, mapped with a CIELAB lookup table)
+
+    :return: The written paths
+    """
+    paths = [f"{file_name}-Hex.txt", f"{file_name}-RGB.txt", f"{file_name}-Preview.png"]
+    palette.save_hex(paths[0])
+    palette.save_rgb(paths[1])
+    get_lookup(palette.rgb, metric="lab").map_image(img).save(paths[2])
+    return paths
+
+
+def read_hex_colors(path: str) -> List[str]:
+    """
+    :return: Every non-empty line of a "-Hex.txt" file
+    """
+    with open(path, "r", encoding="UTF-8") as hex_file:
+        return [line.strip() for line in hex_file if line.strip()]
+
+
+class ColorPickerLayout(NamedTuple):
+    """
+    Where the parts of the Rec Room color picker are on the screen
+    """
+    color: Coords  # Opens the color picker
+    custom: Coords  # The custom color button, it shows the color that was entered
+    text: Coords  # The hex text field
+    slot: Coords  # The selected slot of the palette, it shows the color saved into it
+
+    @classmethod
+    def for_screen(cls, width: int, height: int) -> "ColorPickerLayout":
+        """
+        :return: The positions on a 16:9 screen of that size
+        """
+        return cls(color=(int(0.55 * width), int(0.45 * height)),
+                   custom=(int(0.7 * width), int(0.85 * height)),
+                   text=(int(0.7 * width), int(0.63 * height)),
+                   slot=(int(0.3 * width), int(0.85 * height)))
+
+
+def getActiveWindow(window_title: str = "Rec Room", backend: Backend = None) -> bool:
+    get_monitor(window_title, backend).wait()
+    return(True)
+
+
+def next_slot(layout: ColorPickerLayout, backend: Backend, timeout: float = 2.0, attempts: int = 3) -> bool:
+    """
+    Move on to the next slot of the palette and wait until the slot looks different; right-click again only after
+    `timeout`, so a slow click doesn't skip a slot. Only for leaving a slot with a color of the palette: the colors of
+    a palette are all different, but empty slots look the same, so leaving one would look like a lost click.
+
+    :return: False if the slot didn't change after all attempts
+    """
+    slot_box = region(layout.slot)
+    for _ in range(attempts):
+        changed = screen_changed(backend, slot_box)
+        backend.click(button="right")
+        if backend.wait_until(changed, timeout):
+            return True
+    return False
+
+
+def insert_color(hex_color: str, layout: ColorPickerLayout, delay: float, backend: Backend,
+                 timeout: float = 2.0, attempts: int = 3, tolerance: int = 30) -> Dict:
+    """
+    Enter one hex color into the color picker, check that the custom color button shows it, save it into the selected
+    slot and check that the slot shows it. Every step continues as soon as the screen reacts; `timeout` is only
+    reached when it doesn't. Moving on to the next slot is up to the caller (`next_slot`).
+
+    :param hex_color: The color, "rrggbb"
+    :param layout: Positions of the color picker
+    :param delay: Pause between the steps that don't change the screen in a way that can be checked
+    :param backend: Mouse, keyboard and screen
+    :param timeout: Seconds to wait for the screen to react to a step
+    :param attempts: How often the color is entered (and saved) before giving up
+    :param tolerance: How far the color on the screen may be from `hex_color` (per channel)
+    :return: `hex`, `verified` (entered and saved), `attempts` and `seconds`
+    """
+    started = backend.time()
+    custom_box, text_box, slot_box = region(layout.custom), region(layout.text), region(layout.slot)
+    rgb = hex_to_rgb(hex_color)
+    entered = False
+    attempt = 0
+    while not entered and attempt < attempts:
+        attempt += 1
+        getActiveWindow(backend=backend)
+        if attempt > 1:
+            backend.press("esc")  # Close whatever is still open from the failed attempt
+
+        changed = screen_changed(backend, custom_box)
+        backend.click(*layout.color)
+        backend.wait_until(changed, timeout)
+        changed = screen_changed(backend, text_box)
+        backend.click(*layout.custom)
+        backend.wait_until(changed, timeout)
+
+        # Three clicks select the old text in the field
+        for _ in range(3):
+            backend.click(*layout.text)
+            backend.sleep(CLICK_INTERVAL)
+        # The button still shows the color before, which may be close to this one
+        takes_color = turns_color(backend, custom_box, rgb, tolerance)
+        backend.copy(hex_color)
+        backend.hotkey("ctrl", "v")
+        backend.press("enter")
+        entered = backend.wait_until(takes_color, timeout)
+
+    # Save the color into the slot, again if the slot doesn't show it
+    saved = False
+    backend.press("f")
+    backend.sleep(delay)
+    takes_color = turns_color(backend, slot_box, rgb, tolerance)
+    for save in range(attempts if entered else 0):
+        if save:
+            attempt += 1
+        backend.click()
+        saved = backend.wait_until(takes_color, timeout)
+        if saved:
+            break
+    if not saved:
+        backend.press("esc")  # Close the color picker, the slot keeps its old color
+
+    return {"hex": hex_color, "verified": entered and saved, "attempts": attempt,
+            "seconds": backend.time() - started}
+
+
+def hexinsert(list: Sequence[str], delay: float, backend: Backend = None, layout: ColorPickerLayout = None,
+              only: Sequence[int] = None, timeout: float = 2.0, attempts: int = 3) -> List[Dict]:
+    """
+    Type every hex color into the custom color field of the Rec Room color picker and save it into its slot,
+    checking that every color took
+
+    :param list: Hex colors
+    :param delay: Import delay in seconds, see `insert_color`
+    :param backend: Mouse, keyboard and screen, defaults to `backend.get_backend()`
+    :param layout: Positions of the color picker, defaults to the ones for the screen size
+    :param only: Only import the colors with these indices (0 is the first), e.g. the ones that failed last time.
+        The slot of the first one has to be selected; the slots in between are skipped, so every color still goes
+        into its own slot
+    :param timeout: See `insert_color`
+    :param attempts: See `insert_color`
+    :return: For every imported color: `index` and the result of `insert_color`. Stops after a color that didn't
+        take (its slot stays selected) or when the next slot can't be reached; the colors after it aren't in the list
+    """
+    backend = backend or get_backend()
+    layout = layout or ColorPickerLayout.for_screen(*backend.screen_size())
+    indices = sorted(set(only)) if only is not None else range(len(list))
+    wrong = [index + 1 for index in indices if not 0 <= index < len(list)]
+    if wrong:
+        raise ValueError(f"There is no color {', '.join(map(str, wrong))}, there are {len(list)} (1 is the first)")
+
+    getActiveWindow(backend=backend)
+    backend.sleep(1)
+    backend.move_to(0, 0)
+    results = []
+    slot = indices[0] if indices else 0  # Index of the selected slot
+    for index in indices:
+        if index > slot:
+            # Skip the slots of the colors that aren't imported
+            backend.press("f")
+            backend.sleep(delay)
+            while slot < index:
+                if not next_slot(layout, backend, timeout, attempts):
+                    log.error(f"Could not move on to the slot of color #{slot + 2}, stopping")
+                    return results
+                slot += 1
+            backend.press("f")
+            backend.sleep(delay)
+
+        result = dict(index=index, **insert_color(list[index].strip(), layout, delay, backend, timeout, attempts))
+        results.append(result)
+        log.info(f"Color #{index + 1} {result['hex']}: {result['seconds']:.2f} sec, {result['attempts']} attempt(s)"
+                 f"{'' if result['verified'] else ', NOT VERIFIED'}")
+        if not result["verified"]:
+            # Without the color the slot can look like the next (empty) one, moving on couldn't be checked
+            log.error(f"Color #{index + 1} did not take, stopping with its slot selected")
+            return results
+
+        # Go on to the next slot; if that's lost, the next color would be saved over this one
+        if not next_slot(layout, backend, timeout, attempts):
+            log.error(f"Could not move on from the slot of color #{index + 1}, stopping")
+            return results
+        slot = index + 1
+        backend.press("f")
+        backend.sleep(delay)
+    return results
+
+
+def write_timings(results: Sequence[Dict], path: str) -> None:
+    """
+    Save the result of every color as CSV
+    """
+    with open(path, "w", encoding="UTF-8", newline="") as timings_file:
+        writer = csv.DictWriter(timings_file, fieldnames=["index", "hex", "verified", "attempts", "seconds"])
+        writer.writeheader()
+        writer.writerows({**result, "seconds": round(result["seconds"], 3)} for result in results)
+
+
+def dilate(cycles, image):
+    for i in range(cycles):
+        image = image.filter(ImageFilter.MaxFilter(3))
+    return image
+
+
+def erode(cycles, image):
+    for i in range(cycles):
+        image = image.filter(ImageFilter.MinFilter(3))
+    return image
+
+
+def compile_file(path: str, colors: int, method: str = "kmeans", seed: int = 0, restarts: int = RESTARTS,
+                 workers: int = None, output_dir: str = ".") -> Palette:
+    """
+    Compile an image file and write the palette files next to `output_dir`/<image name>
+
+    :return: The palette
+    """
+    file_name = str(Path(output_dir) / Path(path).stem)
+    with Image.open(path) as img:
+        img = img.convert("RGB")
+    palette = compile_palette(img, colors, method, seed, restarts, workers, name=Path(path).stem)
+    print(str(len(palette)) + " colors compiled")
+    write_palette(palette, img, file_name)
+    print("Text files and preview written")
+    return palette
+
+
+def import_file(path: str, delay: float, countdown: float = 3, only: Sequence[int] = None,
+                backend: Backend = None) -> List[Dict]:
+    """
+    Import the colors of a "-Hex.txt" file into Rec Room and save how every color went in "<file>-timings.csv"
+
+    :param path: The file
+    :param delay: Import delay in seconds
+    :param countdown: Seconds to wait before starting
+    :param only: See `hexinsert`
+    :param backend: See `hexinsert`
+    :return: See `hexinsert`
+    """
+    backend = backend or get_backend()
+    Sx, Sy = backend.screen_size()
+    if (Sy%Sx != Sy):
+        print("Screen ratio not supported - only 16:9 is supported")
+        print("   Get the coordinates of the buttons and insert them manualy into the variables in the code")
+        quit()
+
+    segments = read_hex_colors(path)
+    print("Colors obtained, " + str(len(segments)) + " colors found.")
+    print("  Import will begin in " + str(countdown) + " seconds and will check if 'Rec Room' is the active window")
+    backend.sleep(countdown)
+    results = hexinsert(segments, delay, backend, only=only)
+
+    write_timings(results, str(Path(path).with_suffix("")) + "-timings.csv")
+    imported = {result["index"] for result in results if result["verified"]}
+    failed = [index for index in (sorted(set(only)) if only is not None else range(len(segments)))
+              if index not in imported]
+    print(f"{len(imported)}/{len(imported) + len(failed)} colors imported in "
+          f"{sum(result['seconds'] for result in results):.1f} sec")
+    if failed:
+        print("Could not import colors " + ", ".join(str(index + 1) for index in failed) + ". To import only these, "
+              "select the slot of the first one in Rec Room and run:\n"
+              f"    python Color_Compiler.py import \"{path}\" --only {' '.join(str(index + 1) for index in failed)}")
+    return results
+
+
+def interactive() -> None:
+    """
+    Ask what to do, the way the Color Compiler always worked
+    """
+    from tkinter import Tk
+    from tkinter.filedialog import askopenfilename
+
+    print("")
+    Tk().withdraw()
+    print(str(name) + " " + str(version))
+    print("   'i' to import a HEX file")
+    print("   'c' to compile a image into RGB and HEX files")
+    selection = str(input("Enter value: "))
+    if (selection == 'i'):
+        print("  Select text file to import")
+        path = askopenfilename()
+        if not path:
+            print("Error - file window closed")
+            return
+        delay = float(input("Enter import delay in seconds from 0 to 1 second: "))
+        print("Delay set to " + str(delay) + " seconds")
+        input("Press enter to start the import process: ")
+        import_file(path, delay)
+    elif (selection == 'c'):
+        print("  Select image file to compile")
+        path = askopenfilename()
+        if not path:
+            print("Error - file window closed")
+            return
+        print("  1 marker is minmum " + str(MAX_COLORS) + " is maximum")
+        colors = int(input("Enter amount of colors: "))
+        for index, method in enumerate(METHODS):
+            print("   " + str(index) + " = " + method)
+        method = METHODS[int(input("Enter type of quantization: "))]
+        compile_file(path, colors, method)
+        print("  Run program again to import colors")
+    else:
+        print("Enter valid option")
+
+
+def main(args: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Build a custom palette for an image, or import one into Rec Room.")
+    subparsers = parser.add_subparsers(dest="command")
+    compile_parser = subparsers.add_parser("compile", help="Write the -Hex.txt, -RGB.txt and -Preview.png files")
+    compile_parser.add_argument("image")
+    compile_parser.add_argument("--colors", type=int, default=16, help=f"Number of colors (1 - {MAX_COLORS})")
+    compile_parser.add_argument("--method", choices=METHODS, default="kmeans")
+    compile_parser.add_argument("--seed", type=int, default=0, help="Same seed, same palette")
+    compile_parser.add_argument("--restarts", type=int, default=RESTARTS, help="Number of k-means runs")
+    compile_parser.add_argument("-j", "--workers", type=int, help="Processes for the k-means runs")
+    compile_parser.add_argument("-o", "--output", default=".", help="Output folder")
+    import_parser = subparsers.add_parser("import", help="Type the colors of a -Hex.txt file into Rec Room")
+    import_parser.add_argument("file")
+    import_parser.add_argument("--delay", type=float, default=0.3, help="Import delay in seconds")
+    import_parser.add_argument("--only", nargs="+", type=int, metavar="NUMBER",
+                               help="Only import these colors (1 is the first), e.g. the ones that failed")
+    args = parser.parse_args(args)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    if args.command == "compile":
+        if not 1 <= args.colors <= MAX_COLORS:
+            parser.error(f"--colors has to be between 1 and {MAX_COLORS}")
+        compile_file(args.image, args.colors, args.method, args.seed, args.restarts, args.workers, args.output)
+    elif args.command == "import":
+        if args.only:
+            # Check before the import starts, not halfway through it
+            colors = len(read_hex_colors(args.file))
+            wrong = [number for number in args.only if not 1 <= number <= colors]
+            if wrong:
+                parser.error(f"--only: {', '.join(map(str, wrong))} not between 1 and {colors}, "
+                             f"the number of colors in {args.file}")
+        import_file(args.file, args.delay, only=[number - 1 for number in args.only] if args.only else None)
+    else:
+        interactive()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,33 +1,29 @@
-import ctypes
-import json
 import logging
-import subprocess
 import sys
-import time
 from tkinter import *
 
-from common import setup_logger, is_window_active
-
-try:
-    import pyautogui
-    from PIL import Image, ImageGrab
-except ModuleNotFoundError:
-    print(f'Please execute the following line and run the script again:\n'
-          f'{sys.executable} -m pip install -U PyAutoGUI')
-    # Ask the user to install all the necessary packages automatically
-    if input("Proceed to run the command automatically? [yes/no] ").find("yes") != -1:
-        subprocess.call(f"{sys.executable} -m pip install -U PyAutoGUI")
-    exit()
+from backend import Backend, get_backend
+from common import setup_logger, is_window_active, save_coordinates
 
 
 InputField = None
 DoneButton = None
 
-ctypes.windll.shcore.SetProcessDpiAwareness(2)
+if sys.platform == "win32":
+    import ctypes
+
+    # Tk has to report physical pixels, the same ones the importers click on
+    ctypes.windll.shcore.SetProcessDpiAwareness(2)
+
 
+def coordinate_selection(backend: Backend = None):
+    """
+    Let the user click on the "Value" box and the arrows ↕ of the Variable, save both in `coordinates.json`
 
-def coordinate_selection():
+    :param backend: Used to wait for Rec Room, defaults to `backend.get_backend()`
+    """
     global InputField, DoneButton
+    backend = backend or get_backend()
 
     def init_window() -> Tk:
         # Initialize the Tk window;  Alpha: 0.1, Fullscreen: True
@@ -69,17 +65,16 @@ def coordinate_selection():
                   '> ')
         win = init_window()
         win.bind('<Button-1>', set_coords)
-        is_window_active()
-        time.sleep(0.1)
+        is_window_active(backend=backend)
+        backend.sleep(0.1)
         win.mainloop()
-        time.sleep(0.1)
+        backend.sleep(0.1)
 
     print(f"Input button: {InputField}\nDone Button (arrows ↕): {DoneButton}")
-    with open("coordinates.json", "w") as coords_file:
-        json.dump({
-            "InputField": InputField,
-            "DoneButton": DoneButton
-        }, coords_file, indent=4)
+    save_coordinates({
+        "InputField": InputField,
+        "DoneButton": DoneButton
+    })
 
 
 log: logging.Logger = setup_logger()
@@ -4,30 +4,39 @@ How is it encoded:
     the number in front of a char represents how many pixels of the same color are in a row,
     chars !#$%&()*+,./:;<=>?@[Ñ]^_{|}~¢£¤¥¦§¨©ª«¬Ö®¯°±²³´µ¶·¸¹º»¼½¾¿ÀÈÌÐ represent the color.
     There's 62 colors including eraser and tan, eraser is not recommended as it leaves an edge
+Prints in custom colors pass a `palette.Palette` (e.g. from `Color_Compiler.compile_palette`) as `palette`.
 """
 import os
 import subprocess
 import sys
 import time
-import tkinter
+from concurrent.futures import ProcessPoolExecutor
 from math import sqrt
 from pathlib import Path
-from tkinter import filedialog
-from typing import Tuple, List
+from typing import Iterable, Iterator, Tuple, List, Union
 
 try:
-    import pyautogui
-    import pyperclip
-    from PIL import Image, ImageGrab
+    import numpy as np
+    from PIL import Image
 except ModuleNotFoundError:
     print(f'Please execute the following line and run the script again:\n'
-          f'{sys.executable} -m pip install -U PyAutoGUI pyperclip Pillow')
+          f'{sys.executable} -m pip install -U PyAutoGUI pyperclip Pillow numpy')
     # Ask the user to install all the necessary packages automatically
     if input("Proceed to run the command automatically? [yes/no] ").find("yes") != -1:
-        subprocess.call(f"{sys.executable} -m pip install -U PyAutoGUI pyperclip Pillow")
+        subprocess.call(f"{sys.executable} -m pip install -U PyAutoGUI pyperclip Pillow numpy")
     exit()
 
+import job_history
+from color_lookup import ColorLookup, nearest_indices
+from dithering import ordered_dither
+from encode_cache import EncodeCache, get_cache
+from palette import COPY_SYMBOL, Palette
+from run_quantizer import run_aware_quantize
+from scan_order import ORDERS, band_alignment, previous_line, scan_permutation, unscan
+
 MaxStringLength: int = 512  # Maximum length string
+BAND_SIZE: int = 64  # Rows (or columns) read at once when encoding
+LIST_SIZE: int = 64  # Strings in one List Create
 
 # Typing alias for color
 PixelColor = Tuple[int, int, int]
@@ -145,12 +154,38 @@ RR_PALETTE: dict = {(101, 113, 149): "!",
 # All the RecRoom colors in one list. [R, G, B, R, G, B,...]
 ALL_COLORS = [num for tup in RR_PALETTE.keys() for num in tup]
 
+# `RR_PALETTE` as arrays for the NumPy encoder, used whenever no other palette is given.
+# A pixel's palette index is its position in `RR_PALETTE`.
+DEFAULT_PALETTE = Palette.from_dict(RR_PALETTE, name="Rec Room")
+# Changes whenever a color or symbol in `RR_PALETTE` changes; part of the cache keys
+PALETTE_VERSION: str = DEFAULT_PALETTE.version
+
+PALETTE_COLORS = DEFAULT_PALETTE.colors
+PALETTE_SYMBOLS = DEFAULT_PALETTE.symbols
+# Every palette color packed into one int (0xRRGGBB), sorted so pixels can be looked up with `np.searchsorted`
+PALETTE_KEYS = DEFAULT_PALETTE.keys
+PALETTE_KEY_ORDER = DEFAULT_PALETTE.key_order
+PALETTE_SORTED_KEYS = DEFAULT_PALETTE.sorted_keys
+
+# Format v2 (`row_delta`): "[count]`" (`COPY_SYMBOL`) copies `count` pixels from one line earlier: from the pixel
+# above every pixel, in every scan order (to the left for the "column" order), see `scan_order.previous_line`
+COPY_INDEX: int = DEFAULT_PALETTE.copy_index
+COPY_VERSION: int = 2  # Changes whenever the pixels copy runs copy from change; part of the cache keys
+# Symbols of all runs by index: the palette colors and the copy run
+RUN_SYMBOLS = DEFAULT_PALETTE.run_symbols
+# Inverse of `RUN_SYMBOLS`: run index of every symbol by its code point, -1 for chars that aren't symbols
+SYMBOL_INDICES = DEFAULT_PALETTE.symbol_indices
+
 
 def get_image(check_palette: bool = True) -> Image:
     """
     Open file explorer, wait for user to open a PNG image
     :return: The image
     """
+    # Imported here so that encoding works without a display (e.g. `Batch_Encode.py`)
+    import tkinter
+    from tkinter import filedialog
+
     print("Open image", end="\r")
     root = tkinter.Tk()
     root.attributes("-topmost", 1)
@@ -192,6 +227,227 @@ def closest_color(pixel_color: PixelColor) -> PixelColor:
     return min(color_diffs)[1]
 
 
+def palette_indices(img: Image, vertical_print: bool = False, lookup: ColorLookup = None,
+                    palette: Palette = None) -> np.ndarray:
+    """
+    Map every pixel of an image to its index in the palette, in the order the pixels get encoded.
+    Pixels that aren't in the palette are mapped to the closest color.
+
+    :param img: The image
+    :param vertical_print: Read the image column by column instead of row by row
+    :param lookup: Optional lookup table (built for the same palette) used for the off-palette pixels
+    :param palette: The palette, defaults to `RR_PALETTE`
+    :return: 1-D array of palette indices
+    """
+    palette = palette or DEFAULT_PALETTE
+    pixels = np.asarray(img.convert("RGB"), dtype=np.int32)
+    if vertical_print:
+        pixels = pixels.transpose(1, 0, 2)
+
+    keys = ((pixels[..., 0] << 16) | (pixels[..., 1] << 8) | pixels[..., 2]).ravel()
+    positions = np.minimum(np.searchsorted(palette.sorted_keys, keys), len(palette.sorted_keys) - 1)
+    indices = palette.key_order[positions]
+
+    off_palette = palette.sorted_keys[positions] != keys
+    if off_palette.any():
+        if lookup:
+            indices[off_palette] = lookup.indices(pixels.reshape(-1, 3)[off_palette])
+        else:
+            # Only look up every distinct off-palette color once
+            missing, inverse = np.unique(keys[off_palette], return_inverse=True)
+            missing_colors = np.stack(((missing >> 16) & 0xFF, (missing >> 8) & 0xFF, missing & 0xFF), axis=1)
+            indices[off_palette] = nearest_indices(missing_colors, palette.colors)[inverse.ravel()]
+
+    return indices
+
+
+def run_lengths(indices: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Run-length encode an array of palette indices.
+
+    :param indices: 1-D array of palette indices
+    :return: The length of every run and the palette index of every run
+    """
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(indices)) + 1))
+    counts = np.diff(np.append(starts, len(indices)))
+    return counts, indices[starts]
+
+
+class RunLengthEncoder:
+    """
+    Run-length encode palette indices that come in pieces (bands of the image).
+    The last run of every piece is kept open, because it can continue in the next piece.
+
+    With `row_delta` (format v2) a run whose pixels are all the same as the pixels one line earlier (see
+    `scan_order.previous_line`) becomes a copy run (`copy_index`), and copy runs next to each other are merged into
+    one. Only whole runs are turned into copy runs, so the v2 encoding never has more runs than the classic one.
+    """
+
+    def __init__(self, row_delta: bool = False, copy_index: int = COPY_INDEX):
+        self.row_delta = row_delta
+        self.copy_index = copy_index  # Run index of copy runs, `Palette.copy_index`
+
+        self.count: int = 0  # Length of the open run
+        self.index: int = -1  # Palette index of the open run
+        self.same: bool = False  # Every pixel of the open run is the same as in the line above
+        self.copy_count: int = 0  # Length of the open copy run (`row_delta`)
+
+    def feed(self, indices: np.ndarray, earlier: np.ndarray = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        :param indices: The next piece of palette indices
+        :param earlier: The palette index one line earlier of every pixel, -1 in the first line (`row_delta`, see
+            `iter_bands`)
+        :return: The runs that were finished by this piece (lengths, palette indices)
+        """
+        if not len(indices):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.intp)
+
+        counts, symbols = run_lengths(indices)
+        if self.row_delta:
+            run_same = np.logical_and.reduceat(indices == earlier, np.cumsum(counts) - counts)
+        else:
+            run_same = np.zeros(len(counts), dtype=bool)
+
+        if self.count and symbols[0] == self.index:
+            counts[0] += self.count
+            run_same[0] &= self.same
+        elif self.count:
+            counts = np.concatenate(([self.count], counts))
+            symbols = np.concatenate(([self.index], symbols))
+            run_same = np.concatenate(([self.same], run_same))
+
+        self.count, self.index, self.same = int(counts[-1]), int(symbols[-1]), bool(run_same[-1])
+        return self._copy_runs(counts[:-1], symbols[:-1], run_same[:-1])
+
+    def flush(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        :return: The open run, if there is one
+        """
+        if self.count:
+            counts, symbols = self._copy_runs(np.array([self.count]), np.array([self.index]), np.array([self.same]))
+        else:
+            counts, symbols = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.intp)
+        if self.copy_count:
+            counts = np.append(counts, self.copy_count)
+            symbols = np.append(symbols, self.copy_index)
+
+        self.count, self.index, self.same, self.copy_count = 0, -1, False, 0
+        return counts, symbols
+
+    def _copy_runs(self, counts: np.ndarray, symbols: np.ndarray,
+                   run_same: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Turn the finished runs that match the line above into copy runs and merge neighbouring copy runs.
+        The last copy run is kept open.
+        """
+        if not self.row_delta:
+            return counts, symbols
+
+        symbols = np.where(run_same, self.copy_index, symbols)
+        if self.copy_count:
+            counts = np.concatenate(([self.copy_count], counts))
+            symbols = np.concatenate(([self.copy_index], symbols))
+            self.copy_count = 0
+        if not len(counts):
+            return counts, symbols
+
+        is_copy = symbols == self.copy_index
+        starts = np.flatnonzero(np.concatenate(([True], ~(is_copy[1:] & is_copy[:-1]))))
+        counts, symbols = np.add.reduceat(counts, starts), symbols[starts]
+
+        if symbols[-1] == self.copy_index:
+            self.copy_count = int(counts[-1])
+            return counts[:-1], symbols[:-1]
+        return counts, symbols
+
+
+def run_token(count: int, symbol: str) -> str:
+    """
+    :return: The `[count][symbol]` token of one run; a run of one pixel is written as just the symbol
+    """
+    return f"{count}{symbol}" if count > 1 else symbol
+
+
+class StringPacker:
+    """
+    Turn runs into `[count][symbol]` tokens and pack them into strings of at most `max_length` chars.
+
+    By default a string is closed as soon as the next token doesn't fit into it (same as the old encoder).
+    With `split_runs` the run that doesn't fit is split in two: the first part fills the string up to exactly
+    `max_length` chars, the rest starts the next string. Two runs of the same color in a row decode into the same
+    pixels, so the strings stay compatible with the printer.
+    """
+
+    def __init__(self, max_length: int = MaxStringLength, split_runs: bool = False):
+        self.max_length = max_length
+        self.split_runs = split_runs
+        self.parts: List[str] = []  # Tokens of the string that is being filled
+        self.length: int = 0  # Length of the string that is being filled
+
+        # Totals, for statistics
+        self.strings: int = 0
+        self.chars: int = 0
+
+    @property
+    def fill_ratio(self) -> float:
+        """
+        :return: How full the finished strings are on average (0 - 1)
+        """
+        return self.chars / (self.strings * self.max_length) if self.strings else 0.0
+
+    def feed(self, counts: np.ndarray, symbols: np.ndarray) -> List[str]:
+        """
+        :param counts: The length of every run
+        :param symbols: The symbol of every run
+        :return: The strings that got filled up
+        """
+        # A run of one pixel is written as just the symbol
+        tokens = np.char.add(np.where(counts > 1, counts.astype(str), ""), symbols)
+        ends = np.concatenate(([0], np.cumsum(np.char.str_len(tokens))))
+        tokens = tokens.tolist()
+
+        img_data: List[str] = []
+        start = 0
+        while start < len(tokens):
+            # The last token that still fits into the current string
+            end = int(np.searchsorted(ends, ends[start] + self.max_length - self.length, side="right")) - 1
+            self.parts.extend(tokens[start:end])
+            self.length += int(ends[end] - ends[start])
+            start = end
+            if start >= len(tokens):
+                break
+
+            room = self.max_length - self.length
+            if self.split_runs and room:
+                # Fill the string up with as many pixels of the run as fit into `room` chars:
+                # 1 char fits one pixel (just the symbol), `room` chars fit a count of `room - 1` digits
+                count, symbol = int(counts[start]), symbols[start]
+                first = 1 if room == 1 else 10 ** (room - 1) - 1
+                self.parts.append(run_token(first, symbol))
+                img_data.append(self._close())
+
+                rest = run_token(count - first, symbol)
+                self.parts.append(rest)
+                self.length = len(rest)
+                start += 1
+            else:
+                img_data.append(self._close())
+        return img_data
+
+    def flush(self) -> List[str]:
+        """
+        :return: The last, partially filled string
+        """
+        return [self._close()] if self.parts else []
+
+    def _close(self) -> str:
+        string = "".join(self.parts)
+        self.parts, self.length = [], 0
+        self.strings += 1
+        self.chars += len(string)
+        return string
+
+
 def progress_update(y: int, img: Image, prefix='Progress', suffix='', length=50) -> None:
     """
     Display a progress bar in the console
@@ -212,16 +468,43 @@ def progress_update(y: int, img: Image, prefix='Progress', suffix='', length=50)
         print(" " * (length + 30), end="\r")
 
 
-def quantize(img, ask_for_dither: bool = True, dither: int = 0, open_image: bool = True) -> Image:
+def quantize(img, ask_for_dither: bool = True, dither: Union[int, str] = 0, open_image: bool = True,
+             lookup: ColorLookup = None, strength: float = 1.0, run_weight: float = 0.0,
+             target_strings: int = None, vertical_print: bool = False, palette: Palette = None) -> Image:
+    """
+    Convert the image into `RR_PALETTE` colors (or the colors of `palette`)
+
+    :param img: The image
+    :param ask_for_dither: Ask the user if the image should be dithered
+    :param dither: 1 to dither (Floyd-Steinberg), 0 to just use the closest colors,
+        or one of `dithering.METHODS` for ordered dithering
+    :param open_image: Show the final image
+    :param lookup: Optional lookup table (built for the same palette) used instead of PIL when not dithering
+    :param strength: Strength of ordered dithering, see `dithering.ordered_dither`
+    :param run_weight: Use fewer runs (strings) at the cost of color error, instead of dithering;
+        see `run_quantizer.RunQuantizer`
+    :param target_strings: Like `run_weight`, but use the smallest weight that gets the image down to this many strings
+    :param vertical_print: The image will be encoded vertically; only used with `run_weight` and `target_strings`
+    :param palette: The palette, defaults to `RR_PALETTE`
+    :return: The converted image
+    """
+    palette = palette or DEFAULT_PALETTE
     img = img.convert("RGB")
 
     if ask_for_dither:
         dither = 0 if "n" in input("Dither the image? [y/n] ").lower() else 1
 
-    palette_image = Image.new("P", img.size)
-    palette_image.putpalette(ALL_COLORS)
-    new_image = img.quantize(palette=palette_image,
-                             dither=dither).convert("RGB")
+    if run_weight or target_strings:
+        new_image = run_aware_quantize(img, palette.rgb, run_weight, vertical_print, target_strings)
+    elif isinstance(dither, str):
+        new_image = ordered_dither(img, palette.rgb, method=dither, strength=strength)
+    elif lookup and not dither:
+        new_image = lookup.map_image(img)
+    else:
+        palette_image = Image.new("P", img.size)
+        palette_image.putpalette(palette.flat_colors)
+        new_image = img.quantize(palette=palette_image,
+                                 dither=dither).convert("RGB")
 
     if open_image:
         print("Opening the final image...")
@@ -230,11 +513,279 @@ def quantize(img, ask_for_dither: bool = True, dither: int = 0, open_image: bool
     return new_image
 
 
-def encode(img: Image, vertical_print: bool = False, dither_: bool = True) -> list[str] or None:
+def resolve_order(order: str = None, vertical_print: bool = False) -> str:
+    """
+    :param order: One of `scan_order.ORDERS`, or None
+    :param vertical_print: Encode the image vertically (the "column" order)
+    :return: The scan order to use; `order` if it's given, else "column" or "row" depending on `vertical_print`
+    """
+    return order or ("column" if vertical_print else "row")
+
+
+def iter_bands(img: Image, order: str = "row", band_size: int = BAND_SIZE,
+               lookup: ColorLookup = None, palette: Palette = None,
+               earlier: bool = False) -> Iterator[Union[np.ndarray, Tuple[np.ndarray, np.ndarray]]]:
+    """
+    Read the image `band_size` rows (columns for the "column" order) at a time
+
+    :param img: The image
+    :param order: The scan order, one of `scan_order.ORDERS`
+    :param band_size: Number of rows/columns per band; rounded up to a multiple of `scan_order.band_alignment`
+    :param lookup: Optional lookup table, see `palette_indices`
+    :param palette: The palette, defaults to `RR_PALETTE`
+    :param earlier: Also return the palette index one line earlier of every pixel (see `scan_order.previous_line`),
+        -1 in the first line, for `row_delta`
+    :return: Palette indices of every band, in the order the pixels get encoded; with `earlier` tuples of them and
+        the indices one line earlier, in the same order
+    """
+    alignment = band_alignment(order)
+    band_size = -(-band_size // alignment) * alignment
+
+    lines = img.width if order == "column" else img.height
+    last_line = np.full(img.height if order == "column" else img.width, -1, dtype=np.intp)
+    for start in range(0, lines, band_size):
+        end = min(start + band_size, lines)
+        band = img.crop((start, 0, end, img.height) if order == "column" else (0, start, img.width, end))
+        indices = palette_indices(band, lookup=lookup, palette=palette)
+        permutation = None if order == "row" else scan_permutation(band.width, band.height, order)
+        if not earlier:
+            yield indices if permutation is None else indices[permutation]
+            continue
+
+        # One line per row, the line before the first one is the last line of the band before
+        band_lines = indices.reshape(band.height, band.width)
+        band_lines = band_lines.T if order == "column" else band_lines
+        earlier_lines = np.concatenate((last_line[np.newaxis], band_lines[:-1]))
+        last_line = band_lines[-1]
+        earlier_indices = (earlier_lines.T if order == "column" else earlier_lines).ravel()
+        yield ((indices, earlier_indices) if permutation is None
+               else (indices[permutation], earlier_indices[permutation]))
+
+
+def iter_encode(img: Image, vertical_print: bool = False, order: str = None, band_size: int = BAND_SIZE,
+                lookup: ColorLookup = None, split_runs: bool = False, row_delta: bool = False,
+                stats: dict = None, palette: Palette = None) -> Iterator[str]:
+    """
+    Encode the image band by band and yield every {`MaxStringLength`}-char string as soon as it's full.
+    Memory used for encoding depends on the band size, not the size of the image.
+    The strings are the same as the ones from `encode`; the image has to be in palette colors already
+    (see `quantize`), off-palette pixels are mapped to the closest color.
+
+    :param img: The image to be encoded
+    :param vertical_print: Encode the image vertically (for Ashers printer)
+    :param order: The scan order, one of `scan_order.ORDERS`; overrides `vertical_print`
+    :param band_size: Number of rows/columns encoded at once
+    :param lookup: Optional lookup table, see `palette_indices`
+    :param split_runs: Fill every string up to exactly {`MaxStringLength`} chars by splitting runs, see `StringPacker`
+    :param row_delta: Use format v2, which copies pixels from the line above, see `RunLengthEncoder`.
+    Needs a printer that understands `COPY_SYMBOL` and copies from `scan_order.previous_line`
+    :param stats: Optional dict that gets filled with `pixels`, `runs`, `strings`, `chars` and `fill_ratio`
+    once encoding is done
+    :param palette: The palette, defaults to `RR_PALETTE`
+    :return: The strings
+    """
+    palette = palette or DEFAULT_PALETTE
+    order = resolve_order(order, vertical_print)
+    runs = RunLengthEncoder(row_delta, palette.copy_index)
+    packer = StringPacker(split_runs=split_runs)
+    pixels: int = 0
+    num_runs: int = 0
+
+    for band in iter_bands(img, order, band_size, lookup, palette, earlier=row_delta):
+        indices, earlier = band if row_delta else (band, None)
+        pixels += len(indices)
+        counts, symbols = runs.feed(indices, earlier)
+        num_runs += len(counts)
+        yield from packer.feed(counts, palette.run_symbols[symbols])
+
+    counts, symbols = runs.flush()
+    num_runs += len(counts)
+    yield from packer.feed(counts, palette.run_symbols[symbols])
+    yield from packer.flush()
+
+    if stats is not None:
+        stats.update(pixels=pixels, runs=num_runs, strings=packer.strings, chars=packer.chars,
+                     fill_ratio=packer.fill_ratio)
+
+
+def encode(img: Image, vertical_print: bool = False, dither_: bool = True, legacy: bool = False,
+           lookup: ColorLookup = None, split_runs: bool = False, row_delta: bool = False,
+           order: str = None, palette: Palette = None) -> list[str] or None:
     """
     Take an image and encode it into a list of {`MaxStringLength`}-char strings.
     ...[number of pixels][color]...
 
+    :param img: The image to be encoded.
+    :param vertical_print: Encode the image vertically (for Ashers printer)
+    :param dither_: Should the image be dithered
+    :param legacy: Use the old pixel-by-pixel encoder instead of the NumPy one. Both produce the same strings
+    :param lookup: Optional lookup table (built for the same palette) for mapping off-palette pixels,
+    see `color_lookup.get_lookup`
+    :param split_runs: Split runs at string boundaries so that every string is exactly {`MaxStringLength`} chars long
+    (fewer strings, not available with `legacy`)
+    :param row_delta: Use format v2 with "copy from the row above" runs (not available with `legacy`)
+    :param order: The scan order, one of `scan_order.ORDERS`; overrides `vertical_print` (not available with
+    `legacy`). To use the one with the fewest strings, see `encode_best_order`
+    :param palette: The palette, defaults to `RR_PALETTE` (not available with `legacy`)
+    :return: List of {`MaxStringLength`} char long strings
+    """
+    if legacy:
+        if palette:
+            raise ValueError("The legacy encoder only supports `RR_PALETTE`")
+        return encode_legacy(img, vertical_print=vertical_print, dither_=dither_)
+
+    if order == "auto":
+        # The strings can only be decoded and printed in the order they were encoded in, which this doesn't return
+        raise ValueError('Use `encode_best_order` for the "auto" scan order, it returns the order it chose')
+
+    if dither_:
+        img = quantize(img, lookup=lookup, palette=palette)
+
+    stats = {}
+    img_data = list(iter_encode(img, vertical_print, order, lookup=lookup, split_runs=split_runs,
+                                row_delta=row_delta, stats=stats, palette=palette))
+    print(f"Compressed {stats['pixels']} chars into {stats['runs']} chars")
+    print(f"Packed into {stats['strings']} strings ({stats['fill_ratio']:.1%} full)")
+
+    return img_data
+
+
+def cached_quantize(img: Image, dither: Union[int, str] = 0, cache: EncodeCache = None,
+                    strength: float = 1.0, run_weight: float = 0.0, target_strings: int = None,
+                    vertical_print: bool = False, palette: Palette = None) -> Image:
+    """
+    `quantize` that reuses the result from the last time the same image was converted
+
+    :param img: The image
+    :param dither: 1 to dither (Floyd-Steinberg), 0 to just use the closest colors,
+        or one of `dithering.METHODS` for ordered dithering
+    :param cache: The cache to use, defaults to `encode_cache.get_cache()`
+    :param strength: Strength of ordered dithering, see `dithering.ordered_dither`
+    :param run_weight: See `quantize`
+    :param target_strings: See `quantize`
+    :param vertical_print: See `quantize`
+    :param palette: The palette, defaults to `RR_PALETTE`
+    :return: The converted image
+    """
+    palette = palette or DEFAULT_PALETTE
+    cache = cache or get_cache()
+    key = cache.key(img, palette=palette.version, dither=dither, strength=strength, run_weight=run_weight,
+                    target_strings=target_strings, vertical_print=vertical_print)
+
+    new_image = cache.get_image(key)
+    if new_image is None:
+        new_image = quantize(img, ask_for_dither=False, dither=dither, open_image=False, strength=strength,
+                             run_weight=run_weight, target_strings=target_strings, vertical_print=vertical_print,
+                             palette=palette)
+        cache.put_image(key, new_image)
+    return new_image
+
+
+def iter_encode_cached(img: Image, vertical_print: bool = False, split_runs: bool = False, row_delta: bool = False,
+                       order: str = None, cache: EncodeCache = None, palette: Palette = None) -> Iterator[str]:
+    """
+    `iter_encode` that reuses the strings from the last time the same image was encoded with the same settings.
+    The strings are only cached once the whole image has been encoded.
+
+    :param img: The image to be encoded
+    :param vertical_print: Encode the image vertically (for Ashers printer)
+    :param split_runs: Fill every string up to exactly {`MaxStringLength`} chars, see `StringPacker`
+    :param row_delta: Use format v2, see `RunLengthEncoder`
+    :param order: The scan order, one of `scan_order.ORDERS`; overrides `vertical_print`
+    :param cache: The cache to use, defaults to `encode_cache.get_cache()`
+    :param palette: The palette, defaults to `RR_PALETTE`
+    :return: The strings
+    """
+    palette = palette or DEFAULT_PALETTE
+    cache = cache or get_cache()
+    order = resolve_order(order, vertical_print)
+    key = cache.key(img, palette=palette.version, order=order, split_runs=split_runs, row_delta=row_delta,
+                    copy_version=COPY_VERSION if row_delta else None, max_length=MaxStringLength)
+
+    img_data = cache.get_strings(key)
+    if img_data is not None:
+        yield from img_data
+        return
+
+    img_data = []
+    for string in iter_encode(img, order=order, split_runs=split_runs, row_delta=row_delta, palette=palette):
+        img_data.append(string)
+        yield string
+    cache.put_strings(key, img_data)
+
+
+def encode_best_order(img: Image, orders: Iterable[str] = ORDERS, split_runs: bool = False,
+                      row_delta: bool = False, parallel: bool = True,
+                      palette: Palette = None) -> Tuple[str, List[str]]:
+    """
+    Encode the image in every scan order and keep the one with the fewest strings.
+    On a tie the order that comes first in `orders` wins.
+
+    :param img: The image to be encoded, in palette colors
+    :param orders: Scan orders to try
+    :param split_runs: Fill every string completely, see `StringPacker`
+    :param row_delta: Use format v2, see `RunLengthEncoder`
+    :param parallel: Encode the orders in separate processes
+    :param palette: The palette, defaults to `RR_PALETTE`
+    :return: The best order and its strings
+    """
+    orders = list(orders)
+    arguments = [(img, False, order, BAND_SIZE, None, split_runs, row_delta, None, palette) for order in orders]
+    if parallel:
+        with ProcessPoolExecutor(max_workers=len(orders)) as executor:
+            results = list(executor.map(encode_list, *zip(*arguments)))
+    else:
+        results = [encode_list(*args) for args in arguments]
+
+    best = min(range(len(orders)), key=lambda i: len(results[i]))
+    return orders[best], results[best]
+
+
+def encode_list(*args, **kwargs) -> List[str]:
+    """
+    :return: All the strings of `iter_encode` (takes the same arguments)
+    """
+    return list(iter_encode(*args, **kwargs))
+
+
+def count_lists(strings: int, list_size: int = LIST_SIZE) -> int:
+    """
+    :param strings: Number of strings
+    :param list_size: Strings per list, `LIST_SIZE` for List Creates
+    :return: Number of lists needed for the strings; a full last list doesn't need another one
+    """
+    return -(-strings // list_size)
+
+
+def write_image_data(img_data: Iterable[str], path: str = "image_data.txt") -> List[str]:
+    """
+    Write strings into a file as they come in, one per line
+
+    :param img_data: The strings, e.g. from `iter_encode`
+    :param path: The file
+    :return: All the strings that were written
+    """
+    return list(iter_write_image_data(img_data, path))
+
+
+def iter_write_image_data(img_data: Iterable[str], path: str = "image_data.txt") -> Iterator[str]:
+    """
+    `write_image_data` that passes every string on as soon as it's written
+
+    :param img_data: The strings, e.g. from `iter_encode`
+    :param path: The file
+    :return: The strings
+    """
+    with open(path, "w", encoding="UTF-8") as strings_file:
+        for num, string in enumerate(img_data):
+            strings_file.write(f"\n{string}" if num else string)
+            yield string
+
+
+def encode_legacy(img: Image, vertical_print: bool = False, dither_: bool = True) -> list[str] or None:
+    """
+    Pixel-by-pixel version of `encode`. Slow, kept as a fallback for the NumPy encoder.
+
     :param img: The image to be encoded.
     :param vertical_print: Encode the image vertically (for Ashers printer)
     :param dither_: Should the image be dithered
@@ -304,6 +855,125 @@ def encode(img: Image, vertical_print: bool = False, dither_: bool = True) -> li
     return img_data
 
 
+def decode(img_data: Iterable[str], width: int, vertical_print: bool = False, order: str = None,
+           palette: Palette = None) -> Image:
+    """
+    Turn encoded strings back into an image. Reference decoder for the strings made by `encode`/`iter_encode`,
+    both the classic format and v2 (`row_delta`). "BEGIN" and "END" strings added for importing are skipped.
+
+    :param img_data: The encoded strings
+    :param width: The width of the image
+    :param vertical_print: The strings were encoded vertically
+    :param order: The scan order the strings were encoded in; overrides `vertical_print`
+    :param palette: The palette the strings were encoded with, defaults to `RR_PALETTE`
+    :return: The decoded image
+    :raises ValueError: If the strings are corrupted or don't fit the width
+    """
+    palette = palette or DEFAULT_PALETTE
+    text = "".join(string for string in img_data if string not in ("BEGIN", "END"))
+    codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32).astype(np.int64)
+    if not len(codes):
+        raise ValueError("There is no image data to decode")
+
+    is_digit = (codes >= ord("0")) & (codes <= ord("9"))
+    if is_digit[-1]:
+        raise ValueError("The image data ends with a count that has no color")
+
+    symbol_positions = np.flatnonzero(~is_digit)
+    symbol_codes = codes[symbol_positions]
+    symbol_indices = palette.symbol_indices
+    indices = np.where(symbol_codes < len(symbol_indices),
+                       symbol_indices[np.minimum(symbol_codes, len(symbol_indices) - 1)], -1)
+    if (indices < 0).any():
+        position = int(symbol_positions[np.argmax(indices < 0)])
+        raise ValueError(f"Unknown color symbol {text[position]!r} at char {position}")
+
+    # Every digit belongs to the count of the next symbol; its place value is its distance to that symbol
+    digit_positions = np.flatnonzero(is_digit)
+    owners = np.searchsorted(symbol_positions, digit_positions)
+    place_values = 10 ** (symbol_positions[owners] - digit_positions - 1)
+    counts = np.bincount(owners, weights=(codes[digit_positions] - ord("0")) * place_values,
+                         minlength=len(symbol_positions)).round().astype(np.int64)
+    has_count = np.zeros(len(symbol_positions), dtype=bool)
+    has_count[owners] = True
+    counts[~has_count] = 1  # No count means a single pixel
+
+    raster = np.repeat(indices, counts)
+    if len(raster) % width:
+        raise ValueError(f"The image data has {len(raster)} pixels, which is not a multiple of the width {width}")
+
+    # Copy runs (format v2): every copied pixel gets the pixel one line earlier, which can be copied itself
+    order = resolve_order(order, vertical_print)
+    height = len(raster) // width
+    copied = np.repeat(indices == palette.copy_index, counts)
+    if copied.any():
+        earlier = previous_line(width, height, order)
+        first_line = copied & (earlier < 0)
+        if first_line.any():
+            raise ValueError(f"Pixel {int(np.argmax(first_line))} copies from the line above, "
+                             f"but it's in the first line")
+        # Follow the copies back to a pixel that isn't copied; the pixel one line earlier always comes first, so
+        # every chain ends, and doubling the steps each round takes log2(height) rounds
+        sources = np.where(copied, earlier, np.arange(len(raster)))
+        while True:
+            next_sources = sources[sources]
+            if np.array_equal(next_sources, sources):
+                break
+            sources = next_sources
+        raster = raster[sources]
+
+    return Image.fromarray(palette.colors[unscan(raster, width, height, order)].astype(np.uint8))
+
+
+def verify(img: Image, img_data: List[str], vertical_print: bool = False, order: str = None,
+           palette: Palette = None) -> int:
+    """
+    Decode the strings and compare them to the image they were encoded from, pixel by pixel.
+    Pixels of `img` that aren't in the palette are compared as their closest color.
+
+    :param img: The (quantized) image that was encoded
+    :param img_data: The encoded strings
+    :param vertical_print: The strings were encoded vertically
+    :param order: The scan order the strings were encoded in; overrides `vertical_print`
+    :param palette: The palette the strings were encoded with, defaults to `RR_PALETTE`
+    :return: Number of pixels that are different
+    :raises ValueError: If the strings are corrupted or don't fit the width of the image
+    """
+    decoded = decode(img_data, img.width, vertical_print, order, palette)
+    if decoded.size != img.size:
+        raise ValueError(f"The image data decodes into a {decoded.width}x{decoded.height} image, "
+                         f"expected {img.width}x{img.height}")
+
+    expected = palette_indices(img, palette=palette).reshape(img.height, img.width)
+    actual = palette_indices(decoded, palette=palette).reshape(img.height, img.width)
+    return int((expected != actual).sum())
+
+
+def compare_formats(img: Image, vertical_print: bool = False, split_runs: bool = False, order: str = None,
+                    palette: Palette = None) -> dict:
+    """
+    Encode the image in the classic format and in format v2 (`row_delta`) and compare them
+
+    :param img: The image to be encoded, in palette colors
+    :param vertical_print: Encode the image vertically
+    :param split_runs: Fill every string completely, see `StringPacker`
+    :param order: The scan order, one of `scan_order.ORDERS`; overrides `vertical_print`
+    :param palette: The palette, defaults to `RR_PALETTE`
+    :return: Stats of both formats (see `iter_encode`) and the strings saved by v2
+    """
+    report = {}
+    for name, row_delta in (("classic", False), ("row_delta", True)):
+        stats = {}
+        for _ in iter_encode(img, vertical_print, order, split_runs=split_runs, row_delta=row_delta, stats=stats,
+                             palette=palette):
+            pass
+        report[name] = stats
+    report["strings_saved"] = report["classic"]["strings"] - report["row_delta"]["strings"]
+    print(f"Classic: {report['classic']['strings']} strings, row delta (v2): {report['row_delta']['strings']} strings "
+          f"({report['strings_saved']} fewer)")
+    return report
+
+
 def main(list_size: int, output_strings: bool = False, wait_for_input: bool = False):
     """
     Function to tie together all others.
@@ -318,10 +988,15 @@ def main(list_size: int, output_strings: bool = False, wait_for_input: bool = Fa
     if not img:
         exit()
 
-    img_data: list[str] = encode(img)
+    dither: int = 0 if "n" in input("Dither the image? [y/n] ").lower() else 1
+    img = cached_quantize(img, dither)
+    print("Opening the final image...")
+    img.show()
 
-    with open("image_data.txt", "w", encoding="UTF-8") as strings_file:
-        strings_file.writelines("\n".join(img_data))
+    time_at_start = time.time()
+    img_data: list[str] = write_image_data(iter_encode_cached(img))
+    job_history.record("encode", time.time() - time_at_start, pixels=img.width * img.height, strings=len(img_data),
+                       chars=sum(map(len, img_data)), source=getattr(img, "filename", None))
 
     if output_strings:
         print("Copying strings\n_______________\n")
@@ -332,6 +1007,7 @@ def main(list_size: int, output_strings: bool = False, wait_for_input: bool = Fa
     # Print amount of {`MaxStringLength`} char long strings, image dimensions and total `List Create`s needed.
     print(f"\nGenerated {len(img_data) + 2} strings for image WxH {img.width}x{img.height}")
     print(f"Space needed: {len(img_data) // list_size} Lists (+ {len(img_data) % list_size})")
+    print("\n".join(job_history.describe_plan(job_history.plan(img_data))))
 
     if wait_for_input:
         input("Press enter to continue")
@@ -3,13 +3,16 @@ import time
 from pathlib import Path
 from tkinter import *
 from tkinter import messagebox, filedialog, Button, IntVar, Tk
-from typing import List, Tuple
+from typing import Iterator, List, Optional, Tuple
 
 from PIL import ImageTk
 
 import Encoding
 import Importing
 import List_Create_Importing
+import auto_scale
+import job_history
+from pipeline import EncodePipeline, encode_strings
 
 IMAGE = None
 DITHERED_IMAGE = None
@@ -77,6 +80,26 @@ def scale():
         update_image_button()
         win2.destroy()
 
+    def fit_to_capacity_():
+        global IMAGE
+        try:
+            lists: int = int(fit_to_capacity_lists_in.get())
+        except ValueError:
+            return
+        target = "variable" if fit_to_capacity_target.get() == "Variable" else "list_create"
+        # Without "Keep Detail" only the closest colors are tried, with it also the selected dither method
+        dithers = [0, DITHER_METHODS[dither_method.get()]] if keep_detail.get() else [0]
+        result = auto_scale.fit_to_capacity(IMAGE, target, lists, dithers)
+        IMAGE = IMAGE.resize((result["width"], result["height"]))
+        # The size only fits with the dither mode it was found with
+        keep_detail.set(1 if result["dither"] else 0)
+        update_image_button()
+        win2.destroy()
+        messagebox.showinfo("Fit To Capacity",
+                            f"Scaled to {result['width']}x{result['height']}\n"
+                            f"{result['strings']}/{result['capacity']} strings ({result['lists']} Lists)\n"
+                            f"EST. import time: {job_history.format_duration(result['import_seconds'])}")
+
     # Scale to WIDTH and HEIGHT
     scale_to_w_h = Button(win2, text="Scale To Width & Height", width=25, command=scale_to_w_h_)
     scale_to_w_l = Label(win2, text="Width:")
@@ -111,9 +134,33 @@ def scale():
     fit_to_height_l.grid(row=fit_to_height_row, column=1)
     fit_to_height_in.grid(row=fit_to_height_row, column=2, padx=10)
 
+    # Fit to the space available in RecRoom
+    fit_to_capacity = Button(win2, text="Fit To Capacity", width=25, command=fit_to_capacity_)
+    fit_to_capacity_target = StringVar(win2, value="Variable")
+    fit_to_capacity_menu = OptionMenu(win2, fit_to_capacity_target, "Variable", "List Create")
+    fit_to_capacity_lists_l = Label(win2, text="Lists:")
+    fit_to_capacity_lists_in = Entry(win2, width=5)
+    fit_to_capacity_lists_in.insert(0, str(auto_scale.LIST_CAPACITY))
+
+    fit_to_capacity_row: int = 3
+    fit_to_capacity.grid(row=fit_to_capacity_row, column=0, pady=10)
+    fit_to_capacity_menu.grid(row=fit_to_capacity_row, column=1, columnspan=2)
+    fit_to_capacity_lists_l.grid(row=fit_to_capacity_row, column=3)
+    fit_to_capacity_lists_in.grid(row=fit_to_capacity_row, column=4, padx=10)
+
+
+def strings_to_import(begin_end: bool) -> Iterator[str]:
+    """
+    :param begin_end: Start with "BEGIN" and end with "END"
+    :return: The encoded strings; if the image isn't encoded yet, it's encoded while the strings are taken
+    """
+    if IMG_DATA or DITHERED_IMAGE is None:
+        return iter(["BEGIN", *IMG_DATA, "END"] if begin_end else IMG_DATA)
+    return encode_strings(DITHERED_IMAGE, begin_end=begin_end, path=None, source=str(IMAGE_PATH))
+
 
 def importing():
-    global importing_, warned
+    global importing_, warned, IMG_DATA
 
     if importing_.get() == 0:
         messagebox.showerror("No Selection", "You must select one of the two ways of importing.")
@@ -131,10 +178,14 @@ def importing():
                                        "If you proceed, the default coordinates will be used - only for 16:9 monitors.")
                 warned = True
                 return
-        IMG_DATA.insert(0, "BEGIN")
-        IMG_DATA.append("END")
         time.sleep(1)
-        Importing.copy_into_rr_variable(IMG_DATA, ask_for_coords_calibration=False, ask_to_continue=False)
+        with EncodePipeline(strings_to_import(begin_end=True)) as strings:
+            try:
+                Importing.copy_into_rr_variable(strings, ask_for_coords_calibration=False, ask_to_continue=False)
+            except RuntimeError as error:
+                # A string didn't reach Rec Room, the journal ends at the one before it
+                messagebox.showerror("Import Stopped", str(error))
+                return
 
     elif importing_.get() == 2:
         print("List Create importing")
@@ -143,24 +194,56 @@ def importing():
                                                                 "List Create Importing.\n"
                                                                 "Use Variable Importing instead.")
             return
-        List_Create_Importing.copy_to_recroom(IMG_DATA, ask_to_continue=False)
+        with EncodePipeline(strings_to_import(begin_end=False)) as strings:
+            try:
+                List_Create_Importing.copy_to_recroom(strings, ask_to_continue=False)
+            except RuntimeError as error:
+                # A string didn't reach Rec Room, the journal ends at the one before it
+                messagebox.showerror("Import Stopped", str(error))
+                return
+
+    if strings.complete and not IMG_DATA:
+        # The image was encoded while importing, keep the strings for the next import
+        IMG_DATA = [string for string in strings.strings if string not in ("BEGIN", "END")]
+
+
+def update_import_options(plan: Optional[dict]):
+    # Show the space needed and the estimated import time (see `job_history.plan`) for every way of importing
+    if plan is None:
+        # Not encoded yet, the image will be encoded while it's imported
+        variable_import["text"] = "Variable Importing\nSpace Needed: Encoded While Importing\n" \
+                                  "Available Space: 2500 Strings"
+        list_create_import["text"] = "List Create Importing\nSpace Needed: Encoded While Importing\n" \
+                                     "Available Space: 40 Lists"
+        return
+    variable_import["text"] = f"Variable Importing\n" \
+                              f"Space Needed: {len(IMG_DATA)} Strings\n" \
+                              f"Available Space: 2500 Strings\n" \
+                              f"EST. import time: {job_history.format_duration(plan['variable']['import_seconds'])}"
+
+    list_create_import["text"] = f"List Create Importing\n" \
+                                 f"Space Needed: {Encoding.count_lists(len(IMG_DATA))} Lists\n" \
+                                 f"Available Space: 40 Lists\n" \
+                                 f"EST. import time: " \
+                                 f"{job_history.format_duration(plan['list_create']['import_seconds'])}"
 
 
 def encoding():
     global IMG_DATA, save_data, empty2, variable_import, list_create_import, import_data, data_info, tab_to_recroom, \
         IMG_DATA_UNCUT, time_for_print
 
-    IMG_DATA = Encoding.encode(img=DITHERED_IMAGE, dither_=False)
+    time_at_start = time.time()
+    IMG_DATA = list(Encoding.iter_encode_cached(DITHERED_IMAGE))
+    job_history.record("encode", time.time() - time_at_start, pixels=DITHERED_IMAGE.width * DITHERED_IMAGE.height,
+                       strings=len(IMG_DATA), chars=sum(map(len, IMG_DATA)), source=str(IMAGE_PATH))
 
-    data_info["text"] = f"Generated {len(IMG_DATA)} strings ({len(IMG_DATA) // 64 + 1} List Creates)"
+    data_info["text"] = f"Generated {len(IMG_DATA)} strings ({Encoding.count_lists(len(IMG_DATA))} List Creates)"
     data_info.grid(row=7, column=1, columnspan=2, sticky=W)
     save_data.grid(row=8, column=0, sticky=W)
 
-    main_delay: float = 0.025
-    min_for_print: float = (len(''.join(IMG_DATA)) * (main_delay * 2 + main_delay / 2)) / 60
-    time_for_print["text"] = f"EST. time needed to print (delay: {main_delay}):\n" \
-                             f"{int(min_for_print // 60)} hours,\n" \
-                             f"{round(min_for_print % 60, 1)} minutes."
+    plan = job_history.plan(IMG_DATA)
+    time_for_print["text"] = f"EST. time needed to print:\n" \
+                             f"{job_history.format_duration(plan['variable']['print_seconds'])}"
     time_for_print.grid(row=7, column=3, columnspan=2, rowspan=3, sticky=N)
 
     empty2.grid(row=9, columnspan=4)
@@ -170,13 +253,7 @@ def encoding():
 
     tab_to_recroom.grid(row=11, column=1, columnspan=4)
 
-    variable_import["text"] = f"Variable Importing\n" \
-                              f"Space Needed: {len(IMG_DATA)} Strings\n" \
-                              f"Available Space: 2500 Strings"
-
-    list_create_import["text"] = f"List Create Importing\n" \
-                                 f"Space Needed: {len(IMG_DATA) // 64 + 1} Lists\n" \
-                                 f"Available Space: 40 Lists"
+    update_import_options(plan)
 
 
 def save_image_data():
@@ -213,9 +290,10 @@ def save_new_image():
 
 
 def dither_image():
-    global IMAGE, keep_detail, DITHERED_IMAGE, save_image, d_image_button, save_data, encode, empty
+    global IMAGE, keep_detail, DITHERED_IMAGE, save_image, d_image_button, save_data, encode, empty, IMG_DATA
 
-    DITHERED_IMAGE = Encoding.quantize(IMAGE, ask_for_dither=False, dither=keep_detail.get(), open_image=False)
+    dither = DITHER_METHODS[dither_method.get()] if keep_detail.get() else 0
+    DITHERED_IMAGE = Encoding.cached_quantize(IMAGE, dither=dither)
 
     if d_image_button:
         # If the dithered image button/image already exists, delete it
@@ -235,6 +313,17 @@ def dither_image():
     if save_data:
         save_data["text"] = "Save Encoded Data"
 
+    # The strings of the last image are outdated; importing now encodes the image while it's imported (see `pipeline`)
+    IMG_DATA = []
+    data_info.grid_forget()
+    time_for_print.grid_forget()
+    empty2.grid(row=9, columnspan=4)
+    variable_import.grid(row=9, column=0, sticky=W, pady=(20, 0))
+    list_create_import.grid(row=10, column=0, columnspan=3, sticky=W)
+    import_data.grid(row=11, column=0, sticky=W)
+    tab_to_recroom.grid(row=11, column=1, columnspan=4)
+    update_import_options(None)
+
 
 def image():
     global IMAGE, keep_detail, keep_detail, dither_button, image_button, load_image, image_info, load_from_txt_file, \
@@ -267,6 +356,7 @@ def image():
 
     dither_button.grid(row=3, column=2, sticky=S)
     keep_detail_button.grid(row=4, column=2, sticky=N)
+    dither_method_menu.grid(row=5, column=2, sticky=N)
 
     image_info["text"] = f"Width: {IMAGE.width}\nHeight: {IMAGE.height}"
     image_info.grid(row=1, column=2, sticky=S)
@@ -294,7 +384,7 @@ def load_from_file():
     load_from_txt_file["text"] = "Loaded"
     load_from_txt_file.grid(row=0, padx=0, pady=0)
 
-    txt_data_info["text"] = f"Found {len(IMG_DATA)} strings ({len(IMG_DATA) // 64 + 1} Lists)"
+    txt_data_info["text"] = f"Found {len(IMG_DATA)} strings ({Encoding.count_lists(len(IMG_DATA))} Lists)"
     txt_data_info.grid(row=0, column=1)
 
     empty2.grid(row=6, columnspan=4)
@@ -303,13 +393,7 @@ def load_from_file():
     import_data.grid(row=9, column=0, sticky=W)
     tab_to_recroom.grid(row=9, column=1, columnspan=4)
 
-    variable_import["text"] = f"Variable Importing\n" \
-                              f"Space Needed:{len(IMG_DATA)} Strings\n" \
-                              f"Available Space: 2500 Strings"
-
-    list_create_import["text"] = f"List Create Importing\n" \
-                                 f"Space Needed: {len(IMG_DATA) // 64 + 1} Lists\n" \
-                                 f"Available Space: 40 Lists"
+    update_import_options(job_history.plan(IMG_DATA))
 
 
 # Create the main window, add title, make it un-resizable, put it on top, place in center of screen
@@ -338,6 +422,12 @@ save_data: Button = Button(win, text="Save Encoded Data", width=25, command=save
 keep_detail: IntVar = IntVar()
 keep_detail_button: Checkbutton = Checkbutton(win, text="Keep Detail", variable=keep_detail)
 
+# How to keep detail - Floyd-Steinberg or ordered dithering (fewer strings)
+DITHER_METHODS = {"Floyd-Steinberg": 1, "Bayer 2x2": "bayer2", "Bayer 4x4": "bayer4", "Bayer 8x8": "bayer8",
+                  "Blue Noise": "blue-noise"}
+dither_method: StringVar = StringVar(value="Floyd-Steinberg")
+dither_method_menu: OptionMenu = OptionMenu(win, dither_method, *DITHER_METHODS)
+
 # Create a button to convert the image into RecRoom colors
 dither_button: Button = Button(win, text="Dither Image", width=25, command=dither_image)
 
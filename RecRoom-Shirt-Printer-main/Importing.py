@@ -1,19 +1,14 @@
-import ctypes
-import json
-import time
-from typing import NamedTuple, Tuple, Dict, List
-
-import pyautogui
-import pyperclip
-from PIL import ImageGrab
+import argparse
+from typing import NamedTuple, Optional, Tuple, Dict, Iterable, List, Sized
 
 import Encoding
-from common import is_window_active, color_in_coords
-
-# Check if the users monitor is 1440p or 1080p
-user32 = ctypes.windll.user32
-user32.SetProcessDPIAware()
-SCREEN_DIMENSIONS: Tuple[int, int] = user32.GetSystemMetrics(0), user32.GetSystemMetrics(1)
+import job_history
+import ui_state
+from backend import Backend, Coords, DesktopBackend, get_backend, set_backend
+from common import copy_to_clipboard, corners_to_box, load_coordinates
+from focus_monitor import get_monitor
+from import_journal import JOURNAL_PATH, ImportJournal
+from telemetry import TRACE_PATH, Tracer
 
 
 class Colors(NamedTuple):
@@ -22,45 +17,89 @@ class Colors(NamedTuple):
     green = (187, 205, 182)  # The Variable Input field sometimes turns green - this is that color.
 
 
-def copy_into_rr_variable(img_data: list[str], delay: float = 0.3, pause_at_50: bool = False,
+class VariableLayout(NamedTuple):
+    input_field: Coords  # The "Value" box of the Variable
+    confirm_expand_button: Coords  # The two arrows ↕ that confirm the value
+    color_check: List[Coords]  # [(top_left_corner), (bottom_right_corner)] of the pixels that show the pasted text
+
+    @classmethod
+    def preset(cls, width: int, height: int) -> "VariableLayout":
+        """
+        :return: The old, pre-made button coordinates only meant for 16:9 display aspect ratios
+        """
+        return cls(input_field=(int(width * 0.5), int(height * 0.4763)),
+                   confirm_expand_button=(int(width * 0.8589), int(height * 0.0631)),
+                   color_check=[(int(width * 0.0933), int(height * 0.3638)),
+                                (int(width * 0.1046), int(height * 0.3777))])
+
+    @classmethod
+    def from_coordinates(cls, coords: Dict[str, Coords]) -> "VariableLayout":
+        """
+        :param coords: The coordinates from `Coordinate_Calibration`
+        """
+        return cls(input_field=coords["InputField"],
+                   confirm_expand_button=coords["DoneButton"],
+                   color_check=[(coords["InputField"][0] - 10, coords["InputField"][1] - 10),
+                                (coords["InputField"][0] + 300, coords["InputField"][1] + 200)])
+
+
+def variable_field(backend: Backend, layout: VariableLayout,
+                   timeout: float = ui_state.STEP_TIMEOUT) -> ui_state.UIState:
+    """
+    States of the "Value" field, as seen in `layout.color_check`:
+        open - the white (or green) field is shown
+        pasted - there is text in the field
+        closed - the text is gone, the value was confirmed
+    """
+    box = corners_to_box(layout.color_check)
+    return ui_state.UIState(backend, {
+        ui_state.OPEN: lambda: ui_state.has_color(backend, box, Colors.white, Colors.green, Colors.text),
+        ui_state.PASTED: lambda: ui_state.has_color(backend, box, Colors.text),
+        ui_state.CLOSED: lambda: ui_state.negate(ui_state.has_color(backend, box, Colors.text))
+    }, timeout=timeout)
+
+
+def copy_into_rr_variable(img_data: Iterable[str], delay: float = 0.3, pause_at_50: bool = False,
                           stop_at_500: bool = False, ask_for_coords_calibration: bool = True,
-                          ask_to_continue: bool = True):
+                          ask_to_continue: bool = True, backend: Backend = None, layout: VariableLayout = None,
+                          record_session: bool = True, timeout: float = ui_state.STEP_TIMEOUT,
+                          resume: bool = False, journal_path: Optional[str] = JOURNAL_PATH,
+                          trace_path: Optional[str] = TRACE_PATH) -> Dict:
     """
     Function copies strings of data into the RecRoom Variable.
+    Every step goes on as soon as the field shows that it's done (see `variable_field`).
 
-    :param img_data: A list of strings to be imported into RecRoom
-    :param delay: The delay between main actions (click > copy > confirm)
+    :param img_data: The strings to be imported into RecRoom; a list, or any iterable that makes them while they're
+        imported (e.g. a `pipeline.EncodePipeline`)
+    :param delay: Longest wait for the input field to open, and the pause before a failed step is tried again
     :param pause_at_50: Should the script pause for a given amount of time every 50 imported strings
     (could prevent disconnection)
     :param stop_at_500: Should the script full stop every 500 imported strings, and wait for the user to press enter
     (could prevent disconnection)
     :param ask_for_coords_calibration: If there's no `coordinates.json`, remind user
     :param ask_to_continue: Should the user be asked when they want to continue
+    :param backend: Mouse, keyboard and screen, defaults to `backend.get_backend()`
+    :param layout: Where the buttons are; defaults to `coordinates.json`, or the 16:9 preset if there is none
+    :param record_session: Save the session in the job history
+    :param timeout: Seconds to wait for the game to show a pasted or confirmed string before trying again
+    :param resume: Start after the last string in the journal (if it's a journal of the same strings)
+    :param journal_path: Where every confirmed string is journaled, None for no journal
+    :param trace_path: Where every step is traced (see `telemetry`), None for no trace
+    :return: `imported` strings, `retries`, `seconds` (without the pauses and the time out of focus),
+        `copy_seconds` (spent copying into the clipboard) and `focus_losses`
     """
-
-    # These are the old, pre-made button coordinates only meant for 16:9 display aspect ratios
-    input_field: Tuple[int, int] = (int(SCREEN_DIMENSIONS[0] * 0.5),
-                                    int(SCREEN_DIMENSIONS[1] * 0.4763))
-    confirm_expand_button: Tuple[int, int] = (int(SCREEN_DIMENSIONS[0] * 0.8589),
-                                              int(SCREEN_DIMENSIONS[1] * 0.0631))
-
-    color_check: List[Tuple[int, int]] = [(int(SCREEN_DIMENSIONS[0] * 0.0933), int(SCREEN_DIMENSIONS[1] * 0.3638)),
-                                          (int(SCREEN_DIMENSIONS[0] * 0.1046), int(SCREEN_DIMENSIONS[1] *   0.3777))]
+    backend = backend or get_backend()
+    screen_dimensions: Tuple[int, int] = backend.screen_size()
 
     # Check if there's a `coordinates.json` file; if there is -> use the coords written in there
-    try:
-        # Read the file for coordinates
-        with open("coordinates.json", "r") as coords_file:
-            coords: Dict[str, Tuple[int, int]] = json.load(coords_file)
-            input_field = coords["InputField"]
-            confirm_expand_button = coords["DoneButton"]
-            color_check: List[Tuple[int, int]] = [(coords["InputField"][0] - 10, coords["InputField"][1] - 10),
-                                                  (coords["InputField"][0] + 300, coords["InputField"][1] + 200)]
-            print("Reading coordinates from `coordinates.json`...")
-
-    except FileNotFoundError:
+    coords = load_coordinates() if layout is None else None
+    if coords:
+        layout = VariableLayout.from_coordinates(coords)
+        print("Reading coordinates from `coordinates.json`...")
+    elif layout is None:
+        layout = VariableLayout.preset(*screen_dimensions)
         if ask_for_coords_calibration:
-            if round(SCREEN_DIMENSIONS[0] / SCREEN_DIMENSIONS[1], 2) != 1.78:
+            if round(screen_dimensions[0] / screen_dimensions[1], 2) != 1.78:
                 # If there's no file, the user hasn't calibrated coordinates yet. Ask to continue using preset or exit.
                 if input("`coordinates.json` file not found.\n"
                          "You didn't calibrate the button coordinates yet.\n"
@@ -70,87 +109,126 @@ def copy_into_rr_variable(img_data: list[str], delay: float = 0.3, pause_at_50:
                          '(only for monitors with a 16:9 aspect ratio)\n'
                          '[default: y] > ').lower().find("n") == -1:
                     exit()
+    input_field, confirm_expand_button = layout.input_field, layout.confirm_expand_button
+    field = variable_field(backend, layout, timeout)
 
-    num_strings: int = len(img_data)
-    sec_to_import: float = delay * 3 * num_strings
-    print(f"Minimum time needed for importing: {int(sec_to_import // 60)} minutes, {int(sec_to_import % 60)} seconds")
+    def confirm() -> None:
+        # Click on the "confirm" area and move the mouse out of the way
+        backend.click(*confirm_expand_button)
+        backend.move(0, int(screen_dimensions[1] / 3))
+        backend.scroll(-500)
+
+    # A stream of strings (still being encoded) has no length yet
+    num_strings: Optional[int] = len(img_data) if isinstance(img_data, Sized) else None
+    if num_strings is not None:
+        sec_to_import: float = job_history.plan(img_data, delay=delay)["variable"]["import_seconds"]
+        print(f"Estimated time needed for importing: {job_history.format_duration(sec_to_import)}")
 
     if ask_to_continue:
-        if input(f"\nProceed to copy all {num_strings} strings to RecRoom? [y/n] ").lower() == "n":
-            return
-
-    time_at_start = time.time()
-
-    "########################CONTINUE###########################"
-    # If you want to continue from an existing string, set `continue_from` to `False`
-    # and enter the string into the bottom `if` statement
-    start_from_beginning: bool = True
-    continue_from_string: str = "|Enter the string here|"
-    "###########################################################"
-
-    for num, string in enumerate(img_data):
-        is_window_active("Rec Room")
-
-        if start_from_beginning or continue_from_string in string:
-            start_from_beginning = True
-        else:
-            continue
-
-        # Copy current string into clipboard
-        pyperclip.copy(string)
-        print(f"Copying string #{num}/{num_strings - 1}")
-
-        # In RR, click on the input field
-        pyautogui.click(input_field)
-        time.sleep(delay)
-
-        # Max 10 tries to successfully copy the string
-        for _ in range(10):
-            # Paste the string into input
-            pyautogui.hotkey("ctrl", "v")
-            time.sleep(delay)
-            if color_in_coords(image=ImageGrab.grab(),
-                               color=Colors.text,
-                               coordinates=color_check):
-                break
-            print("Failed copy")
-            pyautogui.scroll(-500)
-            pyautogui.click(input_field)
-            pyautogui.hotkey("ctrl", "a")
-            time.sleep(delay * 2)
-
-        # Max 10 tries to successfully confirm the string
-        for _ in range(10):
-            # Click on the "confirm" area
-            pyautogui.click(confirm_expand_button)
-            time.sleep(delay / 2)
-            pyautogui.move(0, int(SCREEN_DIMENSIONS[1] / 3))
-            pyautogui.scroll(-500)
-            time.sleep(delay)
-            if not color_in_coords(image=ImageGrab.grab(),
-                                   color=Colors.text,
-                                   coordinates=color_check):
-                break
-            print("Failed confirm")
-            time.sleep(delay * 2)
-
-        # Optional:
-
-        if stop_at_500 and num and num % 500 == 0:
-            # Every 500 entries stop and let the player continue when they see fit
-            input("Stopped. Press enter to continue")
-            continue
-        if pause_at_50 and num and num % 50 == 0:
-            # Every 50 entries give RR some time to process and catch up. Could prevent crashing :shrug:
-            time.sleep(30)
-
-    time_to_copy = time.time() - time_at_start
+        count = f"all {num_strings}" if num_strings is not None else "the"
+        if input(f"\nProceed to copy {count} strings to RecRoom? [y/n] ").lower() == "n":
+            return {"imported": 0, "retries": 0, "seconds": 0.0, "copy_seconds": 0.0, "focus_losses": 0}
+    journal = ImportJournal("variable", journal_path) if journal_path else None
+    pending = journal.pending(img_data, resume) if journal else enumerate(img_data)
+
+    time_at_start = backend.time()
+    imported: int = 0  # Strings imported in this session
+    imported_chars: int = 0
+    copy_seconds: float = 0.0
+    retries: int = 0  # Failed pastes and confirms
+    paused: float = 0.0  # Seconds spent in the optional pauses and out of focus, not part of the importing time
+    focus = get_monitor("Rec Room", backend)
+    losses_at_start = focus.losses
+    finished: bool = False
+    trace = Tracer(trace_path, "variable", backend, delay=delay)
+
+    focus.hold()  # Watches the focus in the background until the import ends
+    try:
+        for num, string in pending:
+            retries_before = retries
+            with trace.span("string", num) as string_span:
+                # Only waits if Rec Room isn't in focus
+                with trace.span("focus", num):
+                    paused += focus.wait()
+
+                # Copy current string into clipboard
+                with trace.span("clipboard", num) as span:
+                    copy_started = backend.time()
+                    failed_copies = copy_to_clipboard(string, backend, delay=delay)
+                    copy_seconds += backend.time() - copy_started
+                    retries += failed_copies
+                    span.ok = not failed_copies
+                print(f"Copying string #{num}" + (f"/{num_strings - 1}" if num_strings else ""))
+
+                # In RR, click on the input field
+                trace.ui_step(field, "click", num, lambda: backend.click(*input_field), ui_state.OPEN, timeout=delay)
+
+                # Max 10 tries to successfully copy the string
+                for attempt in range(10):
+                    # Paste the string into input
+                    if trace.ui_step(field, "paste", num, lambda: backend.hotkey("ctrl", "v"), ui_state.PASTED,
+                                     verify="verify", attempt=attempt):
+                        break
+                    print("Failed copy")
+                    retries += 1
+                    with trace.span("retry", num, after="paste"):
+                        backend.scroll(-500)
+                        backend.click(*input_field)
+                        backend.hotkey("ctrl", "a")
+                        backend.sleep(delay * 2)
+                else:
+                    raise RuntimeError(f"String #{num} could not be pasted after 10 tries, stopping the import. "
+                                       f"Run again with `--resume` to continue at this string")
+
+                # Max 10 tries to successfully confirm the string
+                for attempt in range(10):
+                    if trace.ui_step(field, "confirm", num, confirm, ui_state.CLOSED, attempt=attempt):
+                        break
+                    print("Failed confirm")
+                    retries += 1
+                    with trace.span("retry", num, after="confirm"):
+                        backend.sleep(delay * 2)
+                else:
+                    raise RuntimeError(f"String #{num} could not be confirmed after 10 tries, stopping the import. "
+                                       f"Run again with `--resume` to continue at this string")
+                string_span.fields["retries"] = retries - retries_before
+
+            imported += 1
+            imported_chars += len(string)
+            if journal:
+                journal.record(num, string)
+
+            # Optional:
+
+            pause_start = backend.time()
+            if stop_at_500 and num and num % 500 == 0:
+                # Every 500 entries stop and let the player continue when they see fit
+                input("Stopped. Press enter to continue")
+                paused += backend.time() - pause_start
+                continue
+            if pause_at_50 and num and num % 50 == 0:
+                # Every 50 entries give RR some time to process and catch up. Could prevent crashing :shrug:
+                backend.sleep(30)
+                paused += backend.time() - pause_start
+        finished = True
+    finally:
+        focus.release()
+        trace.close()
+        # Also save stopped sessions, they still tell how long every string took
+        if record_session:
+            job_history.record("import", backend.time() - time_at_start - paused, method="variable",
+                               strings=imported, chars=imported_chars, delay=delay, retries=retries,
+                               completed=finished)
+
+    time_to_copy = backend.time() - time_at_start
     minutes = time_to_copy // 60
     seconds = time_to_copy % 60
-    print(f"Copying complete. Copied {num_strings - 1} strings in {minutes} min and {seconds:.1f} sec")
+    print(f"Copying complete. Copied {imported} strings in {minutes} min and {seconds:.1f} sec")
+    return {"imported": imported, "retries": retries, "seconds": time_to_copy - paused, "copy_seconds": copy_seconds,
+            "focus_losses": focus.losses - losses_at_start}
 
 
-def main(from_file: bool = False):
+def main(from_file: bool = False, resume: bool = False):
     img_data: list[str]
     # Call function for encoding an image
     if not from_file:
@@ -168,10 +246,18 @@ def main(from_file: bool = False):
     img_data.insert(0, "BEGIN")
     img_data.append("END")
 
-    copy_into_rr_variable(img_data, delay=0.4, pause_at_50=False, stop_at_500=False)
+    copy_into_rr_variable(img_data, delay=0.4, pause_at_50=False, stop_at_500=False, resume=resume)
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import `image_data.txt` into a Rec Room Variable.")
+    parser.add_argument("--resume", action="store_true",
+                        help=f"Continue after the last imported string in `{JOURNAL_PATH}`")
+    parser.add_argument("--verify-clipboard", action="store_true",
+                        help="Read every string back from the clipboard before pasting it")
+    args = parser.parse_args()
+    if args.verify_clipboard:
+        set_backend(DesktopBackend(verify_clipboard=True))
     print("You're running `Importing.py` directly.\n"
           "This will take the encoded data in `image_data.txt` and import it.\n")
-    main(from_file=True)
+    main(from_file=True, resume=args.resume)
@@ -1,163 +1,270 @@
-import numpy as np
-
 
 try:
-    import ctypes
-    import time
-    from typing import Tuple, List
-
-    import pyautogui
-    import pyperclip
-    from PIL import ImageGrab
-    import cv2
+    import argparse
+    from itertools import chain
+    from typing import Dict, Iterable, NamedTuple, Optional, Sized, Tuple, List
 
     import Encoding
-    from common import setup_logger, is_window_active, color_in_coords
+    import job_history
+    import ui_state
+    from backend import Backend, Coords, DesktopBackend, get_backend, set_backend
+    from common import setup_logger, copy_to_clipboard, corners_to_box
+    from focus_monitor import get_monitor
+    from import_journal import JOURNAL_PATH, ImportJournal
+    from telemetry import TRACE_PATH, Tracer
+    from template_matcher import Match, TemplateMatcher
 except Exception as e:
     exit(input(f"ERROR: {e}"))
 
-done_button_ref = cv2.imread("done_button_original.png")
+# The "Done" button, tried at the size of the template first, then smaller and larger for other resolutions
+done_button = TemplateMatcher("done_button_original.png", threshold=0.8, scales=(1.0, 0.75, 1.5, 0.5))
 SCREEN_DIMENSIONS = []
 
 
-def monitor_check():
+def monitor_check(backend: Backend = None):
     global SCREEN_DIMENSIONS
     # Check if the users monitor is 1440p or 1080p
-    user32 = ctypes.windll.user32
-    user32.SetProcessDPIAware()
-    SCREEN_DIMENSIONS = user32.GetSystemMetrics(0), user32.GetSystemMetrics(1)
+    SCREEN_DIMENSIONS = (backend or get_backend()).screen_size()
     if round(SCREEN_DIMENSIONS[0] / SCREEN_DIMENSIONS[1], 2) != 1.78:
         return -1
     return 1
 
 
-Coords = Tuple[int, int]
+class ListCreateLayout(NamedTuple):
+    input_field: Coords  # The text field of the string editor
+    color_checking_coords: List[Coords]  # [(top_left_corner), (bottom_right_corner)] of the List Create entry
+
+    @classmethod
+    def preset(cls, width: int, height: int) -> "ListCreateLayout":
+        """
+        :return: Coordinates for all the buttons on a 16:9 screen
+        """
+        return cls(input_field=(int(width * 0.5), int(height * 0.34)),
+                   color_checking_coords=[(int(width * 0.25), int(height * 0.5)),
+                                          (int(width * 0.35), int(height * 0.5) + 5)])
+
+
+def entry_states(backend: Backend, layout: ListCreateLayout,
+                 timeout: float = ui_state.STEP_TIMEOUT) -> ui_state.UIState:
+    """
+    States of a List Create entry:
+        open, focused, pasted - the screen around the input field changed after clicking the entry, clicking the
+        input field and pasting
+        saved - the entry changed since the check was made (after the paste) and shows the purple string input
+        background, so an entry that had a string already doesn't count
+        empty - it doesn't show the purple background (after moving down to an entry without a string)
+    """
+    field_box = ui_state.region(layout.input_field)
+    entry_box = corners_to_box(layout.color_checking_coords)
+    purple = (157, 145, 187)  # String input background
+
+    def saved() -> ui_state.Check:
+        changed = ui_state.screen_changed(backend, entry_box)
+        is_purple = ui_state.has_color(backend, entry_box, purple, tolerance=60)
+        return lambda: changed() and is_purple()
+
+    return ui_state.UIState(backend, {
+        ui_state.OPEN: lambda: ui_state.screen_changed(backend, field_box),
+        ui_state.FOCUSED: lambda: ui_state.screen_changed(backend, field_box),
+        ui_state.PASTED: lambda: ui_state.screen_changed(backend, field_box),
+        ui_state.SAVED: saved,
+        ui_state.EMPTY: lambda: ui_state.negate(ui_state.has_color(backend, entry_box, purple, tolerance=60))
+    }, timeout=timeout)
+
 
 # Set this to false if you don't want color checking,
 # or if you're not in the `ListCreateImporting` room
 color_checking: bool = True
+NEXT_ATTEMPTS: int = 5  # Right-clicks to move down to the next entry before the import stops
+
 
+def find_done_button(backend: Backend = None) -> Optional[Match]:
+    """
+    Use image recognition to find the "Done" button
 
-def copy_to_recroom(img_data: list[str], delay: float = 0.3, last_successful_string: str or None = None,
-                    ask_to_continue: bool = True) -> None:
+    :param backend: The screen, defaults to `backend.get_backend()`
+    :return: Where the button is, None if it isn't on the screen
+    """
+    return done_button.find(backend)
+
+
+def copy_to_recroom(img_data: Iterable[str], delay: float = 0.3, ask_to_continue: bool = True, backend: Backend = None,
+                    layout: ListCreateLayout = None, record_session: bool = True,
+                    timeout: float = ui_state.STEP_TIMEOUT, resume: bool = False,
+                    journal_path: Optional[str] = JOURNAL_PATH, trace_path: Optional[str] = TRACE_PATH) -> Dict:
     """
     Function copies 512 char string into RecRoom List Creates.
+    Every step goes on as soon as the screen shows that it's done (see `entry_states`).
 
-    :param img_data: A list of strings of color data for each pixel
-    :param delay: The main delay between actions
-    :param last_successful_string: The last successfully copied string.
-           Useful if importing fails somewhere in the middle
+    :param img_data: The strings of color data for each pixel; a list, or any iterable that makes them while they're
+           imported (e.g. a `pipeline.EncodePipeline`)
+    :param delay: Longest wait for the steps that don't always show on the screen (opening the entry, clicking the
+           input field, pasting, moving down)
     :param ask_to_continue: Ask the user for input before starting copying
+    :param backend: Mouse, keyboard and screen, defaults to `backend.get_backend()`
+    :param layout: Where the buttons are, defaults to the 16:9 preset
+    :param record_session: Save the session in the job history
+    :param timeout: Seconds to wait for the purple background of a saved string before trying again
+    :param resume: Start after the last string in the journal (if it's a journal of the same strings).
+           Useful if importing fails somewhere in the middle
+    :param journal_path: Where every saved string is journaled, None for no journal
+    :param trace_path: Where every step is traced (see `telemetry`), None for no trace
+    :return: `imported` strings, `retries`, `seconds` (without the time out of focus), `copy_seconds` (spent copying
+        into the clipboard) and `focus_losses`
     """
     window_title = "Rec Room"
-    num_strings = len(img_data)
-    monitor_check()
-
-    # Coordinates for all the buttons
-    input_field: Coords = (int(SCREEN_DIMENSIONS[0] * 0.5), int(SCREEN_DIMENSIONS[1] * 0.34))
-    
-
-    color_checking_coords: List[Tuple[int, int]] = [(int(SCREEN_DIMENSIONS[0] * 0.25),
-                                                     int(SCREEN_DIMENSIONS[1] * 0.5)),
-                                                    (int(SCREEN_DIMENSIONS[0] * 0.35),
-                                                     int(SCREEN_DIMENSIONS[1] * 0.5) + 5)]
+    # A stream of strings (still being encoded) has no length yet
+    num_strings: Optional[int] = len(img_data) if isinstance(img_data, Sized) else None
+    backend = backend or get_backend()
+    monitor_check(backend)
+
+    layout = layout or ListCreateLayout.preset(*SCREEN_DIMENSIONS)
+    input_field = layout.input_field
+    entry = entry_states(backend, layout, timeout)
+
+    def click_done() -> None:
+        # Click "Done", then exit out of the input field menu
+        with trace.span("find_done", num) as span:
+            match = find_done_button(backend)
+            span.ok = match is not None
+        if match is None:
+            print("Image recognition failed: the Done button is not on the screen")
+        else:
+            backend.click(*match.center)
+
+            # Click the button using the found coordinates
+            print(f"Clicking button at coordinates: {match.left}, {match.top} ({match.confidence:.0%} sure)")
+            backend.click(match.left, match.top)
+            backend.click(161, 427)
+        backend.press("esc")
+
+    if num_strings is not None:
+        sec_to_import: float = job_history.plan(img_data, delay=delay)["list_create"]["import_seconds"]
+        print(f"Estimated time needed for importing: {job_history.format_duration(sec_to_import)}")
+
+    journal = ImportJournal("list_create", journal_path) if journal_path else None
+    pending = journal.pending(img_data, resume) if journal else enumerate(img_data)
+    if resume and journal:
+        # Tell where to continue before asking, so the entry can be selected first
+        first = next(pending, None)
+        if first is not None:
+            pending = chain([first], pending)
+            if first[0]:
+                print(f"Select entry #{first[0] % Encoding.LIST_SIZE + 1} of List Create "
+                      f"#{first[0] // Encoding.LIST_SIZE + 1} in {window_title}")
 
     if ask_to_continue:
-        if "n" in input(f"\nProceed to copy all {num_strings} strings to {window_title}? [y/n] ").lower():
-            return
-    time_at_start = time.time()
-
-    for num, string in enumerate(img_data):
-        # Every loop check if RecRoom is the window in focus.
-        is_window_active(window_title)
-
-        if last_successful_string:
-            # `last_successful_string` is not None
-            if last_successful_string in string:
-                # `last_successful_string` is in the current string -> set the var. to None
-                last_successful_string = None
-            else:
-                # `last_successful_string` is not in the current string -> move to the next string
-                continue
-        else:
-            # `last_successful_string` is None -> user did not enter any string to continue from
-            pass
-
-        # Copy current string into clipboard
-        pyperclip.copy(string)
-        print(f"Copying string #{num + 1}/{num_strings}")
-        time.sleep(delay)
-
-        for _ in range(10):
-            # Click `List Create` string entry
-            pyautogui.click()
-            time.sleep(delay)
-
-            # Click on the input field
-            pyautogui.click(input_field)
-            time.sleep(delay / 2)
-
-            # Paste the string into input field
-            pyautogui.hotkey("ctrl", "v")
-            time.sleep(delay)
-
-            # Click "Done"
-            try:
-            # Use image recognition to find the "Done" button's coordinates
-                screenshot = ImageGrab.grab()
-                screenshot_cv2 = np.array(screenshot)
-                screenshot_cv2 = cv2.cvtColor(screenshot_cv2, cv2.COLOR_RGB2BGR)
-                
-                match = cv2.matchTemplate(screenshot_cv2, done_button_ref, cv2.TM_CCOEFF_NORMED)
-                min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(match)
-                button_x, button_y = max_loc
-
-                # Calculate button center coordinates
-                button_width, button_height = done_button_ref.shape[1], done_button_ref.shape[0]
-                center_x = button_x + button_width // 2
-                center_y = button_y + button_height // 2
-                pyautogui.click(center_x, center_y)
-
-                # Click the button using the found coordinates
-                print(f"Clicking button at coordinates: {button_x}, {button_y}")
-                pyautogui.click(button_x, button_y)
-                pyautogui.click(161, 427)
-                
-                
-            except Exception as e:
-             print(f"Image recognition failed: {e}")
-            time.sleep(delay)
-
-
-            # Exit out of the input field menu
-            pyautogui.press("esc")
-            time.sleep(delay / 2)
-
-            if color_checking:
-                color_check_image = ImageGrab.grab()
-                # Check for `purple` (string input background)
-                if color_in_coords(image=color_check_image,
-                                   color=(157, 145, 187),
-                                   coordinates=color_checking_coords,
-                                   tolerance=60):
-                    break
-                print("Failed")
-                # time.sleep(delay)
-            else:
-                break
-
-        # Move down using trigger handle in right hand
-        pyautogui.click(button='right')
-        time.sleep(delay / 3)
+        count = f"all {num_strings}" if num_strings is not None else "the"
+        if "n" in input(f"\nProceed to copy {count} strings to {window_title}? [y/n] ").lower():
+            return {"imported": 0, "retries": 0, "seconds": 0.0, "copy_seconds": 0.0, "focus_losses": 0}
+    time_at_start = backend.time()
+    imported: int = 0  # Strings imported in this session
+    imported_chars: int = 0
+    copy_seconds: float = 0.0
+    retries: int = 0  # Failed attempts that had to be repeated
+    paused: float = 0.0  # Seconds out of focus, not part of the importing time
+    focus = get_monitor(window_title, backend)
+    losses_at_start = focus.losses
+    finished: bool = False
+    trace = Tracer(trace_path, "list_create", backend, delay=delay)
+    num = None  # Index of the string being imported, for the spans of `click_done`
+
+    focus.hold()  # Watches the focus in the background until the import ends
+    try:
+        for num, string in pending:
+            if color_checking and not imported and not entry.wait_for(ui_state.EMPTY, timeout=delay):
+                # A string saved into it couldn't be told apart from the one it has
+                raise RuntimeError(f"The selected entry already has a string, select an empty entry for string "
+                                   f"#{num + 1} and start again")
+            retries_before = retries
+            with trace.span("string", num) as string_span:
+                # Every loop check if RecRoom is the window in focus; only waits if it isn't
+                with trace.span("focus", num):
+                    paused += focus.wait()
+
+                # Copy current string into clipboard
+                with trace.span("clipboard", num) as span:
+                    copy_started = backend.time()
+                    failed_copies = copy_to_clipboard(string, backend, delay=delay)
+                    copy_seconds += backend.time() - copy_started
+                    retries += failed_copies
+                    span.ok = not failed_copies
+                print(f"Copying string #{num + 1}" + (f"/{num_strings}" if num_strings else ""))
+
+                for attempt in range(10):
+                    if color_checking and attempt and not entry.wait_for(ui_state.EMPTY, timeout=0):
+                        # The entry was empty before this string: the confirm of the last attempt was only slow
+                        break
+                    # Click `List Create` string entry
+                    trace.ui_step(entry, "click", num, backend.click, ui_state.OPEN, timeout=delay,
+                                  target="entry", attempt=attempt)
+
+                    # Click on the input field
+                    trace.ui_step(entry, "click", num, lambda: backend.click(*input_field), ui_state.FOCUSED,
+                                  timeout=delay / 2, target="input_field", attempt=attempt)
+
+                    # Paste the string into input field
+                    trace.ui_step(entry, "paste", num, lambda: backend.hotkey("ctrl", "v"), ui_state.PASTED,
+                                  timeout=delay, verify="verify", attempt=attempt)
+
+                    if not color_checking:
+                        with trace.span("confirm", num, attempt=attempt):
+                            click_done()
+                            backend.sleep(delay)
+                        break
+                    # Click "Done" and wait for `purple` (string input background)
+                    if trace.ui_step(entry, "confirm", num, click_done, ui_state.SAVED, attempt=attempt):
+                        break
+                    print("Failed")
+                    retries += 1
+                    with trace.span("retry", num, after="confirm"):
+                        backend.sleep(delay / 2)
+                else:
+                    raise RuntimeError(f"String #{num + 1} was not saved after 10 tries, stopping the import. "
+                                       f"Run again with `--resume` to continue at this string")
+
+                imported += 1
+                imported_chars += len(string)
+                if journal:
+                    # Before moving down, so an import stopped there resumes at the entry below
+                    journal.record(num, string)
+
+                # Move down using trigger handle in right hand, until the entry below (without a string) is selected
+                for attempt in range(NEXT_ATTEMPTS):
+                    if trace.ui_step(entry, "next", num, lambda: backend.click(button='right'), ui_state.EMPTY,
+                                     timeout=delay / 3, attempt=attempt) or not color_checking:
+                        break
+                    # Only right-click again once it's sure the last one was lost, or an entry would be skipped
+                    with trace.span("retry", num, after="next") as span:
+                        span.ok = entry.wait_for(ui_state.EMPTY)
+                    if span.ok:
+                        break
+                    print("Failed to move down")
+                    retries += 1
+                else:
+                    raise RuntimeError(f"Could not move down to an empty entry after string #{num + 1}, select the "
+                                       f"entry below it and run again with `--resume`")
+                string_span.fields["retries"] = retries - retries_before
+        finished = True
+    finally:
+        focus.release()
+        trace.close()
+        # Also save stopped sessions, they still tell how long every string took
+        if record_session:
+            job_history.record("import", backend.time() - time_at_start - paused, method="list_create",
+                               strings=imported, chars=imported_chars, delay=delay, retries=retries,
+                               completed=finished)
 
     # Print out the time used for importing
-    time_to_copy = time.time() - time_at_start
+    time_to_copy = backend.time() - time_at_start
     minutes = time_to_copy // 60
     seconds = time_to_copy % 60
-    print(f"Copying complete. Copied {num_strings} strings in {minutes} min and {seconds:.1f} sec")
+    print(f"Copying complete. Copied {imported} strings in {minutes} min and {seconds:.1f} sec")
+    return {"imported": imported, "retries": retries, "seconds": time_to_copy - paused, "copy_seconds": copy_seconds,
+            "focus_losses": focus.losses - losses_at_start}
 
 
-def main(from_file: bool = False):
+def main(from_file: bool = False, resume: bool = False):
     if monitor_check() == -1:
         exit(input("\nScreen aspect ratio not optimal for importing.\n"
                    "Press enter to exit\n"
@@ -181,20 +288,23 @@ def main(from_file: bool = False):
     delay: float = 0.3
     "########### GLOBAL IMPORTING DELAY ############"
 
-    "###### LAST SUCCESSFULLY IMPORTED STRING ######"
-    # If the importing failed/the string did not import successfully, enter THE LAST IMPORTED STRING into `last_string`
-    # variable (instead of `None`)
-    # This will re-import all the data from that string onward (including the last string/the one you entered as last)
-    last_string = None
-    "###### LAST SUCCESSFULLY IMPORTED STRING ######"
-
-    copy_to_recroom(img_data=img_data, delay=delay, last_successful_string=last_string)
+    # If the importing failed/the string did not import successfully, run this script again with `--resume`.
+    # This will re-import all the data after the last string that was saved (see `import_journal`)
+    copy_to_recroom(img_data=img_data, delay=delay, resume=resume)
 
 
 log = setup_logger()
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import encoded strings into Rec Room List Creates.")
+    parser.add_argument("--resume", action="store_true",
+                        help=f"Continue after the last imported string in `{JOURNAL_PATH}`")
+    parser.add_argument("--verify-clipboard", action="store_true",
+                        help="Read every string back from the clipboard before pasting it")
+    args = parser.parse_args()
+    if args.verify_clipboard:
+        set_backend(DesktopBackend(verify_clipboard=True))
     try:
-        main(from_file="y" in input("Use the encoded data in `image_data.txt`? [yes/no]\n > "))
+        main(from_file="y" in input("Use the encoded data in `image_data.txt`? [yes/no]\n > "), resume=args.resume)
     except (Exception, KeyboardInterrupt):
         log.exception("ERROR", exc_info=True)
\ No newline at end of file
@@ -2,11 +2,14 @@ import subprocess
 import sys
 
 try:
+    import argparse
     import logging
 
     import Encoding
     import Importing
+    from backend import DesktopBackend, set_backend
     from common import setup_logger
+    from pipeline import EncodePipeline, encode_strings
 except AttributeError:
     input("Lower version of module 'pyscreeze' found.\n"
           "Press enter to update it, them run this script again.\n"
@@ -16,19 +19,44 @@ except Exception as e:
     exit(input(f"ERROR: {e}"))
 
 
-def main():
-    img, img_data = Encoding.main(list_size=50)
+def main(pipelined: bool = True):
+    """
+    :param pipelined: Start importing while the image is still being encoded (see `pipeline`); otherwise encode the
+        whole image first
+    """
+    if not pipelined:
+        img, img_data = Encoding.main(list_size=50)
 
-    # Insert beginning and end. Required when using my Image Printer Bot
-    img_data.insert(0, "BEGIN")
-    img_data.append("END")
-    Importing.copy_into_rr_variable(img_data, delay=0.4, pause_at_50=False, stop_at_500=False)
+        # Insert beginning and end. Required when using my Image Printer Bot
+        img_data.insert(0, "BEGIN")
+        img_data.append("END")
+        Importing.copy_into_rr_variable(img_data, delay=0.4, pause_at_50=False, stop_at_500=False)
+        return
+
+    img = Encoding.get_image()
+    if not img:
+        exit()
+    dither: int = 0 if "n" in input("Dither the image? [y/n] ").lower() else 1
+
+    # The strings are quantized and encoded in the background, the first ones are imported as soon as they're ready
+    with EncodePipeline(encode_strings(img, dither, begin_end=True)) as strings:
+        Importing.copy_into_rr_variable(strings, delay=0.4, pause_at_50=False, stop_at_500=False)
+    print(f"Encoded {len(strings.strings) - 2} strings for image WxH {img.width}x{img.height}")
 
 
 log: logging.Logger = setup_logger()
 
+parser = argparse.ArgumentParser(description="Encode an image and import it into a Rec Room Variable.")
+parser.add_argument("--no-pipeline", action="store_true",
+                    help="Encode the whole image before importing, instead of importing while it's encoded")
+parser.add_argument("--verify-clipboard", action="store_true",
+                    help="Read every string back from the clipboard before pasting it")
+args = parser.parse_args()
+if args.verify_clipboard:
+    set_backend(DesktopBackend(verify_clipboard=True))
+
 try:
-    main()
+    main(pipelined=not args.no_pipeline)
     input("Press enter to exit")
 except (KeyboardInterrupt, Exception):
     log.exception("ERROR", exc_info=True)
@@ -0,0 +1,41 @@
+"""
+Checks the encoded strings in `image_data.txt` before importing them.
+The strings are decoded and compared to the image pixel by pixel, so a wrong width or a corrupted string shows up
+here instead of hours into printing.
+"""
+import Encoding
+
+
+def main(vertical_print: bool = False):
+    try:
+        with open("image_data.txt", "r", encoding="UTF-8") as f:
+            img_data: list[str] = [line.strip() for line in f.readlines()]
+    except FileNotFoundError:
+        print("The file `image_data.txt` was not found. ")
+        return
+
+    print("Select the image that was encoded.")
+    img = Encoding.get_image(check_palette=False)
+    if not img:
+        return
+    # Convert the image the same way it was converted when encoding
+    img = Encoding.quantize(img, open_image=False)
+
+    try:
+        mismatches: int = Encoding.verify(img, img_data, vertical_print=vertical_print)
+    except ValueError as e:
+        print(f"Verification failed: {e}")
+        return
+
+    if mismatches:
+        print(f"Verification failed: {mismatches} of {img.width * img.height} pixels are different")
+    else:
+        print(f"Verification successful: {len(img_data)} strings match the {img.width}x{img.height} image")
+
+
+if __name__ == "__main__":
+    try:
+        main(vertical_print="y" in input("Was the image encoded vertically? [y/n] ").lower())
+        input("Press enter to exit")
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,156 @@
+"""
+Finds the largest size of an image whose encoded strings still fit into Rec Room:
+    variable - one Variable, 2500 strings (including BEGIN and END)
+    list_create - 40 List Creates of 64 strings
+    or any number of List Creates
+
+The width is found with a binary search (the aspect ratio is kept). Every size is converted with `cached_quantize`
+and encoded with the fast encoder; converted images come from the encode cache when the same size was tried before,
+and string counts are remembered for the whole search.
+
+Example:
+    python auto_scale.py logo.png --target list_create --lists 10 --dither none bayer4 -o logo_fitted.png
+"""
+import argparse
+from typing import Dict, List, Sequence, Tuple, Union
+
+from PIL import Image
+
+import Encoding
+import job_history
+from dithering import METHODS
+
+VARIABLE_CAPACITY: int = 2500  # Strings in one Variable, including BEGIN and END
+LIST_CAPACITY: int = 40  # List Creates available
+TARGETS: Tuple[str, ...] = ("variable", "list_create")
+DITHER_NAMES: Dict[str, Union[int, str]] = {"none": 0, "floyd-steinberg": 1, **{method: method for method in METHODS}}
+
+
+def capacity(target: str = "variable", lists: int = None) -> int:
+    """
+    :param target: One of `TARGETS`
+    :param lists: Number of List Creates to fill (only for "list_create"), defaults to `LIST_CAPACITY`
+    :return: Maximum number of encoded strings
+    """
+    if target == "variable":
+        return VARIABLE_CAPACITY - 2  # BEGIN and END are added when importing
+    if target == "list_create":
+        return (lists or LIST_CAPACITY) * Encoding.LIST_SIZE
+    raise ValueError(f"Unknown target {target!r}, use one of {TARGETS}")
+
+
+def scaled_size(img: Image, width: int) -> Tuple[int, int]:
+    """
+    :return: Size of the image scaled to `width`, keeping the aspect ratio (same as "Fit To Width" in the GUI)
+    """
+    return width, max(1, int(width / img.width * img.height))
+
+
+class CapacityFitter:
+    """
+    Encodes one image at different sizes and dither modes, remembering the string counts
+    """
+
+    def __init__(self, img: Image, vertical_print: bool = False):
+        self.img = img.convert("RGB")
+        self.vertical_print = vertical_print
+        self.results: Dict[Tuple[int, Union[int, str]], Dict] = {}  # key: (width, dither)
+
+    def measure(self, width: int, dither: Union[int, str] = 0) -> Dict:
+        """
+        :param width: Width to scale the image to
+        :param dither: See `Encoding.quantize`
+        :return: `width`, `height`, `dither`, `strings` and `chars` of the image at that size
+        """
+        key = (width, dither)
+        if key not in self.results:
+            size = scaled_size(self.img, width)
+            converted = Encoding.cached_quantize(self.img.resize(size), dither=dither)
+            stats = {}
+            for _ in Encoding.iter_encode(converted, vertical_print=self.vertical_print, stats=stats):
+                pass
+            self.results[key] = {"width": size[0], "height": size[1], "dither": dither,
+                                 "strings": stats["strings"], "chars": stats["chars"]}
+        return self.results[key]
+
+    def largest_width(self, max_strings: int, dither: Union[int, str] = 0, max_width: int = None) -> Dict:
+        """
+        Binary search for the largest width that needs at most `max_strings` strings.
+        Strings grow with the size of the image, so the search assumes a larger image never needs fewer strings.
+
+        :param max_strings: Maximum number of strings
+        :param dither: See `Encoding.quantize`
+        :param max_width: Largest width to try, defaults to the width of the image
+        :return: See `measure`, for the largest width that fits (or width 1 if nothing fits)
+        """
+        low, high = 1, max_width or self.img.width
+        if self.measure(high, dither)["strings"] <= max_strings:
+            return self.measure(high, dither)
+
+        # `low` always fits (or is 1), `high` never does
+        while high - low > 1:
+            middle = (low + high) // 2
+            if self.measure(middle, dither)["strings"] <= max_strings:
+                low = middle
+            else:
+                high = middle
+        return self.measure(low, dither)
+
+
+def fit_to_capacity(img: Image, target: str = "variable", lists: int = None,
+                    dithers: Sequence[Union[int, str]] = (0,), max_width: int = None,
+                    vertical_print: bool = False, delay: float = job_history.DEFAULT_DELAY) -> Dict:
+    """
+    Find the largest size (and dither mode) at which the encoded image fits into `target`
+
+    :param img: The image
+    :param target: One of `TARGETS`
+    :param lists: Number of List Creates to fill (only for "list_create")
+    :param dithers: Dither modes to try (see `Encoding.quantize`); with a tie the first one wins
+    :param max_width: Largest width to try, defaults to the width of the image (no upscaling)
+    :param vertical_print: The image will be encoded vertically
+    :param delay: The importing delay, for the predicted import time
+    :return: `width`, `height`, `dither`, `strings`, `chars`, `lists` (List Creates needed), `capacity`, `fits`,
+        `import_seconds` (see `job_history.plan`) and `tried` (number of encoded sizes)
+    """
+    max_strings = capacity(target, lists)
+    fitter = CapacityFitter(img, vertical_print)
+
+    best = None
+    for dither in dithers:
+        result = fitter.largest_width(max_strings, dither, max_width)
+        if best is None or result["width"] > best["width"]:
+            best = result
+
+    method = "variable" if target == "variable" else "list_create"
+    estimate = job_history.get_history().plan(best["strings"], best["chars"], delay=delay)[method]
+    return dict(best, lists=Encoding.count_lists(best["strings"]), capacity=max_strings,
+                fits=best["strings"] <= max_strings, import_seconds=estimate["import_seconds"],
+                tried=len(fitter.results))
+
+
+def main(args: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Scale an image to the largest size that fits into Rec Room.")
+    parser.add_argument("image")
+    parser.add_argument("--target", choices=TARGETS, default="variable")
+    parser.add_argument("--lists", type=int, help="Number of List Creates to fill (with --target list_create)")
+    parser.add_argument("--dither", nargs="+", choices=DITHER_NAMES, default=["none"], help="Dither modes to try")
+    parser.add_argument("--max-width", type=int, help="Largest width to try (default: the width of the image)")
+    parser.add_argument("--vertical", action="store_true", help="Encode vertically (for Ashers printer)")
+    parser.add_argument("-o", "--output", help="Save the scaled (not converted) image here")
+    args = parser.parse_args(args)
+
+    with Image.open(args.image) as img:
+        result = fit_to_capacity(img, args.target, args.lists, [DITHER_NAMES[name] for name in args.dither],
+                                 args.max_width, args.vertical)
+        if args.output:
+            img.resize((result["width"], result["height"])).save(args.output)
+
+    dither_name = next(name for name, value in DITHER_NAMES.items() if value == result["dither"])
+    print(f"{result['width']}x{result['height']} ({dither_name}): {result['strings']}/{result['capacity']} strings, "
+          f"{result['lists']} List Creates, EST. import time {job_history.format_duration(result['import_seconds'])}"
+          f"{'' if result['fits'] else ' - DOES NOT FIT'} ({result['tried']} sizes tried)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+Input and screen access for the importing scripts. Everything that clicks, types, copies or looks at the screen goes
+through a `Backend`, so the import loops don't depend on a real desktop and can be run (and timed) without one.
+
+    DesktopBackend - the real mouse, keyboard, clipboard and screen (PyAutoGUI, `clipboard`, Pillow's ImageGrab)
+
+Time goes through the backend too (`time`, `sleep`, `wait_until`), so a backend can run on a clock of its own.
+"""
+import sys
+import time
+from typing import Callable, Optional, Tuple
+
+from PIL import Image
+
+from clipboard import Clipboard, system_clipboard
+
+Coords = Tuple[int, int]
+Box = Tuple[int, int, int, int]  # left, top, right, bottom (right and bottom are not included)
+
+POLL_INTERVAL: float = 0.01  # Seconds between checks in `Backend.wait_until`
+
+_default_backend: Optional["Backend"] = None
+
+
+class Backend:
+    """
+    Mouse, keyboard, clipboard and screen. Subclasses implement the actions; waiting is shared.
+    """
+    realtime: bool = True  # `time` and `sleep` are the real clock, so other threads can wait on it
+
+    def screen_size(self) -> Tuple[int, int]:
+        """
+        :return: Width and height of the screen in pixels
+        """
+        raise NotImplementedError
+
+    def active_window_title(self) -> str:
+        """
+        :return: Title of the window in focus, "" if there is none
+        """
+        raise NotImplementedError
+
+    def click(self, x: int = None, y: int = None, button: str = "left") -> None:
+        """
+        Click at `x`, `y`, or where the mouse is if they are not given
+
+        :param button: "left", "right" or "middle"
+        """
+        raise NotImplementedError
+
+    def move_to(self, x: int, y: int) -> None:
+        raise NotImplementedError
+
+    def move(self, dx: int, dy: int) -> None:
+        """
+        Move the mouse relative to where it is
+        """
+        raise NotImplementedError
+
+    def hotkey(self, *keys: str) -> None:
+        """
+        Press keys together, e.g. `hotkey("ctrl", "v")`
+        """
+        raise NotImplementedError
+
+    def press(self, key: str) -> None:
+        raise NotImplementedError
+
+    def scroll(self, clicks: int) -> None:
+        raise NotImplementedError
+
+    def copy(self, text: str) -> bool:
+        """
+        Put `text` into the clipboard
+
+        :return: False if the clipboard was read back and doesn't hold `text`, see `clipboard.Clipboard.copy`
+        """
+        raise NotImplementedError
+
+    def grab(self, box: Box = None) -> Image:
+        """
+        :param box: Part of the screen to capture, the whole screen if not given
+        :return: Screenshot (RGB)
+        """
+        raise NotImplementedError
+
+    def time(self) -> float:
+        """
+        :return: Seconds on the clock of the backend (only differences mean something)
+        """
+        return time.perf_counter()
+
+    def sleep(self, seconds: float) -> None:
+        time.sleep(seconds)
+
+    def wait_until(self, predicate: Callable[[], bool], timeout: float, interval: float = POLL_INTERVAL) -> bool:
+        """
+        Check `predicate` every `interval` seconds until it's true
+
+        :param predicate: Condition to wait for, usually a check of a small part of the screen
+        :param timeout: Seconds to wait at most
+        :param interval: Seconds between checks
+        :return: True as soon as `predicate` is true, False if it still isn't after `timeout` seconds
+        """
+        deadline = self.time() + timeout
+        while not predicate():
+            if self.time() >= deadline:
+                return False
+            self.sleep(interval)
+        return True
+
+
+class DesktopBackend(Backend):
+    """
+    The real desktop. Needs PyAutoGUI, and pyperclip on systems other than Windows.
+    """
+
+    def __init__(self, clipboard: Clipboard = None, verify_clipboard: bool = False):
+        """
+        :param clipboard: The clipboard, defaults to `clipboard.system_clipboard()`
+        :param verify_clipboard: Read every copied string back before it's pasted
+        """
+        try:
+            import pyautogui
+            from PIL import ImageGrab
+        except ModuleNotFoundError:
+            print(f'Please execute the following line and run the script again:\n'
+                  f'{sys.executable} -m pip install -U PyAutoGUI pyperclip Pillow')
+            raise
+        self.pyautogui = pyautogui
+        self.image_grab = ImageGrab
+        self.clipboard = clipboard or system_clipboard()
+        self.verify_clipboard = verify_clipboard
+        self._screen_size: Optional[Tuple[int, int]] = None
+
+    def screen_size(self) -> Tuple[int, int]:
+        if self._screen_size is None:
+            if sys.platform == "win32":
+                import ctypes
+
+                # Physical pixels, not the ones scaled by the display settings
+                user32 = ctypes.windll.user32
+                user32.SetProcessDPIAware()
+                self._screen_size = user32.GetSystemMetrics(0), user32.GetSystemMetrics(1)
+            else:
+                self._screen_size = tuple(self.pyautogui.size())
+        return self._screen_size
+
+    def active_window_title(self) -> str:
+        return self.pyautogui.getActiveWindowTitle() or ""  # getActiveWindowTitle is sometimes `None`
+
+    def click(self, x: int = None, y: int = None, button: str = "left") -> None:
+        self.pyautogui.click(x, y, button=button)
+
+    def move_to(self, x: int, y: int) -> None:
+        self.pyautogui.moveTo(x, y)
+
+    def move(self, dx: int, dy: int) -> None:
+        self.pyautogui.move(dx, dy)
+
+    def hotkey(self, *keys: str) -> None:
+        self.pyautogui.hotkey(*keys)
+
+    def press(self, key: str) -> None:
+        self.pyautogui.press(key)
+
+    def scroll(self, clicks: int) -> None:
+        self.pyautogui.scroll(clicks)
+
+    def copy(self, text: str) -> bool:
+        return self.clipboard.copy(text, self.verify_clipboard)
+
+    def grab(self, box: Box = None) -> Image:
+        return self.image_grab.grab(bbox=box).convert("RGB")
+
+
+def get_backend() -> Backend:
+    """
+    :return: The backend used by everything in this process, a `DesktopBackend` unless `set_backend` was called
+    """
+    global _default_backend
+    if _default_backend is None:
+        _default_backend = DesktopBackend()
+    return _default_backend
+
+
+def set_backend(backend: Backend) -> None:
+    """
+    Use `backend` for everything in this process, e.g. a simulated one for tests
+    """
+    global _default_backend
+    _default_backend = backend
@@ -0,0 +1,340 @@
+"""
+The clipboard the importers copy every string into before pasting it into Rec Room.
+
+    WindowsClipboard - the Windows clipboard through the Win32 API (ctypes): no program is started per copy and the
+        API functions are loaded only once
+    TkClipboard - the X clipboard through Tk, on Linux: a hidden Tk window in its own thread owns the selection and
+        answers the pastes, so no program is started per copy either
+    PyperclipClipboard - pyperclip, for other systems (starts xclip / xsel / wl-copy / pbcopy for every copy)
+    MemoryClipboard - text in memory, for `simulated_backend`; copies can be made to fail on purpose
+
+`Clipboard.copy` can read the text back and compare its checksum before the string is pasted, so a copy that didn't
+reach the clipboard (e.g. because another program had it open) is repeated right away instead of pasting the previous
+string. Every write and read is timed (`latencies`, `summary`), to compare the clipboard with the rest of an import
+step; only running totals and the last `LATENCY_SAMPLES` durations are kept, however long the import.
+"""
+import os
+import random
+import sys
+import threading
+import time
+import zlib
+from collections import deque
+from typing import Deque, Dict, List
+
+COPY_RETRIES: int = 3  # Extra tries when the read-back text is wrong
+OPEN_RETRIES: int = 20  # Tries to open the clipboard while another program has it open
+OPEN_INTERVAL: float = 0.005  # Seconds between them
+LATENCY_SAMPLES: int = 1000  # Last durations kept for the percentiles
+TK_START_TIMEOUT: float = 5.0  # Seconds to wait for the Tk clipboard thread
+
+
+def summarize(seconds: List[float]) -> Dict[str, float]:
+    """
+    :param seconds: Durations
+    :return: `count` and the `mean_ms`, `p50_ms`, `p95_ms` and `max_ms` of the durations in milliseconds
+    """
+    if not seconds:
+        return {"count": 0}
+    ordered = sorted(seconds)
+
+    def percentile(fraction: float) -> float:
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000
+
+    return {"count": len(ordered), "mean_ms": sum(ordered) / len(ordered) * 1000, "p50_ms": percentile(0.5),
+            "p95_ms": percentile(0.95), "max_ms": ordered[-1] * 1000}
+
+
+def checksum(text: str) -> int:
+    """
+    :param text: Text
+    :return: CRC-32 of the UTF-8 text
+    """
+    return zlib.crc32(text.encode())
+
+
+class Latencies:
+    """
+    Durations of one operation: running count, total and maximum, and the last `LATENCY_SAMPLES` for the percentiles
+    """
+
+    def __init__(self, samples: int = LATENCY_SAMPLES):
+        """
+        :param samples: Number of durations kept
+        """
+        self.count: int = 0
+        self.total: float = 0.0
+        self.max: float = 0.0
+        self.recent: Deque[float] = deque(maxlen=samples)
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.recent.append(seconds)
+
+    def summary(self) -> Dict[str, float]:
+        """
+        :return: `summarize` of the kept durations, with the `count`, `mean_ms` and `max_ms` of all of them
+        """
+        if not self.count:
+            return {"count": 0}
+        return {**summarize(list(self.recent)), "count": self.count, "mean_ms": self.total / self.count * 1000,
+                "max_ms": self.max * 1000}
+
+
+class Clipboard:
+    """
+    Text in the clipboard. Subclasses implement `_write` and `_read`; checking and timing are shared.
+    """
+    name: str = "clipboard"
+
+    def __init__(self):
+        self.latencies: Dict[str, Latencies] = {"write": Latencies(), "read": Latencies()}  # Seconds
+        self.failed_checks: int = 0  # Copies whose read-back text was wrong
+
+    def _write(self, text: str) -> None:
+        raise NotImplementedError
+
+    def _read(self) -> str:
+        raise NotImplementedError
+
+    def copy(self, text: str, verify: bool = False, retries: int = COPY_RETRIES) -> bool:
+        """
+        Put `text` into the clipboard
+
+        :param text: The text
+        :param verify: Read the clipboard back and copy again if its checksum isn't the one of `text`
+        :param retries: Extra tries when the check fails
+        :return: False if the check still failed after all tries (always True without `verify`)
+        """
+        expected = checksum(text) if verify else None
+        for _ in range(retries + 1):
+            started = time.perf_counter()
+            try:
+                self._write(text)
+            except OSError:
+                # The clipboard couldn't be opened; counts like a wrong read-back
+                if not verify:
+                    raise
+            self.latencies["write"].add(time.perf_counter() - started)
+            if not verify or checksum(self.paste()) == expected:
+                return True
+            self.failed_checks += 1
+        return False
+
+    def paste(self) -> str:
+        """
+        :return: The text in the clipboard, "" if there is none (or it can't be read)
+        """
+        started = time.perf_counter()
+        try:
+            return self._read()
+        except OSError:
+            return ""
+        finally:
+            self.latencies["read"].add(time.perf_counter() - started)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        :return: `Latencies.summary` of the writes and the reads
+        """
+        return {operation: latencies.summary() for operation, latencies in self.latencies.items()}
+
+
+class MemoryClipboard(Clipboard):
+    """
+    Text in memory
+    """
+    name = "memory"
+
+    def __init__(self, fail_rate: float = 0.0, seed: int = 0):
+        """
+        :param fail_rate: Chance that a write doesn't change the text (0 - 1)
+        :param seed: Seed for the failed writes
+        """
+        super().__init__()
+        self.text: str = ""
+        self.fail_rate = fail_rate
+        self.random = random.Random(seed)
+
+    def _write(self, text: str) -> None:
+        if self.random.random() >= self.fail_rate:
+            self.text = text
+
+    def _read(self) -> str:
+        return self.text
+
+
+class PyperclipClipboard(Clipboard):
+    """
+    pyperclip, which picks the right tool for the system
+    """
+    name = "pyperclip"
+
+    def __init__(self):
+        super().__init__()
+        try:
+            import pyperclip
+        except ModuleNotFoundError:
+            print(f'Please execute the following line and run the script again:\n'
+                  f'{sys.executable} -m pip install -U pyperclip')
+            raise
+        self.pyperclip = pyperclip
+
+    def _write(self, text: str) -> None:
+        self.pyperclip.copy(text)
+
+    def _read(self) -> str:
+        return self.pyperclip.paste()
+
+
+class TkClipboard(Clipboard):
+    """
+    The X clipboard through a hidden Tk window. X has no clipboard storage: the program that copied the text has to
+    answer every paste, which Tk only does while its event loop runs - so the window lives in its own thread, running
+    the loop for as long as the program does. Tkinter hands the calls of other threads to that thread.
+    """
+    name = "tk"
+
+    def __init__(self, timeout: float = TK_START_TIMEOUT):
+        """
+        :param timeout: Seconds to wait for the window
+        :raise OSError: If there is no display, or Tcl was built without threads
+        """
+        super().__init__()
+        import tkinter
+
+        self.tkinter = tkinter
+        self.root = None
+        self.error = None
+        started = threading.Event()
+        threading.Thread(target=self._run, args=(started,), name="clipboard", daemon=True).start()
+        if not started.wait(timeout) or self.root is None:
+            raise OSError(f"The Tk clipboard didn't start: {self.error or 'timeout'}")
+
+    def _run(self, started: threading.Event) -> None:
+        try:
+            root = self.tkinter.Tk()
+        except self.tkinter.TclError as e:
+            self.error = e
+            started.set()
+            return
+        root.withdraw()
+        if not root.tk.getboolean(root.tk.eval("expr {[info exists tcl_platform(threaded)] && "
+                                               "$tcl_platform(threaded)}")):
+            # Other threads couldn't call it
+            self.error = "Tcl without threads"
+            root.destroy()
+            started.set()
+            return
+        self.root = root
+        root.after(0, started.set)  # Once the loop runs
+        root.mainloop()
+
+    def _write(self, text: str) -> None:
+        try:
+            self.root.clipboard_clear()
+            self.root.clipboard_append(text)
+        except (self.tkinter.TclError, RuntimeError) as e:
+            raise OSError(e) from e
+
+    def _read(self) -> str:
+        try:
+            return self.root.clipboard_get()
+        except (self.tkinter.TclError, RuntimeError) as e:
+            # Also raised when the clipboard is empty
+            raise OSError(e) from e
+
+
+class WindowsClipboard(Clipboard):
+    """
+    The Windows clipboard, as Unicode text
+    """
+    name = "win32"
+    CF_UNICODETEXT = 13
+    GMEM_MOVEABLE = 0x0002
+
+    def __init__(self):
+        super().__init__()
+        import ctypes
+        from ctypes import wintypes
+
+        self.ctypes = ctypes
+        self.user32 = ctypes.WinDLL("user32", use_last_error=True)
+        self.kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+        # Handles are pointer sized; without the types they would be cut to 32 bits
+        for function, argtypes, restype in (
+                (self.user32.OpenClipboard, [wintypes.HWND], wintypes.BOOL),
+                (self.user32.CloseClipboard, [], wintypes.BOOL),
+                (self.user32.EmptyClipboard, [], wintypes.BOOL),
+                (self.user32.GetClipboardData, [wintypes.UINT], wintypes.HANDLE),
+                (self.user32.SetClipboardData, [wintypes.UINT, wintypes.HANDLE], wintypes.HANDLE),
+                (self.kernel32.GlobalAlloc, [wintypes.UINT, ctypes.c_size_t], wintypes.HGLOBAL),
+                (self.kernel32.GlobalLock, [wintypes.HGLOBAL], ctypes.c_void_p),
+                (self.kernel32.GlobalUnlock, [wintypes.HGLOBAL], wintypes.BOOL),
+                (self.kernel32.GlobalFree, [wintypes.HGLOBAL], wintypes.HGLOBAL)):
+            function.argtypes = argtypes
+            function.restype = restype
+
+    def _error(self) -> OSError:
+        return self.ctypes.WinError(self.ctypes.get_last_error())
+
+    def _open(self) -> None:
+        for _ in range(OPEN_RETRIES):
+            if self.user32.OpenClipboard(None):
+                return
+            time.sleep(OPEN_INTERVAL)  # Another program has it open
+        raise self._error()
+
+    def _write(self, text: str) -> None:
+        data = text.encode("utf-16-le") + b"\0\0"
+        handle = self.kernel32.GlobalAlloc(self.GMEM_MOVEABLE, len(data))
+        if not handle:
+            raise self._error()
+        self.ctypes.memmove(self.kernel32.GlobalLock(handle), data, len(data))
+        self.kernel32.GlobalUnlock(handle)
+
+        try:
+            self._open()
+        except OSError:
+            self.kernel32.GlobalFree(handle)
+            raise
+        try:
+            self.user32.EmptyClipboard()
+            # The clipboard owns the memory from now on, unless this fails
+            if not self.user32.SetClipboardData(self.CF_UNICODETEXT, handle):
+                error = self._error()
+                self.kernel32.GlobalFree(handle)
+                raise error
+        finally:
+            self.user32.CloseClipboard()
+
+    def _read(self) -> str:
+        self._open()
+        try:
+            handle = self.user32.GetClipboardData(self.CF_UNICODETEXT)
+            if not handle:
+                return ""
+            pointer = self.kernel32.GlobalLock(handle)
+            try:
+                return self.ctypes.wstring_at(pointer) if pointer else ""
+            finally:
+                self.kernel32.GlobalUnlock(handle)
+        finally:
+            self.user32.CloseClipboard()
+
+
+def system_clipboard() -> Clipboard:
+    """
+    :return: The clipboard of this computer: the Win32 one on Windows, the Tk one on Linux with X, pyperclip
+        anywhere else (and if Tk can't be used)
+    """
+    if sys.platform == "win32":
+        return WindowsClipboard()
+    if sys.platform.startswith("linux") and os.environ.get("DISPLAY"):
+        try:
+            return TkClipboard()
+        except (ImportError, OSError):
+            pass
+    return PyperclipClipboard()
@@ -0,0 +1,210 @@
+"""
+Nearest-color lookup tables.
+Instead of comparing every pixel against every palette color, the whole RGB cube (optionally quantized to 5 or 6 bits
+per channel) is mapped to palette indices once, saved in `CACHE_DIR` and memory-mapped on the next run.
+Mapping an image is then a single array lookup.
+
+Distance metrics:
+    rgb - plain euclidean distance, the same as `Encoding.closest_color`
+    weighted - "redmean" weighted RGB, closer to how the eye sees color differences
+    lab - CIELAB delta E (CIE76)
+"""
+import hashlib
+import os
+from pathlib import Path
+from typing import Dict, Sequence, Tuple
+
+import numpy as np
+from PIL import Image
+
+CACHE_DIR = Path("cache")
+METRICS = ("rgb", "weighted", "lab")
+
+# sRGB (D65) -> CIE XYZ
+SRGB_TO_XYZ = np.array([[0.4124564, 0.3575761, 0.1804375],
+                        [0.2126729, 0.7151522, 0.0721750],
+                        [0.0193339, 0.1191920, 0.9503041]])
+D65_WHITE = np.array([0.95047, 1.0, 1.08883])
+
+# Lookups that were already loaded in this process; key: (palette, metric, bits)
+_loaded: Dict[Tuple[bytes, str, int], "ColorLookup"] = {}
+
+
+def rgb_to_lab(rgb: np.ndarray) -> np.ndarray:
+    """
+    Convert sRGB colors to CIELAB
+
+    :param rgb: Array of RGB colors (0 - 255), shape (..., 3)
+    :return: Array of Lab colors, shape (..., 3)
+    """
+    c = np.asarray(rgb, dtype=np.float64) / 255
+    c = np.where(c > 0.04045, ((c + 0.055) / 1.055) ** 2.4, c / 12.92)
+    xyz = (c @ SRGB_TO_XYZ.T) / D65_WHITE
+    f = np.where(xyz > (6 / 29) ** 3, np.cbrt(xyz), xyz / (3 * (6 / 29) ** 2) + 4 / 29)
+    return np.stack((116 * f[..., 1] - 16,
+                     500 * (f[..., 0] - f[..., 1]),
+                     200 * (f[..., 1] - f[..., 2])), axis=-1)
+
+
+def lab_to_rgb(lab: np.ndarray) -> np.ndarray:
+    """
+    Convert CIELAB colors to sRGB, the inverse of `rgb_to_lab`. Colors outside of sRGB are clipped.
+
+    :param lab: Array of Lab colors, shape (..., 3)
+    :return: Array of RGB colors (0 - 255, uint8), shape (..., 3)
+    """
+    lab = np.asarray(lab, dtype=np.float64)
+    fy = (lab[..., 0] + 16) / 116
+    f = np.stack((fy + lab[..., 1] / 500, fy, fy - lab[..., 2] / 200), axis=-1)
+    xyz = np.where(f > 6 / 29, f ** 3, 3 * (6 / 29) ** 2 * (f - 4 / 29)) * D65_WHITE
+    c = np.clip(xyz @ np.linalg.inv(SRGB_TO_XYZ).T, 0, 1)
+    c = np.where(c > 0.0031308, 1.055 * c ** (1 / 2.4) - 0.055, 12.92 * c)
+    return np.rint(c * 255).astype(np.uint8)
+
+
+def color_distances(colors: np.ndarray, palette: np.ndarray, metric: str = "rgb") -> np.ndarray:
+    """
+    Distance of every color to every palette color. The values are only meant to be compared with each other:
+    `rgb` and `lab` leave out the |color|² term of the squared distance (it's the same for every palette color),
+    `weighted` is a squared distance.
+
+    :param colors: Array of RGB colors, shape (n, 3)
+    :param palette: Array of RGB palette colors, shape (k, 3)
+    :param metric: One of `METRICS`
+    :return: Array of distances, shape (n, k)
+    """
+    if metric in ("rgb", "lab"):
+        # |c - p|² = |c|² - 2 c·p + |p|², done as one matrix product. For `rgb` every value is an integer,
+        # so the float64 result is exact and ties stay ties.
+        colors = np.asarray(colors, dtype=np.float64)
+        palette = np.asarray(palette, dtype=np.float64)
+        if metric == "lab":
+            colors, palette = rgb_to_lab(colors), rgb_to_lab(palette)
+        return (palette ** 2).sum(axis=1)[None, :] - 2 * (colors @ palette.T)
+
+    colors = np.asarray(colors, dtype=np.int64)
+    diff = colors[:, None, :] - np.asarray(palette, dtype=np.int64)[None, :, :]
+    if metric == "weighted":
+        red_mean = (colors[:, None, 0] + np.asarray(palette)[None, :, 0]) / 2
+        return ((2 + red_mean / 256) * diff[..., 0] ** 2
+                + 4 * diff[..., 1] ** 2
+                + (2 + (255 - red_mean) / 256) * diff[..., 2] ** 2)
+    raise ValueError(f"Unknown color metric {metric!r}, use one of {METRICS}")
+
+
+def nearest_indices(colors: np.ndarray, palette: np.ndarray, metric: str = "rgb",
+                    chunk_size: int = 16384) -> np.ndarray:
+    """
+    Find the closest palette color for every color. Ties go to the smallest RGB tuple, like `Encoding.closest_color`.
+
+    :param colors: Array of RGB colors, shape (n, 3)
+    :param palette: Array of RGB palette colors, shape (k, 3)
+    :param metric: One of `METRICS`
+    :param chunk_size: How many colors are compared at once
+    :return: Array of palette indices, shape (n,)
+    """
+    palette = np.asarray(palette, dtype=np.int64)
+    order = np.lexsort(palette.T[::-1])  # Sort by R, then G, then B
+    indices = np.empty(len(colors), dtype=np.intp)
+    for start in range(0, len(colors), chunk_size):
+        distances = color_distances(colors[start:start + chunk_size], palette[order], metric)
+        indices[start:start + chunk_size] = order[distances.argmin(axis=1)]
+    return indices
+
+
+class ColorLookup:
+    """
+    RGB -> palette index table for one palette and distance metric.
+
+    `bits` is the precision of every channel in the table; 8 is exact (16 MB table),
+    6 and 5 map the center of every 4x4x4 / 8x8x8 block of colors (256 KB / 32 KB).
+    """
+
+    def __init__(self, palette: Sequence[Tuple[int, int, int]], metric: str = "rgb", bits: int = 6,
+                 cache_dir: Path = CACHE_DIR):
+        if metric not in METRICS:
+            raise ValueError(f"Unknown color metric {metric!r}, use one of {METRICS}")
+        if not 1 <= bits <= 8:
+            raise ValueError("`bits` has to be between 1 and 8")
+        if len(palette) > 256:
+            raise ValueError("Palettes with more than 256 colors are not supported")
+
+        self.palette = np.asarray(palette, dtype=np.uint8).reshape(-1, 3)
+        self.metric = metric
+        self.bits = bits
+        self.shift = 8 - bits
+
+        digest = hashlib.sha1(self.palette.tobytes()).hexdigest()[:16]
+        self.path = Path(cache_dir) / f"lut_{metric}_{bits}bit_{digest}.npy"
+        self.table = self._load_or_build()
+
+    def _load_or_build(self) -> np.ndarray:
+        try:
+            return np.load(self.path, mmap_mode="r")
+        except (FileNotFoundError, ValueError):
+            pass
+
+        table = self.build()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a temporary file first so that an interrupted build never leaves a broken table behind
+        temp_path = self.path.with_suffix(".tmp.npy")
+        np.save(temp_path, table)
+        os.replace(temp_path, self.path)
+        return np.load(self.path, mmap_mode="r")
+
+    def build(self) -> np.ndarray:
+        """
+        Compute the table. One plane of constant red is computed at a time to keep memory low.
+
+        :return: Array of palette indices, shape (2**bits, 2**bits, 2**bits)
+        """
+        size = 1 << self.bits
+        # The color in the center of every cell
+        values = (np.arange(size) << self.shift) + ((1 << self.shift) >> 1)
+        g, b = np.meshgrid(values, values, indexing="ij")
+        plane = np.stack((np.zeros_like(g), g, b), axis=-1).reshape(-1, 3)
+
+        table = np.empty((size, size, size), dtype=np.uint8)
+        for r_index, r in enumerate(values):
+            plane[:, 0] = r
+            table[r_index] = nearest_indices(plane, self.palette, self.metric).reshape(size, size)
+        return table
+
+    def indices(self, pixels: np.ndarray) -> np.ndarray:
+        """
+        Look up the palette index of every pixel
+
+        :param pixels: Array of RGB colors, shape (..., 3)
+        :return: Array of palette indices, shape (...)
+        """
+        pixels = np.asarray(pixels, dtype=np.uint8) >> self.shift
+        # One index into the flattened table is faster than indexing all three axes
+        flat_index = pixels[..., 0].astype(np.intp) << (2 * self.bits)
+        flat_index |= pixels[..., 1].astype(np.intp) << self.bits
+        flat_index |= pixels[..., 2]
+        return self.table.reshape(-1).take(flat_index)
+
+    def map_image(self, img: Image) -> Image:
+        """
+        Replace every pixel of the image with its closest palette color
+
+        :param img: The image
+        :return: New RGB image that only has colors from the palette
+        """
+        indices = self.indices(np.asarray(img.convert("RGB")))
+        return Image.fromarray(self.palette.take(indices, axis=0))
+
+
+def get_lookup(palette: Sequence[Tuple[int, int, int]], metric: str = "rgb", bits: int = 6) -> ColorLookup:
+    """
+    Get the lookup for a palette, loading (or building) it only once per process
+
+    :param palette: List of RGB palette colors
+    :param metric: One of `METRICS`
+    :param bits: Precision of the table, see `ColorLookup`
+    :return: The lookup
+    """
+    key = (np.asarray(palette, dtype=np.uint8).tobytes(), metric, bits)
+    if key not in _loaded:
+        _loaded[key] = ColorLookup(palette, metric=metric, bits=bits)
+    return _loaded[key]
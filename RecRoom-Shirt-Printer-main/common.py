@@ -1,11 +1,16 @@
 import datetime
+import json
 import logging
 import sys
-import time
-from typing import NamedTuple, Tuple, List
+from typing import Dict, NamedTuple, Optional, Sequence, Tuple, List
 
-import pyautogui
-from PIL import ImageGrab, Image
+import numpy as np
+from PIL import Image
+
+from backend import Backend, Box, Coords, get_backend
+from focus_monitor import get_monitor
+
+COORDINATES_PATH: str = "coordinates.json"
 
 
 def setup_logger(level=logging.DEBUG, disable_imported: bool = False) -> logging.Logger:
@@ -31,24 +36,56 @@ def setup_logger(level=logging.DEBUG, disable_imported: bool = False) -> logging
     return logger_
 
 
-def is_window_active(window_title: str = "Rec Room") -> bool:
+def is_window_active(window_title: str = "Rec Room", backend: Backend = None) -> bool:
     """
     Does not return before `window_title` becomes the active window
     Returns true when `window_title` becomes the active window
 
     :param window_title: The title of the window
+    :param backend: Where to check, defaults to `backend.get_backend()`
     :return: When the window becomes active
     """
-    if window_title not in (pyautogui.getActiveWindowTitle() or ""):  # getActiveWindowTitle is sometimes `None`
-        print(f"Waiting for {window_title} to become the active window... ", end="\r", flush=True)
-        # While RecRoom window is not active, sleep
-        while window_title not in (pyautogui.getActiveWindowTitle() or ""):
-            time.sleep(0.1)
-        print(" " * 70, end="\r")  # Empty the last line in the console
-        time.sleep(0.5)
+    # The focus is watched in the background (see `focus_monitor`), this only asks the monitor
+    get_monitor(window_title, backend).wait()
     return True
 
 
+def copy_to_clipboard(text: str, backend: Backend = None, tries: int = 10, delay: float = 0.3) -> int:
+    """
+    Copy `text` into the clipboard, again after `delay` seconds if the backend read it back and it's wrong
+    (see `clipboard.Clipboard.copy`)
+
+    :param text: The string
+    :param backend: Where to copy, defaults to `backend.get_backend()`
+    :param tries: Tries at most
+    :param delay: Seconds between the tries
+    :return: Number of failed tries
+    """
+    backend = backend or get_backend()
+    for failed in range(tries):
+        if backend.copy(text):
+            return failed
+        print("Failed copy into the clipboard")
+        backend.sleep(delay)
+    return tries
+
+
+def load_coordinates(path: str = COORDINATES_PATH) -> Optional[Dict[str, Coords]]:
+    """
+    :return: The button coordinates saved by `Coordinate_Calibration`, None if it wasn't run yet
+    """
+    try:
+        with open(path, "r") as coords_file:
+            return {name: tuple(coords) for name, coords in json.load(coords_file).items()}
+    except FileNotFoundError:
+        return None
+
+
+def save_coordinates(coordinates: Dict[str, Coords], path: str = COORDINATES_PATH) -> None:
+    with open(path, "w") as coords_file:
+        json.dump(coordinates, coords_file, indent=4)
+
+
 class Colors(NamedTuple):
     text = (55, 57, 61)  # The color of text in the Variable Input field (black)
     white = (229, 225, 216)  # The white background of the Variable Input field
@@ -63,71 +100,72 @@ class ImageCoords(NamedTuple):
     max_x: int
 
 
-def found_colors(main_color: tuple[int, int, int], coordinates: ImageCoords) -> bool:
+def corners_to_box(corners: Sequence[Coords]) -> Box:
     """
-    Returns True if `main_color` is found in the given coordinates
+    :param corners: [(top_left_corner), (bottom_right_corner)], like the coordinates of `color_in_coords`
+    :return: The same pixels as a `backend.Box`
+    """
+    (left, top), (right, bottom) = corners
+    return left, top, right, bottom
 
-    :param main_color: The color to compare the detected color to
-    :param coordinates: Coordinates of the window of pixels to be checked and compared
-    :return: If the color in any of the pixels match the `main_color`
+
+def color_mask(pixels: np.ndarray, color: Tuple[int, int, int], tolerance: int = 30) -> np.ndarray:
+    """
+    :param pixels: RGB pixels (an array or an image), shape (..., 3)
+    :param color: The color to look for
+    :param tolerance: Max variation between colors, per channel
+    :return: Which pixels are `color` (± `tolerance`), shape (...)
+    """
+    return (np.abs(np.asarray(pixels, dtype=np.int16) - color) < tolerance).all(axis=-1)
+
+
+def color_hits(pixels: np.ndarray, color: Tuple[int, int, int], tolerance: int = 30) -> int:
     """
+    :return: How many pixels are `color` (± `tolerance` per channel)
+    """
+    return int(np.count_nonzero(color_mask(pixels, color, tolerance)))
 
-    def is_color(compare_color: tuple[int, int, int], main_color_: tuple[int, int, int], tolerance: int = 30) -> bool:
-        """
-        Compare `compare_color` to `main_color` with a given tolerance
 
-        :param compare_color: The color that is being compared
-        :param main_color_: The color that is being compared
-        :param tolerance: How close the colors can be (1 - 255)
-        :return: Is `compare_color` same/similar as `main_color`
-        """
-        return ((abs(compare_color[0] - main_color_[0]) < tolerance)
-                and (abs(compare_color[1] - main_color_[1]) < tolerance)
-                and (abs(compare_color[2] - main_color_[2]) < tolerance))
+def color_fraction(pixels: np.ndarray, color: Tuple[int, int, int], tolerance: int = 30) -> float:
+    """
+    :return: Part of the pixels that are `color` (± `tolerance` per channel), 0 - 1
+    """
+    mask = color_mask(pixels, color, tolerance)
+    return float(mask.mean()) if mask.size else 0.0
 
-    image = ImageGrab.grab()
 
-    for coords_x in range(coordinates.min_x, coordinates.max_x):
-        if is_color(image.getpixel((coords_x, coordinates.min_y)), main_color):
-            return True
+def found_colors(main_color: tuple[int, int, int], coordinates: ImageCoords, backend: Backend = None) -> bool:
+    """
+    Returns True if `main_color` is found in the given coordinates
 
-    return False
+    :param main_color: The color to compare the detected color to
+    :param coordinates: Coordinates of the window of pixels to be checked and compared
+    :param backend: Where to take the screenshot, defaults to `backend.get_backend()`
+    :return: If the color in any of the pixels match the `main_color`
+    """
+    # Only the row at `min_y` is checked, so only that row is captured
+    row = (backend or get_backend()).grab((coordinates.min_x, coordinates.min_y,
+                                           coordinates.max_x, coordinates.min_y + 1))
+    return color_hits(row, main_color) > 0
 
 
-def color_in_coords(image: Image, color: Tuple[int, int, int], coordinates: List[Tuple[int, int]],
-                    tolerance: int = 30) -> bool:
+def color_in_coords(image: Optional[Image], color: Tuple[int, int, int], coordinates: List[Tuple[int, int]],
+                    tolerance: int = 30, backend: Backend = None) -> bool:
     """
     Returns True if `main_color` is found in the given coordinates given a tolerance
 
-    :param image: The image from which the colors to compare will be taken
+    :param image: The image from which the colors to compare will be taken; if None, only the pixels in
+    `coordinates` are captured from the screen
     :param color: The color to compare the detected color to
     :param coordinates: Coordinates of the window of pixels to be checked and compared
     [(top_left_corner), (bottom_right_corner)]
     :param tolerance: Max variation between colors
+    :param backend: Where to take the screenshot if there's no `image`, defaults to `backend.get_backend()`
     :return: If the color in any of the pixels match the `main_color`
     """
-
-    # coordinates: [
-    #   (min_x, min_y)
-    #   (max_x, max_y)
-    # ]
-
-    def is_color(compare_color_: Tuple[int, int, int]) -> bool:
-        """
-        Compare `compare_color` to `main_color` with a given tolerance
-
-        :param compare_color_: The color that is being compared to the `main_color`
-        :return: Is `compare_color` same/+-tolerance as `main_color`
-        """
-        nonlocal color, tolerance
-        return ((abs(compare_color_[0] - color[0]) < tolerance)
-                and (abs(compare_color_[1] - color[1]) < tolerance)
-                and (abs(compare_color_[2] - color[2]) < tolerance))
-
-    image_colors = image.load()
-    for y in range(coordinates[0][1], coordinates[1][1], 1):
-        for x in range(coordinates[0][0], coordinates[1][0], 1):
-            compare_color: Tuple[int, int, int] = image_colors[x, y]
-            if is_color(compare_color_=compare_color):
-                return True
-    return False
+    box = corners_to_box(coordinates)
+    if image is None:
+        pixels = np.asarray((backend or get_backend()).grab(box))
+    else:
+        pixels = np.asarray(image.convert("RGB"))[box[1]:box[3], box[0]:box[2]]
+    return bool(color_mask(pixels, color, tolerance).any())
@@ -0,0 +1,106 @@
+"""
+Ordered dithering. Every pixel gets an offset from a small threshold map that repeats over the image, and is then
+mapped to its closest palette color. Unlike error diffusion (Floyd-Steinberg) every pixel is independent, so the whole
+image is done with a few array operations, and flat areas stay flat, which keeps runs long.
+
+Methods:
+    bayer2, bayer4, bayer8 - Bayer matrices, a regular crosshatch pattern
+    blue-noise - a 64x64 blue noise mask, an even pattern without visible structure
+"""
+from functools import lru_cache
+from typing import Sequence, Tuple
+
+import numpy as np
+from PIL import Image
+
+from color_lookup import nearest_indices
+
+METHODS: Tuple[str, ...] = ("bayer2", "bayer4", "bayer8", "blue-noise")
+BLUE_NOISE_SIZE: int = 64
+
+
+def bayer_matrix(size: int) -> np.ndarray:
+    """
+    :param size: Width and height of the matrix, a power of 2
+    :return: Bayer matrix with the values 0 to size² - 1
+    """
+    if size < 1 or size & (size - 1):
+        raise ValueError("The size of a Bayer matrix has to be a power of 2")
+    matrix = np.zeros((1, 1), dtype=np.int64)
+    while len(matrix) < size:
+        matrix = np.block([[4 * matrix, 4 * matrix + 2],
+                           [4 * matrix + 3, 4 * matrix + 1]])
+    return matrix
+
+
+def blue_noise_mask(size: int = BLUE_NOISE_SIZE, seed: int = 0) -> np.ndarray:
+    """
+    Approximate blue noise: white noise without its low frequencies, ranked so that every value appears once
+
+    :param size: Width and height of the mask
+    :param seed: Seed of the white noise
+    :return: Mask with the values 0 to size² - 1
+    """
+    noise = np.random.default_rng(seed).random((size, size))
+    frequencies = np.hypot(*np.meshgrid(np.fft.fftfreq(size), np.fft.fftfreq(size), indexing="ij"))
+    # High-pass filter; the FFT wraps around, so the mask tiles without seams
+    filtered = np.fft.ifft2(np.fft.fft2(noise) * (1 - np.exp(-(frequencies / 0.15) ** 2))).real
+    return np.argsort(np.argsort(filtered, axis=None)).reshape(size, size)
+
+
+@lru_cache(maxsize=16)
+def threshold_map(method: str) -> np.ndarray:
+    """
+    :param method: One of `METHODS`
+    :return: Thresholds between -0.5 and 0.5, spread evenly
+    """
+    if method.startswith("bayer") and method in METHODS:
+        ranks = bayer_matrix(int(method[len("bayer"):]))
+    elif method == "blue-noise":
+        ranks = blue_noise_mask()
+    else:
+        raise ValueError(f"Unknown dither method {method!r}, use one of {METHODS}")
+
+    thresholds = (ranks + 0.5) / ranks.size - 0.5
+    thresholds.setflags(write=False)
+    return thresholds
+
+
+def palette_spread(palette_size: int) -> float:
+    """
+    :param palette_size: Number of palette colors
+    :return: Half the width of one cell if the palette colors were spread evenly over the RGB cube; the default size
+        of the dither offsets. Larger offsets keep more detail, but break flat areas into more runs.
+    """
+    return 127.5 / np.cbrt(palette_size)
+
+
+def ordered_dither(img: Image, palette: Sequence[Tuple[int, int, int]], method: str = "bayer4",
+                   strength: float = 1.0, metric: str = "rgb") -> Image:
+    """
+    Convert the image into palette colors with ordered dithering
+
+    :param img: The image
+    :param palette: RGB palette colors
+    :param method: One of `METHODS`
+    :param strength: Size of the dither offsets, relative to `palette_spread`; 0 is no dithering
+    :param metric: Color distance used to find the closest palette color, see `color_lookup.METRICS`
+    :return: New RGB image that only has colors from the palette; with `strength` 0 every pixel has its closest color
+    """
+    pixels = np.asarray(img.convert("RGB"), dtype=np.int16)
+    height, width = pixels.shape[:2]
+
+    offsets = np.rint(threshold_map(method) * strength * palette_spread(len(palette))).astype(np.int16)
+    size = len(offsets)
+    # Repeat the map over the image. Every channel gets the same offset, so only the lightness is dithered, not the hue
+    tiled = np.tile(offsets, (-(-height // size), -(-width // size)))[:height, :width]
+    pixels += tiled[..., None]
+    np.clip(pixels, 0, 255, out=pixels)
+
+    # The exact closest color of every distinct color; a (6-bit) lookup table would add its own error to the pattern
+    keys = (pixels[..., 0].astype(np.int32) << 16) | (pixels[..., 1].astype(np.int32) << 8) | pixels[..., 2]
+    colors, inverse = np.unique(keys, return_inverse=True)
+    colors = np.stack(((colors >> 16) & 0xFF, (colors >> 8) & 0xFF, colors & 0xFF), axis=1)
+    palette = np.asarray(palette, dtype=np.uint8)
+    indices = nearest_indices(colors, palette, metric)[inverse.reshape(height, width)]
+    return Image.fromarray(palette[indices])
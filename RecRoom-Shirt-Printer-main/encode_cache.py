@@ -0,0 +1,181 @@
+"""
+On-disk cache for converted (quantized) images and encoded strings.
+Entries are addressed by a hash of the image pixels and every setting that changes the result, so opening the same
+image again - or retrying an import after a failed session - skips converting and encoding.
+The least recently used entries are deleted once the cache grows over `MAX_CACHE_SIZE`.
+
+One `EncodeCache` can be shared by threads (e.g. the encoder thread of `pipeline`). The index is only written after
+a store or an eviction, through a temp file of its own, merged with the entries other processes stored meanwhile.
+"""
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from PIL import Image
+
+CACHE_DIR = Path("cache") / "encoded"
+MAX_CACHE_SIZE: int = 256 * 1024 * 1024  # Bytes
+
+_default_cache: Optional["EncodeCache"] = None
+_cache_lock = threading.Lock()  # The encoder thread of `pipeline` and the main thread can ask for it at the same time
+
+
+class EncodeCache:
+    def __init__(self, path: Path = CACHE_DIR, max_size: int = MAX_CACHE_SIZE):
+        self.path = Path(path)
+        self.max_size = max_size
+        self.index_path = self.path / "index.json"
+        self._lock = threading.RLock()  # Guards `index`
+        self.index: Dict = self._read_index()
+
+    def _read_index(self) -> Dict:
+        try:
+            with open(self.index_path, "r", encoding="UTF-8") as index_file:
+                return json.load(index_file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {"entries": {}, "hits": 0, "misses": 0}
+
+    def _replace(self, name: str, data: bytes) -> None:
+        """
+        Write a file of the cache through a temp file of its own, so nobody reads half of it
+        """
+        self.path.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=self.path, prefix=f"{name}-", suffix=".tmp", delete=False) as temp_file:
+            temp_file.write(data)
+        try:
+            os.replace(temp_file.name, self.path / name)
+        except OSError:
+            os.remove(temp_file.name)
+            raise
+
+    def _write_index(self) -> None:
+        # Keep the entries another process stored since the index was read
+        for name, entry in self._read_index()["entries"].items():
+            if name not in self.index["entries"] and (self.path / name).exists():
+                self.index["entries"][name] = entry
+        self._replace(self.index_path.name, json.dumps(self.index).encode("UTF-8"))
+
+    @staticmethod
+    def key(img: Image, **settings) -> str:
+        """
+        :param img: The image
+        :param settings: Everything else the cached result depends on (palette version, dither mode, ...)
+        :return: Hash of the image pixels and the settings
+        """
+        digest = hashlib.sha256()
+        digest.update(f"{img.mode} {img.size} {sorted(settings.items())}".encode())
+        digest.update(img.tobytes())
+        return digest.hexdigest()
+
+    def _lookup(self, name: str) -> Optional[Path]:
+        # Only kept in memory; written with the next store
+        with self._lock:
+            entry = self.index["entries"].get(name)
+            file_path = self.path / name
+            if entry and file_path.exists():
+                entry["used"] = time.time()
+                self.index["hits"] += 1
+                return file_path
+
+            self.index["entries"].pop(name, None)
+            self.index["misses"] += 1
+            return None
+
+    def _forget(self, name: str) -> None:
+        """
+        Count a hit on an entry that couldn't be read as a miss and delete the entry
+        """
+        with self._lock:
+            self.index["entries"].pop(name, None)
+            self.index["hits"] -= 1
+            self.index["misses"] += 1
+            try:
+                os.remove(self.path / name)
+            except OSError:
+                pass
+
+    def _store(self, name: str) -> None:
+        with self._lock:
+            self.index["entries"][name] = {"size": (self.path / name).stat().st_size, "used": time.time()}
+            self.evict()
+
+    def get_image(self, key: str) -> Optional[Image.Image]:
+        """
+        :return: The cached image, or None
+        """
+        file_path = self._lookup(f"{key}.png")
+        if not file_path:
+            return None
+        try:
+            with Image.open(file_path) as img:
+                return img.convert("RGB")
+        except OSError:
+            self._forget(file_path.name)  # Deleted meanwhile or cut off
+            return None
+
+    def put_image(self, key: str, img: Image) -> None:
+        png = io.BytesIO()
+        img.save(png, "PNG")
+        self._replace(f"{key}.png", png.getvalue())
+        self._store(f"{key}.png")
+
+    def get_strings(self, key: str) -> Optional[List[str]]:
+        """
+        :return: The cached strings, or None
+        """
+        file_path = self._lookup(f"{key}.txt")
+        if not file_path:
+            return None
+        try:
+            with open(file_path, "r", encoding="UTF-8") as strings_file:
+                return strings_file.read().split("\n")
+        except (OSError, UnicodeDecodeError):
+            self._forget(file_path.name)
+            return None
+
+    def put_strings(self, key: str, img_data: List[str]) -> None:
+        self._replace(f"{key}.txt", "\n".join(img_data).encode("UTF-8"))
+        self._store(f"{key}.txt")
+
+    def evict(self) -> None:
+        """
+        Delete the least recently used entries until the cache is smaller than `max_size`, and write the index
+        """
+        with self._lock:
+            entries: Dict = self.index["entries"]
+            size = sum(entry["size"] for entry in entries.values())
+            for name in sorted(entries, key=lambda name_: entries[name_]["used"]):
+                if size <= self.max_size:
+                    break
+                size -= entries.pop(name)["size"]
+                try:
+                    os.remove(self.path / name)
+                except FileNotFoundError:
+                    pass
+            self._write_index()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        :return: Hits, misses, number of entries and total size in bytes
+        """
+        with self._lock:
+            entries = self.index["entries"]
+            return {"hits": self.index["hits"], "misses": self.index["misses"],
+                    "entries": len(entries), "size": sum(entry["size"] for entry in entries.values())}
+
+
+def get_cache() -> EncodeCache:
+    """
+    :return: The cache in `CACHE_DIR`, shared by everything in this process
+    """
+    global _default_cache
+    with _cache_lock:
+        if _default_cache is None:
+            _default_cache = EncodeCache()
+    return _default_cache
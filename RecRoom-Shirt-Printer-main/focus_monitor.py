@@ -0,0 +1,160 @@
+"""
+Watching which window is in focus, so the import loops don't have to ask for every string.
+
+    FocusMonitor - a background thread that checks the title of the active window every `POLL_INTERVAL` seconds and
+        keeps the result: `focused` is set while the window is in focus and cleared while it isn't
+
+`FocusMonitor.wait` returns right away (without asking the system) while the window is in focus, and blocks on the
+event otherwise, so an import goes on as soon as the player switches back to the game. Backends that don't run on the
+real clock (`simulated_backend`) are checked on their own clock instead of in a thread.
+
+The thread only runs while an import holds the monitor (`FocusMonitor.hold` / `release`, or `with monitor:`) and stops
+when the last one releases it; without it, `wait` asks the system itself, which is enough for a single check.
+"""
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from backend import Backend, get_backend
+
+POLL_INTERVAL: float = 0.05  # Seconds between checks of the active window
+
+_monitors: Dict[str, "FocusMonitor"] = {}  # Shared monitors by window title, see `get_monitor`
+
+
+class FocusMonitor:
+    """
+    Whether one window is in focus, kept up to date in the background
+    """
+
+    def __init__(self, window_title: str = "Rec Room", backend: Backend = None, interval: float = POLL_INTERVAL,
+                 on_change: Callable[[bool], None] = None):
+        """
+        :param window_title: (Part of) the title of the window
+        :param backend: Where to check, defaults to `backend.get_backend()`
+        :param interval: Seconds between checks
+        :param on_change: Called with True when the window gets the focus and with False when it loses it
+            (from the thread of the monitor)
+        """
+        self.window_title = window_title
+        self.backend = backend or get_backend()
+        self.interval = interval
+        self.on_change = on_change
+        self.focused = threading.Event()  # Set while the window is in focus
+        self.changes: List[Tuple[float, bool]] = []  # (time, focused) every time the focus changed
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._holders: int = 0  # Imports that need the thread, see `hold`
+        self._lock = threading.Lock()
+
+    def check(self) -> bool:
+        """
+        Ask which window is active now and update the state
+
+        :return: The window is in focus
+        """
+        focused = self.window_title in self.backend.active_window_title()
+        if focused != self.focused.is_set() or not self.changes:
+            self.changes.append((self.backend.time(), focused))
+            if focused:
+                self.focused.set()
+            else:
+                self.focused.clear()
+            if self.on_change:
+                self.on_change(focused)
+        return focused
+
+    def start(self) -> "FocusMonitor":
+        """
+        Check the focus now and keep checking it in a thread (only for backends on the real clock)
+        """
+        self.check()
+        if self.backend.realtime and self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._watch, name="focus monitor", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """
+        End the thread
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def hold(self) -> "FocusMonitor":
+        """
+        Keep the thread running until `release` (e.g. for the loop of an import); the monitor can be held more than
+        once at the same time
+        """
+        with self._lock:
+            self.start()
+            self._holders += 1
+        return self
+
+    def release(self) -> None:
+        """
+        End one `hold`; the thread stops when nothing holds the monitor anymore
+        """
+        with self._lock:
+            self._holders = max(0, self._holders - 1)
+            if not self._holders:
+                self.stop()
+
+    def __enter__(self) -> "FocusMonitor":
+        return self.hold()
+
+    def __exit__(self, *exc_info) -> None:
+        self.release()
+
+    @property
+    def losses(self) -> int:
+        """
+        :return: How often the window lost the focus
+        """
+        return sum(not focused for _, focused in self.changes[1:])
+
+    def wait(self) -> float:
+        """
+        Return right away while the window is in focus, otherwise wait until it is
+
+        :return: Seconds waited
+        """
+        if self._thread is None and not self.check():
+            # No thread: wait on the clock of the backend
+            print(f"Waiting for {self.window_title} to become the active window... ", end="\r", flush=True)
+            started = self.backend.time()
+            self.backend.wait_until(self.check, float("inf"), self.interval)
+            print(" " * 70, end="\r")  # Empty the last line in the console
+            return self.backend.time() - started
+        if self.focused.is_set():
+            return 0.0
+
+        print(f"Waiting for {self.window_title} to become the active window... ", end="\r", flush=True)
+        started = time.perf_counter()
+        self.focused.wait()
+        print(" " * 70, end="\r")
+        return time.perf_counter() - started
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception:
+                pass  # Keep the last state, the next check may work
+
+
+def get_monitor(window_title: str = "Rec Room", backend: Backend = None) -> FocusMonitor:
+    """
+    :return: The monitor of `window_title` on `backend` (defaults to `backend.get_backend()`), shared by everything in
+        this process; its thread only runs while it is held (`FocusMonitor.hold`)
+    """
+    backend = backend or get_backend()
+    monitor = _monitors.get(window_title)
+    if monitor is None or monitor.backend is not backend:
+        if monitor is not None:
+            monitor.stop()
+        monitor = _monitors[window_title] = FocusMonitor(window_title, backend)
+    return monitor
@@ -0,0 +1,105 @@
+"""
+Journal of a running import, for resuming it after a crash or a stop.
+
+After every string that Rec Room accepted, the importers write the index of that string into `JOURNAL_PATH`, with a
+hash of the job up to that string (the import method and every string so far) and a checksum of the string. With
+`--resume` an import starts right after the last journaled string - if the strings before it are the same - so a
+crash costs at most the one string that was being imported. Only the strings up to the journaled one are hashed, so
+an import can be resumed while its strings are still being encoded (see `pipeline`).
+
+The file is written to a temporary file first and then moved over the old one (`os.replace`), so it's never half
+written, even if the computer turns off in the middle of a write.
+"""
+import hashlib
+import json
+import os
+import time
+import zlib
+from itertools import chain, islice
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+JOURNAL_PATH: str = "import_journal.json"
+
+
+def job_hash(img_data: Iterable[str], method: str) -> str:
+    """
+    :param img_data: The strings of the import, up to the last imported one
+    :param method: The import method, see `job_history.IMPORT_METHODS`
+    :return: Hash of the job, changes when any of the strings changes
+    """
+    digest = hashlib.sha1(method.encode())
+    for string in img_data:
+        digest.update(b"\n" + string.encode())
+    return digest.hexdigest()[:16]
+
+
+def checksum(string: str) -> str:
+    """
+    :return: CRC-32 of the string, as 8 hex digits
+    """
+    return "%08x" % zlib.crc32(string.encode())
+
+
+class ImportJournal:
+    """
+    The journal of one import job
+    """
+
+    def __init__(self, method: str, path: str = JOURNAL_PATH):
+        """
+        :param method: The import method, see `job_history.IMPORT_METHODS`
+        :param path: The journal file
+        """
+        self.method = method
+        self.path = Path(path)
+        self._digest = hashlib.sha1(method.encode())  # Hash of the strings recorded so far
+
+    def load(self) -> Optional[Dict]:
+        """
+        :return: The journal file, None if there is none (or it can't be read)
+        """
+        try:
+            with open(self.path, "r", encoding="UTF-8") as journal_file:
+                return json.load(journal_file)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def pending(self, img_data: Iterable[str], resume: bool = False) -> Iterator[Tuple[int, str]]:
+        """
+        The strings that still have to be imported. Every one of them has to be recorded (`record`), in order, once
+        it's imported.
+
+        :param img_data: All strings of the import; any iterable, it's only read as far as it's needed
+        :param resume: Skip the strings up to the last journaled one, if they are the strings of the journal
+        :return: (index, string) of every string to import
+        """
+        strings = iter(img_data)
+        entry = self.load() if resume else None
+        done = []
+        if entry and entry.get("method") == self.method:
+            done = list(islice(strings, entry["index"] + 1))
+            if (len(done) == entry["index"] + 1 and job_hash(done, self.method) == entry["job"]
+                    and checksum(done[-1]) == entry.get("checksum")):
+                print(f"Resuming at string #{len(done)}")
+                for string in done:
+                    self._digest.update(b"\n" + string.encode())
+                yield from enumerate(strings, len(done))
+                return
+        if resume:
+            print(f"`{self.path}` is not a journal of these strings, starting from the beginning")
+        yield from enumerate(chain(done, strings))
+
+    def record(self, index: int, string: str) -> None:
+        """
+        Save that `string`, at `index`, (and every one before it) was imported
+        """
+        self._digest.update(b"\n" + string.encode())
+        entry = {"job": self._digest.hexdigest()[:16], "method": self.method, "index": index,
+                 "checksum": checksum(string), "time": time.time()}
+        temp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(temp_path, "w", encoding="UTF-8") as journal_file:
+            json.dump(entry, journal_file)
+            journal_file.flush()
+            os.fsync(journal_file.fileno())
+        os.replace(temp_path, self.path)
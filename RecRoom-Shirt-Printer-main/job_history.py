@@ -0,0 +1,277 @@
+"""
+Local history of encoding, importing and printing sessions, and time estimates based on it.
+
+Every session is saved in a SQLite database (`HISTORY_PATH`). The time models start with the old fixed guesses and
+are replaced by a least squares fit as soon as there are `MIN_SESSIONS` sessions of the same kind:
+    import - seconds = strings × (a + b × delay) + retries × c × delay, per import method
+    print - seconds = chars × p
+    encode - seconds = pixels × e
+
+Examples:
+    python job_history.py                     (show the recent sessions and the fitted models)
+    python job_history.py plan image_data.txt
+    python job_history.py record-print 5400 image_data.txt
+"""
+import argparse
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+HISTORY_PATH = Path("job_history.sqlite")
+MIN_SESSIONS: int = 3  # Sessions needed before a model is fitted
+
+IMPORT_METHODS: Tuple[str, ...] = ("variable", "list_create")
+DEFAULT_DELAY: float = 0.3
+# (a, b, c) of the import model before there is any history, from the sleeps in the importing loops
+DEFAULT_IMPORT_MODELS: Dict[str, Tuple[float, float, float]] = {
+    "variable": (0.0, 3.0, 3.0),  # click > paste > confirm
+    "list_create": (0.5, 5.33, 5.0),  # select > click > paste > done > esc > next, plus finding the "Done" button
+}
+DEFAULT_PRINT_SECONDS_PER_CHAR: float = 0.025 * 2.5  # Printer delay of 0.025 sec, 2.5 delays per char
+DEFAULT_ENCODE_SECONDS_PER_PIXEL: float = 1e-7
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,             -- "encode", "import" or "print"
+    method TEXT,                    -- import method, see `IMPORT_METHODS`
+    started REAL NOT NULL,          -- Unix time
+    seconds REAL NOT NULL,
+    pixels INTEGER DEFAULT 0,
+    strings INTEGER DEFAULT 0,
+    chars INTEGER DEFAULT 0,
+    runs INTEGER DEFAULT 0,
+    delay REAL DEFAULT 0,
+    retries INTEGER DEFAULT 0,
+    completed INTEGER DEFAULT 1,
+    source TEXT                     -- image or file the session was about
+)
+"""
+
+_default_history: Optional["JobHistory"] = None
+_history_lock = threading.Lock()  # The encoder thread of `pipeline` and the main thread can open it at the same time
+
+
+class JobHistory:
+    def __init__(self, path: Path = HISTORY_PATH):
+        self.path = Path(path)
+        # Batch encoding and the GUI can record at the same time, wait for the other writer.
+        # The encoder of `pipeline` records from its own thread, so the connection is shared between threads and
+        # only used by one of them at a time
+        self.connection = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self.connection:
+            self.connection.execute(SCHEMA)
+
+    def record(self, kind: str, seconds: float, method: str = None, pixels: int = 0, strings: int = 0,
+               chars: int = 0, runs: int = 0, delay: float = 0.0, retries: int = 0, completed: bool = True,
+               source: str = None, started: float = None) -> int:
+        """
+        Save one session
+
+        :param kind: "encode", "import" or "print"
+        :param seconds: How long the session took
+        :param method: The import method, one of `IMPORT_METHODS`
+        :param pixels: Pixels of the image
+        :param strings: Strings encoded/imported
+        :param chars: Chars in those strings
+        :param runs: Runs in those strings
+        :param delay: The delay used for importing
+        :param retries: Failed pastes/confirms that had to be repeated
+        :param completed: False if the session was stopped before it was done
+        :param source: The image or file
+        :param started: Unix time of the start, defaults to now - `seconds`
+        :return: ID of the session
+        """
+        started = started if started is not None else time.time() - seconds
+        with self._lock, self.connection:
+            cursor = self.connection.execute(
+                "INSERT INTO sessions (kind, method, started, seconds, pixels, strings, chars, runs, delay, retries, "
+                "completed, source) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (kind, method, started, seconds, pixels, strings, chars, runs, delay, retries, int(completed),
+                 source))
+        return cursor.lastrowid
+
+    def sessions(self, kind: str = None, method: str = None, limit: int = None) -> List[sqlite3.Row]:
+        """
+        :return: The sessions, newest first
+        """
+        query = "SELECT * FROM sessions WHERE (? IS NULL OR kind = ?) AND (? IS NULL OR method = ?) " \
+                "ORDER BY started DESC"
+        if limit:
+            query += f" LIMIT {int(limit)}"
+        with self._lock:
+            return self.connection.execute(query, (kind, kind, method, method)).fetchall()
+
+    def import_model(self, method: str) -> Tuple[Tuple[float, float, float], float, int]:
+        """
+        :param method: One of `IMPORT_METHODS`
+        :return: (a, b, c) of the import model, retries per string, and the number of sessions the model is fitted
+            on (0 if it's the default model)
+        """
+        rows = [row for row in self.sessions("import", method) if row["strings"] > 0]
+        strings = sum(row["strings"] for row in rows)
+        retry_rate = sum(row["retries"] for row in rows) / strings if strings else 0.0
+        if len(rows) < MIN_SESSIONS:
+            return DEFAULT_IMPORT_MODELS[method], retry_rate, 0
+
+        features = np.array([(row["strings"], row["strings"] * row["delay"], row["retries"] * row["delay"])
+                             for row in rows], dtype=np.float64)
+        seconds = np.array([row["seconds"] for row in rows], dtype=np.float64)
+        coefficients = np.linalg.lstsq(features, seconds, rcond=None)[0]
+        # With only one delay in the history `a` and `b` can't be told apart; a negative time per string or retry
+        # is never right, so fall back to the default for those
+        default = DEFAULT_IMPORT_MODELS[method]
+        model = tuple(float(value) if value >= 0 else fallback for value, fallback in zip(coefficients, default))
+        return model, retry_rate, len(rows)
+
+    def rate(self, kind: str, column: str, default: float) -> Tuple[float, int]:
+        """
+        :param kind: "print" or "encode"
+        :param column: What the time is proportional to ("chars" or "pixels")
+        :param default: Seconds per unit before there is any history
+        :return: Seconds per unit, and the number of sessions it's fitted on (0 if it's the default)
+        """
+        rows = [row for row in self.sessions(kind) if row[column] > 0 and row["completed"]]
+        if len(rows) < MIN_SESSIONS:
+            return default, 0
+        return sum(row["seconds"] for row in rows) / sum(row[column] for row in rows), len(rows)
+
+    def plan(self, strings: int, chars: int, pixels: int = 0, delay: float = DEFAULT_DELAY) -> Dict[str, Dict]:
+        """
+        Predict how long importing and printing an image will take
+
+        :param strings: Number of strings
+        :param chars: Number of chars in all strings
+        :param pixels: Number of pixels, for the encoding time
+        :param delay: The importing delay
+        :return: For every import method: `import_seconds`, `print_seconds`, `encode_seconds`, `total_seconds`
+            (import + print), the expected `retries`, and `calibrated_from` / `print_calibrated_from` - number of
+            sessions the models are fitted on (0: default guess)
+        """
+        print_rate, print_sessions = self.rate("print", "chars", DEFAULT_PRINT_SECONDS_PER_CHAR)
+        encode_rate, _ = self.rate("encode", "pixels", DEFAULT_ENCODE_SECONDS_PER_PIXEL)
+
+        plans = {}
+        for method in IMPORT_METHODS:
+            (a, b, c), retry_rate, sessions = self.import_model(method)
+            retries = retry_rate * strings
+            import_seconds = strings * (a + b * delay) + retries * c * delay
+            plans[method] = {"import_seconds": import_seconds, "print_seconds": chars * print_rate,
+                             "encode_seconds": pixels * encode_rate,
+                             "total_seconds": import_seconds + chars * print_rate,
+                             "retries": retries, "calibrated_from": sessions,
+                             "print_calibrated_from": print_sessions}
+        return plans
+
+    def close(self) -> None:
+        with self._lock:
+            self.connection.close()
+
+
+def get_history() -> JobHistory:
+    """
+    :return: The history in `HISTORY_PATH`, shared by everything in this process
+    """
+    global _default_history
+    with _history_lock:
+        if _default_history is None:
+            _default_history = JobHistory()
+    return _default_history
+
+
+def record(kind: str, seconds: float, **session) -> Optional[int]:
+    """
+    Save a session in the default history. Never fails - a broken history file must not stop an import.
+
+    :return: ID of the session, or None if it couldn't be saved
+    """
+    try:
+        return get_history().record(kind, seconds, **session)
+    except sqlite3.Error as e:
+        print(f"Could not save the session to {HISTORY_PATH}: {e}")
+        return None
+
+
+def plan(img_data: Iterable[str], pixels: int = 0, delay: float = DEFAULT_DELAY) -> Dict[str, Dict]:
+    """
+    `JobHistory.plan` for a list of strings, using the default history
+
+    :param img_data: The encoded strings
+    :param pixels: Number of pixels of the image
+    :param delay: The importing delay
+    :return: See `JobHistory.plan`
+    """
+    img_data = [string for string in img_data if string not in ("BEGIN", "END")]
+    return get_history().plan(len(img_data), sum(map(len, img_data)), pixels, delay)
+
+
+def format_duration(seconds: float) -> str:
+    """
+    :return: The duration as "1 h 5 min", "12 min 30 sec" or "45 sec"
+    """
+    seconds = int(round(seconds))
+    if seconds >= 3600:
+        return f"{seconds // 3600} h {seconds % 3600 // 60} min"
+    if seconds >= 60:
+        return f"{seconds // 60} min {seconds % 60} sec"
+    return f"{seconds} sec"
+
+
+def describe_plan(plans: Dict[str, Dict]) -> List[str]:
+    """
+    :return: One line per import method, for printing
+    """
+    names = {"variable": "Variable Importing", "list_create": "List Create Importing"}
+    lines = []
+    for method, estimate in plans.items():
+        source = f"from {estimate['calibrated_from']} sessions" if estimate["calibrated_from"] else "default guess"
+        lines.append(f"{names.get(method, method)}: import {format_duration(estimate['import_seconds'])} "
+                     f"({source}), print {format_duration(estimate['print_seconds'])}")
+    return lines
+
+
+def read_strings(path: str) -> List[str]:
+    with open(path, "r", encoding="UTF-8") as strings_file:
+        # Saved files from the GUI have a "#<n> - " prefix on every line
+        return [line.strip().split(" ")[-1] for line in strings_file if line.strip()]
+
+
+def main(args: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Show the session history and time estimates.")
+    subparsers = parser.add_subparsers(dest="command")
+    plan_parser = subparsers.add_parser("plan", help="Estimate the import and print time of encoded strings")
+    plan_parser.add_argument("file", help="Encoded strings, one per line")
+    plan_parser.add_argument("--delay", type=float, default=DEFAULT_DELAY, help="Importing delay")
+    print_parser = subparsers.add_parser("record-print", help="Save how long printing an image took")
+    print_parser.add_argument("seconds", type=float)
+    print_parser.add_argument("file", help="The encoded strings that were printed")
+    args = parser.parse_args(args)
+
+    history = get_history()
+    if args.command == "plan":
+        print("\n".join(describe_plan(plan(read_strings(args.file), delay=args.delay))))
+    elif args.command == "record-print":
+        img_data = read_strings(args.file)
+        record("print", args.seconds, strings=len(img_data), chars=sum(map(len, img_data)), source=args.file)
+        print("Saved")
+    else:
+        print(f"{'Started':19} {'Kind':7} {'Method':12} {'Strings':>8} {'Retries':>8} {'Time':>14}")
+        for row in history.sessions(limit=20):
+            print(f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(row['started']))} {row['kind']:7} "
+                  f"{row['method'] or '':12} {row['strings']:>8} {row['retries']:>8} "
+                  f"{format_duration(row['seconds']):>14}{'' if row['completed'] else ' (stopped)'}")
+        print()
+        for method in IMPORT_METHODS:
+            (a, b, c), retry_rate, sessions = history.import_model(method)
+            print(f"{method}: {a:.3f} + {b:.3f} × delay sec per string, {c:.3f} × delay sec per retry, "
+                  f"{retry_rate:.3f} retries per string ({sessions or 'no'} sessions)")
+
+
+if __name__ == "__main__":
+    main()
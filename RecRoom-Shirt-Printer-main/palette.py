@@ -0,0 +1,170 @@
+"""
+Palettes for encoding: the RGB colors and the symbol every color is written as.
+`Encoding.DEFAULT_PALETTE` is `Encoding.RR_PALETTE`; custom palettes come from `Color_Compiler.compile_palette`
+or are loaded from the "-RGB.txt" / "-Hex.txt" files the Color Compiler writes.
+
+A pixel's palette index is its position in the palette. Index `len(palette)` is the copy run of format v2
+(`COPY_SYMBOL`, see `Encoding.RunLengthEncoder`).
+"""
+import hashlib
+import re
+from pathlib import Path
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+# Typing alias for color
+PixelColor = Tuple[int, int, int]
+
+# Format v2 (`row_delta`): "[count]`" copies `count` pixels from one row above (one column before for vertical prints),
+# in every scan order, see `scan_order.previous_line`
+COPY_SYMBOL: str = "`"
+
+# Every symbol a color can be written as, in order. The first 107 are the Rec Room colors of `Encoding.RR_PALETTE`.
+SYMBOLS: Tuple[str, ...] = tuple(
+    "!#$%&()*+,./:;<=>?@[Ñ]^_{|}~¢£¤¥¦§¨©ª«¬Ö®¯°±²³´µ¶·¸¹º»¼½¾¿ÀÈßÄêöØÐÝäîŒÇŽÿÚÉ"
+    "ÊÆËÙÜaƒñåÅëÏïùýÃÂžÁÒÌÍÓÔÕ€Š†‡™šœ"
+    "ŸÛãâðõ")
+
+# One line of an "-RGB.txt" file: (r, g, b): "s",
+RGB_LINE = re.compile(r'\(\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*\)\s*:\s*"(.)"')
+
+
+class Palette:
+    """
+    Colors and symbols of a palette, with the arrays the NumPy encoder and decoder need
+    """
+
+    def __init__(self, colors: Sequence[PixelColor], symbols: Sequence[str] = None, name: str = "custom"):
+        """
+        :param colors: RGB colors, every color only once
+        :param symbols: One char for every color, defaults to the first `len(colors)` of `SYMBOLS`
+        :param name: Shown to the user
+        """
+        colors = [tuple(int(value) for value in color) for color in colors]
+        symbols = list(symbols) if symbols is not None else list(SYMBOLS[:len(colors)])
+        if not colors:
+            raise ValueError("A palette needs at least one color")
+        if len(symbols) != len(colors):
+            raise ValueError(f"{len(colors)} colors need {len(colors)} symbols, got {len(symbols)} "
+                             f"(there are only {len(SYMBOLS)} symbols)")
+        if len(set(colors)) != len(colors):
+            raise ValueError("Every color can only be in the palette once")
+        if len(set(symbols)) != len(symbols):
+            raise ValueError("Every symbol can only be used once")
+        for symbol in symbols:
+            if len(symbol) != 1 or symbol in "0123456789" or symbol == COPY_SYMBOL:
+                raise ValueError(f"{symbol!r} can't be a symbol, it has to be one char that isn't a digit (0-9) "
+                                 f"or {COPY_SYMBOL!r}")
+
+        self.name = name
+        # Changes whenever a color or symbol changes; part of the cache keys
+        self.version: str = hashlib.sha1(repr(list(zip(colors, symbols))).encode()).hexdigest()[:12]
+
+        self.colors = np.array(colors, dtype=np.int32)
+        self.symbols = np.array(symbols)
+        # Every color packed into one int (0xRRGGBB), sorted so pixels can be looked up with `np.searchsorted`.
+        # Sorting by the packed value is the same as sorting the RGB tuples, which `closest_color` uses to break ties.
+        self.keys = (self.colors[:, 0] << 16) | (self.colors[:, 1] << 8) | self.colors[:, 2]
+        self.key_order = np.argsort(self.keys)
+        self.sorted_keys = self.keys[self.key_order]
+
+        self.copy_index: int = len(colors)
+        # Symbols of all runs by index: the palette colors and the copy run
+        self.run_symbols = np.append(self.symbols, COPY_SYMBOL)
+        # Inverse of `run_symbols`: run index of every symbol by its code point, -1 for chars that aren't symbols
+        self.symbol_indices = np.full(max(map(ord, self.run_symbols)) + 1, -1, dtype=np.intp)
+        self.symbol_indices[[ord(symbol) for symbol in self.run_symbols]] = np.arange(len(self.run_symbols))
+
+    def __len__(self) -> int:
+        return len(self.colors)
+
+    def __repr__(self) -> str:
+        return f"Palette({self.name!r}, {len(self)} colors)"
+
+    @property
+    def rgb(self) -> List[PixelColor]:
+        """
+        :return: The colors as a list of tuples
+        """
+        return [tuple(color) for color in self.colors.tolist()]
+
+    @property
+    def flat_colors(self) -> List[int]:
+        """
+        :return: All colors in one list, [R, G, B, R, G, B,...], for `Image.putpalette`
+        """
+        return self.colors.ravel().tolist()
+
+    def to_dict(self) -> Dict[PixelColor, str]:
+        """
+        :return: {color: symbol}, like `Encoding.RR_PALETTE`
+        """
+        return dict(zip(self.rgb, self.symbols.tolist()))
+
+    @classmethod
+    def from_dict(cls, palette: Dict[PixelColor, str], name: str = "custom") -> "Palette":
+        """
+        :param palette: {color: symbol}, like `Encoding.RR_PALETTE`
+        :param name: Shown to the user
+        """
+        return cls(list(palette.keys()), list(palette.values()), name)
+
+    @classmethod
+    def load(cls, path: str) -> "Palette":
+        """
+        Read a palette written by `save_rgb` ("(r, g, b): "s"," lines) or `save_hex` (one hex color per line,
+        the symbols are the first ones of `SYMBOLS`)
+
+        :param path: The file
+        :return: The palette
+        :raises ValueError: If a line is neither
+        """
+        colors, symbols = [], []
+        with open(path, "r", encoding="UTF-8") as palette_file:
+            for number, line in enumerate(palette_file, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                match = RGB_LINE.match(line)
+                if match:
+                    colors.append(tuple(int(value) for value in match.groups()[:3]))
+                    symbols.append(match.group(4))
+                elif re.fullmatch(r"#?[0-9a-fA-F]{6}", line):
+                    colors.append(hex_to_rgb(line))
+                else:
+                    raise ValueError(f"Line {number} of {path} is not a palette color: {line!r}")
+
+        if symbols and len(symbols) != len(colors):
+            raise ValueError(f"{path} mixes RGB and hex colors")
+        return cls(colors, symbols or None, name=Path(path).stem)
+
+    def save_rgb(self, path: str) -> None:
+        """
+        Write every color and its symbol as "(r, g, b): "s",", one per line (the format of `Encoding.RR_PALETTE`)
+        """
+        with open(path, "w", encoding="UTF-8") as palette_file:
+            palette_file.write("\n".join(f'{color}: "{symbol}",' for color, symbol in self.to_dict().items()))
+
+    def save_hex(self, path: str) -> None:
+        """
+        Write every color as a hex code without "#", one per line, for importing the colors into Rec Room
+        """
+        with open(path, "w", encoding="UTF-8") as palette_file:
+            palette_file.write("\n".join(rgb_to_hex(color) for color in self.rgb))
+
+
+def rgb_to_hex(rgb: Iterable[int]) -> str:
+    """
+    :return: The color as "rrggbb"
+    """
+    return "%02x%02x%02x" % tuple(rgb)
+
+
+def hex_to_rgb(hex_color: str) -> PixelColor:
+    """
+    :param hex_color: "rrggbb" or "#rrggbb"
+    :return: The color as (r, g, b)
+    """
+    hex_color = hex_color.strip().lstrip("#")
+    return tuple(int(hex_color[i:i + 2], 16) for i in (0, 2, 4))
@@ -0,0 +1,182 @@
+"""
+Importing while the image is still being encoded. The encoder runs in a background thread and puts every finished
+string into a bounded queue; the importer takes them out of it, so the first string is pasted into Rec Room while the
+rest of the image is still being quantized and encoded.
+
+    EncodePipeline - runs the encoder (any iterable of strings, e.g. `encode_strings`) in a thread; iterate over it
+        to get the strings
+
+When the queue is full the encoder waits for the importer (backpressure), so it's never more than `QUEUE_SIZE` strings
+ahead. `cancel()` - or leaving the `with` block, e.g. because the import was stopped - stops the encoder at its next
+string and waits for the thread to end. An error in the encoder is raised again in the importer.
+
+A thread (not a process) is enough: the importer spends nearly all its time waiting for Rec Room, and NumPy and PIL
+release the GIL for most of the encoding.
+"""
+import queue
+import threading
+import time
+from typing import Iterable, Iterator, List, Optional, Union
+
+from PIL import Image
+
+import Encoding
+import job_history
+
+QUEUE_SIZE: int = 64  # Strings the encoder can be ahead of the importer
+POLL_INTERVAL: float = 0.1  # Seconds between checks for a cancel while waiting on the queue
+
+_DONE = object()  # Put into the queue after the last string
+
+
+def encode_strings(img: Image, dither: Union[int, str] = None, begin_end: bool = False,
+                   path: Optional[str] = "image_data.txt", source: str = None) -> Iterator[str]:
+    """
+    Quantize and encode the image one string at a time - what `Encoding.main` does, without the questions
+
+    :param img: The image
+    :param dither: Quantize the image first, see `Encoding.cached_quantize`; None if it's in palette colors already
+    :param begin_end: Start with "BEGIN" and end with "END", for the Image Printer Bot
+    :param path: Write the strings into this file as they're made, None to not write them
+    :param source: The image file, for the job history
+    :return: The strings
+    """
+    busy = 0.0  # Seconds spent encoding, without the time the consumer kept the encoder waiting
+    started = time.time()
+    if begin_end:
+        yield "BEGIN"
+    if dither is not None:
+        img = Encoding.cached_quantize(img, dither)
+
+    strings = Encoding.iter_encode_cached(img)
+    if path:
+        strings = Encoding.iter_write_image_data(strings, path)
+    img_data: List[str] = []
+    for string in strings:
+        img_data.append(string)
+        busy += time.time() - started
+        yield string
+        started = time.time()
+    busy += time.time() - started
+
+    job_history.record("encode", busy, pixels=img.width * img.height, strings=len(img_data),
+                       chars=sum(map(len, img_data)), source=source or getattr(img, "filename", None))
+    if begin_end:
+        yield "END"
+
+
+class EncodePipeline:
+    """
+    An encoder running ahead of the importer in a background thread
+    """
+
+    def __init__(self, strings: Iterable[str], max_queued: int = QUEUE_SIZE):
+        """
+        :param strings: The encoder, run in the thread
+        :param max_queued: Strings the encoder can be ahead, see `QUEUE_SIZE`
+        """
+        self.source = strings
+        self.queue: queue.Queue = queue.Queue(max_queued)
+        self.cancelled = threading.Event()
+        self.strings: List[str] = []  # Every string the encoder made so far, in order
+        self.error: Optional[BaseException] = None
+        self.complete = False  # The encoder made all its strings
+        # Strings made and taken, and the seconds the encoder waited for room in the queue and the importer for strings
+        self.stats = {"produced": 0, "consumed": 0, "producer_wait": 0.0, "consumer_wait": 0.0}
+        self._thread = threading.Thread(target=self._produce, name="encoder", daemon=True)
+
+    def start(self) -> "EncodePipeline":
+        """
+        Start the encoder, if it isn't running yet
+        """
+        if self._thread.ident is None:
+            self._thread.start()
+        return self
+
+    def cancel(self, timeout: float = None) -> None:
+        """
+        Stop the encoder and wait until its thread has ended
+
+        :param timeout: Seconds to wait at most, None to wait until it's done
+        """
+        self.cancelled.set()
+        # Make room, in case the encoder is waiting to put a string
+        while True:
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                break
+        if self._thread.ident is not None:
+            self._thread.join(timeout)
+
+    @property
+    def done(self) -> bool:
+        """
+        :return: The encoder has ended (finished, failed or cancelled)
+        """
+        return self._thread.ident is not None and not self._thread.is_alive()
+
+    def __enter__(self) -> "EncodePipeline":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.cancel()
+
+    def __iter__(self) -> Iterator[str]:
+        self.start()
+        while True:
+            waited = time.perf_counter()
+            item = self._get()
+            self.stats["consumer_wait"] += time.perf_counter() - waited
+            if item is _DONE:
+                if self.error is not None:
+                    raise self.error
+                return
+            self.stats["consumed"] += 1
+            yield item
+
+    def _get(self):
+        """
+        :return: The next string, or `_DONE` at the end or when cancelled
+        """
+        while not self.cancelled.is_set():
+            try:
+                return self.queue.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                pass
+        return _DONE
+
+    def _put(self, item) -> bool:
+        """
+        Put `item` into the queue as soon as there is room
+
+        :return: False if the pipeline was cancelled while waiting
+        """
+        waited = time.perf_counter()
+        try:
+            while not self.cancelled.is_set():
+                try:
+                    self.queue.put(item, timeout=POLL_INTERVAL)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+        finally:
+            self.stats["producer_wait"] += time.perf_counter() - waited
+
+    def _produce(self) -> None:
+        strings = iter(self.source)
+        try:
+            for string in strings:
+                self.strings.append(string)
+                self.stats["produced"] += 1
+                if not self._put(string):
+                    return
+            self.complete = True
+        except BaseException as error:
+            self.error = error
+        finally:
+            # Stops a generator at the string it's at (closes the files it writes)
+            if hasattr(strings, "close"):
+                strings.close()
+        self._put(_DONE)
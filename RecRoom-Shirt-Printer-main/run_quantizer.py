@@ -0,0 +1,246 @@
+"""
+Run-aware quantizing. Importing takes longer the more strings an image needs, and every change of color along a row
+starts a new run. Instead of always picking the closest palette color, every row is converted with the colors that
+minimize
+    total color error (ΔE, CIE76) + `run_weight` × number of runs
+found with dynamic programming (Viterbi) over the `candidates` closest palette colors of every pixel. All rows are
+solved at once, one column at a time.
+
+`run_weight` is in ΔE units: a run is merged into its neighbour when that costs less than `run_weight` of extra error.
+`RunQuantizer.fit` finds the smallest weight that gets an image down to a target number of strings.
+"""
+import argparse
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+from PIL import Image
+
+from color_lookup import rgb_to_lab
+
+CANDIDATES: int = 4  # Palette colors considered for every pixel
+
+
+def candidate_colors(pixels: np.ndarray, palette: np.ndarray, candidates: int = CANDIDATES,
+                     chunk_size: int = 16384) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Find the closest palette colors of every pixel. Every distinct color is only compared once.
+
+    :param pixels: RGB pixels, shape (height, width, 3)
+    :param palette: RGB palette colors, shape (k, 3)
+    :param candidates: How many of the closest colors to keep
+    :param chunk_size: How many colors are compared at once
+    :return: Palette indices, shape (height, width, candidates), closest first,
+        and their ΔE, shape (height, width, candidates)
+    """
+    candidates = min(candidates, len(palette))
+    keys = (pixels[..., 0].astype(np.int32) << 16) | (pixels[..., 1].astype(np.int32) << 8) | pixels[..., 2]
+    unique_keys, inverse = np.unique(keys.ravel(), return_inverse=True)
+    unique_colors = np.stack((unique_keys >> 16, (unique_keys >> 8) & 0xFF, unique_keys & 0xFF), axis=-1)
+
+    palette_lab = rgb_to_lab(palette)
+    palette_norms = (palette_lab ** 2).sum(axis=1)
+    indices = np.empty((len(unique_keys), candidates), dtype=np.intp)
+    errors = np.empty((len(unique_keys), candidates))
+    for start in range(0, len(unique_keys), chunk_size):
+        lab = rgb_to_lab(unique_colors[start:start + chunk_size])
+        # |c - p|² = |c|² - 2 c·p + |p|², as one matrix product
+        distances = (lab ** 2).sum(axis=1)[:, None] - 2 * (lab @ palette_lab.T) + palette_norms[None, :]
+        rows = np.arange(len(lab))
+        # A few argmins are faster than a partial sort for a handful of candidates
+        for candidate in range(candidates):
+            closest = distances.argmin(axis=1)
+            indices[start + rows, candidate] = closest
+            errors[start + rows, candidate] = np.sqrt(np.maximum(distances[rows, closest], 0))
+            distances[rows, closest] = np.inf
+
+    shape = pixels.shape[:2] + (candidates,)
+    return indices[inverse].reshape(shape), errors[inverse].reshape(shape)
+
+
+def smooth_runs(candidates: np.ndarray, errors: np.ndarray, run_weight: float) -> np.ndarray:
+    """
+    Pick one candidate for every pixel, minimizing the error plus `run_weight` for every change of color in a row
+
+    :param candidates: Palette indices, shape (rows, width, k)
+    :param errors: Error of every candidate, shape (rows, width, k)
+    :param run_weight: Cost of starting a new run, in units of `errors`
+    :return: Palette indices, shape (rows, width)
+    """
+    rows, width, k = candidates.shape
+    # Where the best path to every candidate came from, for every column after the first
+    came_from = np.empty((width, rows, k), dtype=np.uint8)
+
+    cost = errors[:, 0].copy()
+    for x in range(1, width):
+        # Cost of going from candidate i (axis 1) of the last pixel to candidate j (axis 2) of this one
+        new_run = candidates[:, x - 1, :, None] != candidates[:, x, None, :]
+        transitions = cost[:, :, None] + run_weight * new_run
+        came_from[x] = transitions.argmin(axis=1)
+        cost = transitions.min(axis=1) + errors[:, x]
+
+    row_indices = np.arange(rows)
+    choice = cost.argmin(axis=1)
+    chosen = np.empty((rows, width), dtype=np.intp)
+    for x in range(width - 1, -1, -1):
+        chosen[:, x] = candidates[row_indices, x, choice]
+        choice = came_from[x, row_indices, choice]
+    return chosen
+
+
+class RunQuantizer:
+    """
+    Run-aware quantizing of one image. The closest colors of every pixel are found once, so trying different run
+    weights only repeats the dynamic programming.
+    """
+
+    def __init__(self, img: Image, palette: Sequence[Tuple[int, int, int]], vertical_print: bool = False,
+                 candidates: int = CANDIDATES):
+        """
+        :param img: The image
+        :param palette: RGB palette colors
+        :param vertical_print: Keep runs along the columns instead of the rows
+        :param candidates: Palette colors considered for every pixel
+        """
+        self.palette = np.asarray(palette, dtype=np.uint8).reshape(-1, 3)
+        self.vertical_print = vertical_print
+
+        pixels = np.asarray(img.convert("RGB"))
+        if vertical_print:
+            pixels = pixels.transpose(1, 0, 2)
+        self.candidates, self.errors = candidate_colors(pixels, self.palette, candidates)
+
+    def indices(self, run_weight: float) -> Tuple[np.ndarray, float]:
+        """
+        :param run_weight: Cost of starting a new run, in ΔE; 0 uses the closest color (in Lab) of every pixel
+        :return: Palette indices in encoding order, shape (lines, line length), and the mean ΔE of the pixels
+        """
+        if run_weight <= 0:
+            return self.candidates[..., 0], float(self.errors[..., 0].mean())
+
+        indices = smooth_runs(self.candidates, self.errors, run_weight)
+        chosen = (self.candidates == indices[..., None]).argmax(axis=-1)
+        return indices, float(np.take_along_axis(self.errors, chosen[..., None], axis=-1).mean())
+
+    def image(self, run_weight: float) -> Image:
+        """
+        :param run_weight: Cost of starting a new run, in ΔE
+        :return: New RGB image that only has colors from the palette
+        """
+        indices = self.indices(run_weight)[0]
+        return Image.fromarray(self.palette.take(indices.T if self.vertical_print else indices, axis=0))
+
+    def strings(self, run_weight: float) -> int:
+        """
+        :param run_weight: Cost of starting a new run, in ΔE
+        :return: Number of strings the image is encoded into
+        """
+        return count_strings(self.indices(run_weight)[0].ravel())
+
+    def tradeoff(self, run_weights: Sequence[float]) -> List[Dict]:
+        """
+        Color error against strings saved for some run weights
+
+        :param run_weights: The weights to try
+        :return: Run weight, mean ΔE, strings and strings saved (against `run_weight` 0) for every weight
+        """
+        results = []
+        for run_weight in [0.0] + [weight for weight in run_weights if weight > 0]:
+            indices, mean_error = self.indices(run_weight)
+            strings = count_strings(indices.ravel())
+            results.append({"run_weight": run_weight, "mean_delta_e": round(mean_error, 3), "strings": strings,
+                            "strings_saved": results[0]["strings"] - strings if results else 0})
+        return results
+
+    def fit(self, target_strings: int, max_weight: float = 200.0, steps: int = 10) -> Tuple[float, int]:
+        """
+        Find the smallest run weight that encodes the image into at most `target_strings` strings (binary search)
+
+        :param target_strings: Maximum number of strings
+        :param max_weight: Largest run weight to try
+        :param steps: Number of halvings of the search range
+        :return: The run weight and the number of strings it gives. If even `max_weight` needs more strings,
+            `max_weight` is returned with its (too large) number of strings.
+        """
+        strings = self.strings(0)
+        if strings <= target_strings:
+            return 0.0, strings
+
+        low, high = 0.0, max_weight
+        high_strings = self.strings(high)
+        if high_strings > target_strings:
+            return high, high_strings
+
+        for _ in range(steps):
+            middle = (low + high) / 2
+            strings = self.strings(middle)
+            if strings <= target_strings:
+                high, high_strings = middle, strings
+            else:
+                low = middle
+        return high, high_strings
+
+
+def count_strings(indices: np.ndarray) -> int:
+    """
+    :param indices: 1-D array of palette indices, in encoding order
+    :return: Number of strings they are encoded into
+    """
+    import Encoding  # Encoding uses this module, import it only when needed
+
+    counts = Encoding.run_lengths(indices)[0]
+    packer = Encoding.StringPacker()
+    # Every symbol is one char long, so the count is the same for every palette
+    for _ in packer.feed(counts, np.full(len(counts), Encoding.PALETTE_SYMBOLS[0])):
+        pass
+    for _ in packer.flush():
+        pass
+    return packer.strings
+
+
+def print_tradeoff(results: List[Dict]) -> None:
+    print(f"{'Run weight':>10} {'Mean ΔE':>8} {'Strings':>8} {'Saved':>8}")
+    for result in results:
+        print(f"{result['run_weight']:>10g} {result['mean_delta_e']:>8.2f} {result['strings']:>8} "
+              f"{result['strings_saved']:>8}")
+
+
+def run_aware_quantize(img: Image, palette: Sequence[Tuple[int, int, int]], run_weight: float = 0.0,
+                       vertical_print: bool = False, target_strings: int = None) -> Image:
+    """
+    Convert the image into palette colors, trading color error for fewer runs
+
+    :param img: The image
+    :param palette: RGB palette colors
+    :param run_weight: Cost of starting a new run, in ΔE
+    :param vertical_print: Keep runs along the columns instead of the rows
+    :param target_strings: Instead of `run_weight`, use the smallest weight that gets the image down to this many
+        strings (or as close as possible)
+    :return: New RGB image that only has colors from the palette
+    """
+    quantizer = RunQuantizer(img, palette, vertical_print)
+    if target_strings:
+        run_weight = quantizer.fit(target_strings)[0]
+    return quantizer.image(run_weight)
+
+
+def main(args: List[str] = None) -> None:
+    import Encoding
+
+    parser = argparse.ArgumentParser(description="Show how much color error fewer strings cost for an image.")
+    parser.add_argument("image")
+    parser.add_argument("--weights", nargs="+", type=float, default=[1, 2, 5, 10, 20, 50], help="Run weights (ΔE)")
+    parser.add_argument("--target-strings", type=int, help="Also find the run weight for this many strings")
+    parser.add_argument("--vertical", action="store_true", help="Encode vertically (for Ashers printer)")
+    args = parser.parse_args(args)
+
+    with Image.open(args.image) as img:
+        quantizer = RunQuantizer(img, list(Encoding.RR_PALETTE), args.vertical)
+    print_tradeoff(quantizer.tradeoff(args.weights))
+
+    if args.target_strings:
+        run_weight, strings = quantizer.fit(args.target_strings)
+        print(f"\nRun weight {run_weight:g} gives {strings} strings (target: {args.target_strings})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Scan orders - the order in which the pixels of an image are encoded.
+    row - row by row, left to right (the classic order)
+    column - column by column, top to bottom (`vertical_print`, for Ashers printer)
+    serpentine - row by row, every other row right to left
+    tiled - `TILE_SIZE` x `TILE_SIZE` blocks (left to right, top to bottom), row by row inside every block
+
+Every order is a permutation of the row-major pixel positions, computed once per size and applied to the palette
+index array with a single gather. The printer has to use the same order to draw the image.
+
+Copy runs (format v2, `row_delta`) copy from the same pixel one line earlier - the pixel above, or the pixel to the
+left in the "column" order - which comes earlier than the pixel in every order (`previous_line`).
+"""
+from functools import lru_cache
+from typing import Tuple
+
+import numpy as np
+
+ORDERS: Tuple[str, ...] = ("row", "column", "serpentine", "tiled")
+TILE_SIZE: int = 8
+
+
+@lru_cache(maxsize=64)
+def scan_permutation(width: int, height: int, order: str, tile_size: int = TILE_SIZE) -> np.ndarray:
+    """
+    :param width: Width of the image
+    :param height: Height of the image
+    :param order: One of `ORDERS`
+    :param tile_size: Width and height of the blocks of the `tiled` order
+    :return: Row-major positions of the pixels, in scan order (read only)
+    """
+    grid = np.arange(width * height).reshape(height, width)
+
+    if order == "row":
+        permutation = grid.ravel()
+    elif order == "column":
+        permutation = grid.T.ravel()
+    elif order == "serpentine":
+        grid[1::2] = grid[1::2, ::-1]
+        permutation = grid.ravel()
+    elif order == "tiled":
+        ys, xs = np.divmod(grid.ravel(), width)
+        # Sort by tile row, then tile column, then by position inside the tile
+        permutation = np.lexsort((xs, ys, xs // tile_size, ys // tile_size))
+    else:
+        raise ValueError(f"Unknown scan order {order!r}, use one of {ORDERS}")
+
+    permutation.setflags(write=False)
+    return permutation
+
+
+@lru_cache(maxsize=64)
+def previous_line(width: int, height: int, order: str) -> np.ndarray:
+    """
+    :param width: Width of the image
+    :param height: Height of the image
+    :param order: One of `ORDERS`
+    :return: Scan position of the pixel one line earlier (above; to the left for the "column" order) of every pixel,
+        in scan order; -1 for the pixels in the first line (read only)
+    """
+    permutation = scan_permutation(width, height, order)
+    scan_positions = np.empty_like(permutation)
+    scan_positions[permutation] = np.arange(len(permutation))
+
+    step = 1 if order == "column" else width
+    in_first_line = (permutation % width == 0) if order == "column" else (permutation < width)
+    earlier = np.where(in_first_line, -1, scan_positions[np.maximum(permutation - step, 0)])
+    earlier.setflags(write=False)
+    return earlier
+
+
+def band_alignment(order: str, tile_size: int = TILE_SIZE) -> int:
+    """
+    Images are encoded in bands of rows; for the permutation of every band to match the permutation of the whole
+    image, bands have to start on a multiple of this.
+
+    :param order: One of `ORDERS`
+    :param tile_size: Width and height of the blocks of the `tiled` order
+    :return: Number of rows
+    """
+    return {"serpentine": 2, "tiled": tile_size}.get(order, 1)
+
+
+def unscan(indices: np.ndarray, width: int, height: int, order: str) -> np.ndarray:
+    """
+    Put pixels in scan order back into place
+
+    :param indices: Pixels in scan order, shape (width * height,)
+    :param width: Width of the image
+    :param height: Height of the image
+    :param order: One of `ORDERS`
+    :return: The pixels, shape (height, width)
+    """
+    raster = np.empty_like(indices)
+    raster[scan_permutation(width, height, order)] = indices
+    return raster.reshape(height, width)
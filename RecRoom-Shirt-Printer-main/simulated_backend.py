@@ -0,0 +1,405 @@
+"""
+A simulated Rec Room, for running and timing the importers without a desktop (e.g. on a build server).
+
+    SimulatedBackend - draws the parts of the Rec Room UI the importers look at into an in-memory screen and reacts
+    to clicks, keys and pastes like the game: after some latency, and sometimes not at all
+
+Modes:
+    variable - the "Value" field of a Variable and the arrows ↕ that confirm it (`Importing`)
+    list_create - a List Create entry, its string editor with the "Done" button, and the purple box of an entry
+    that has a string (`List_Create_Importing`)
+    color_picker - the color picker and the selected slot of the palette (`Color_Compiler.hexinsert`); `received`
+    are the colors of the slots
+
+The game handles inputs in the order they were made, each one `latency` seconds after it was made; the screen shows
+the result right away. Time is simulated: `sleep` only moves the clock forward, so an hour of importing runs in
+seconds, and with the same `seed` every run is the same.
+
+Example:
+    python simulated_backend.py --mode variable --strings 200 --latency 0.05 0.4 --drop-clicks 0.02 --paste-fails 0.05
+"""
+import argparse
+import contextlib
+import heapq
+import io
+import itertools
+import random
+from collections import Counter
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+import Color_Compiler
+import Encoding
+import Importing
+import List_Create_Importing
+from backend import Backend, Box, Coords
+from clipboard import MemoryClipboard
+from palette import hex_to_rgb, rgb_to_hex
+from ui_state import region
+
+MODES: Tuple[str, ...] = ("variable", "list_create", "color_picker")
+ACTION_SECONDS: float = 0.1  # PyAutoGUI pauses this long after every action
+HIT_RADIUS: int = 20  # Clicks this close to a button hit it
+
+BACKGROUND = (30, 80, 130)
+ENTRY = (70, 70, 80)  # A List Create entry without a string
+PURPLE = (157, 145, 187)  # A List Create entry with a string
+EDITOR = (210, 208, 204)  # The string editor of a List Create
+DONE_BUTTON_PATH = Path(__file__).with_name("done_button_original.png")
+
+# Seconds, or (min, max) seconds for a random latency
+Latency = Union[float, Tuple[float, float]]
+
+
+class SimulatedBackend(Backend):
+    """
+    In-memory Rec Room on a simulated clock. `received` are the strings (or hex colors) the game accepted, in order.
+    """
+    realtime = False
+
+    def __init__(self, mode: str = "variable", screen_size: Tuple[int, int] = (1920, 1080), latency: Latency = 0.1,
+                 drop_click_rate: float = 0.0, paste_fail_rate: float = 0.0, copy_fail_rate: float = 0.0,
+                 verify_clipboard: bool = False, focus_losses: Sequence[Tuple[float, float]] = (),
+                 action_seconds: float = ACTION_SECONDS, seed: int = 0, window_title: str = "Rec Room"):
+        """
+        :param mode: One of `MODES`
+        :param screen_size: Width and height of the screen
+        :param latency: Seconds until the game reacts to an input
+        :param drop_click_rate: Chance that a click doesn't reach the game (0 - 1)
+        :param paste_fail_rate: Chance that a paste doesn't reach the game (0 - 1)
+        :param copy_fail_rate: Chance that a copy doesn't reach the clipboard (0 - 1)
+        :param verify_clipboard: Read every copied string back, see `clipboard.Clipboard.copy`
+        :param focus_losses: (start, seconds) of the times another window is in focus
+        :param action_seconds: Seconds every click, key press or copy takes
+        :param seed: Seed for the latency, dropped clicks and failed pastes
+        :param window_title: Title of the game window
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown mode {mode!r}, use one of {MODES}")
+        self.mode = mode
+        self.width, self.height = screen_size
+        self.latency = latency
+        self.drop_click_rate = drop_click_rate
+        self.paste_fail_rate = paste_fail_rate
+        self.focus_losses = list(focus_losses)
+        self.action_seconds = action_seconds
+        self.window_title = window_title
+        self.random = random.Random(seed)
+
+        self.now: float = 0.0
+        self.mouse: Coords = (self.width // 2, self.height // 2)
+        self.clipboard = MemoryClipboard(copy_fail_rate, seed)
+        self.verify_clipboard = verify_clipboard
+        self.received: List[str] = []
+        self.stats = Counter()  # clicks, dropped_clicks, pastes, failed_pastes, grabs
+
+        # Inputs the game hasn't handled yet: (time, order, change)
+        self._inputs: List[Tuple[float, int, Callable[[], None]]] = []
+        self._order = itertools.count()
+        self._last_input: float = 0.0
+        self._screen: Optional[Image.Image] = None  # Drawn again after every change
+
+        # What's open in the game
+        self.field_open: bool = False  # The Variable field, the string editor or the color picker
+        self.field_focused: bool = False  # The text field of the string editor / the hex field of the color picker
+        self.text: str = ""  # Text in the open field
+        self.entry: int = 0  # The selected List Create entry, or slot of the palette
+        self.color: Tuple[int, int, int] = (128, 128, 128)  # The custom color of the color picker
+
+        if mode == "variable":
+            self.layout = Importing.VariableLayout.preset(self.width, self.height)
+        elif mode == "list_create":
+            self.layout = List_Create_Importing.ListCreateLayout.preset(self.width, self.height)
+            with Image.open(DONE_BUTTON_PATH) as done_button:
+                self.done_button = np.asarray(done_button.convert("RGB"))
+            # Top left corner of the "Done" button while the string editor is open
+            self.done_button_at: Coords = (int(self.width * 0.62), int(self.height * 0.7))
+        else:
+            self.layout = Color_Compiler.ColorPickerLayout.for_screen(self.width, self.height)
+
+    # Time
+
+    def time(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        until = self.now + max(seconds, 0.0)
+        while self._inputs and self._inputs[0][0] <= until:
+            self.now, _, change = heapq.heappop(self._inputs)
+            change()
+            self._screen = None
+        self.now = until
+
+    def _input(self, change: Callable[[], None]) -> None:
+        """
+        Let the game handle an input after the latency, but never before the inputs made earlier
+        """
+        latency = self.random.uniform(*self.latency) if isinstance(self.latency, tuple) else self.latency
+        self._last_input = max(self.now + latency, self._last_input)
+        heapq.heappush(self._inputs, (self._last_input, next(self._order), change))
+
+    # Actions
+
+    def screen_size(self) -> Tuple[int, int]:
+        return self.width, self.height
+
+    def active_window_title(self) -> str:
+        if any(start <= self.now < start + seconds for start, seconds in self.focus_losses):
+            return ""
+        return self.window_title
+
+    def click(self, x: int = None, y: int = None, button: str = "left") -> None:
+        if x is not None:
+            self.mouse = (x, y)
+        self.stats["clicks"] += 1
+        if self.random.random() < self.drop_click_rate:
+            self.stats["dropped_clicks"] += 1
+        elif button == "right":
+            self._input(self._right_click)
+        elif button == "left":
+            self._input(getattr(self, f"_click_{self.mode}")(self.mouse, aimed=x is not None))
+        self.sleep(self.action_seconds)
+
+    def move_to(self, x: int, y: int) -> None:
+        self.mouse = (x, y)
+        self.sleep(self.action_seconds)
+
+    def move(self, dx: int, dy: int) -> None:
+        self.move_to(self.mouse[0] + dx, self.mouse[1] + dy)
+
+    def hotkey(self, *keys: str) -> None:
+        if keys == ("ctrl", "v"):
+            self.stats["pastes"] += 1
+            if self.random.random() < self.paste_fail_rate:
+                self.stats["failed_pastes"] += 1
+            else:
+                self._input(self._paste(self.clipboard.text))
+        self.sleep(self.action_seconds)
+
+    def press(self, key: str) -> None:
+        if key == "esc":
+            self._input(self._close)
+        elif key == "enter" and self.mode == "color_picker":
+            self._input(self._enter_color)
+        self.sleep(self.action_seconds)
+
+    def scroll(self, clicks: int) -> None:
+        self.sleep(self.action_seconds)
+
+    def copy(self, text: str) -> bool:
+        copied = self.clipboard.copy(text, self.verify_clipboard)
+        self.sleep(self.action_seconds)
+        return copied
+
+    def grab(self, box: Box = None) -> Image:
+        self.stats["grabs"] += 1
+        if self._screen is None:
+            self._screen = Image.fromarray(self._draw())
+        return self._screen.crop(box) if box else self._screen.copy()
+
+    # How the game reacts, when it gets to an input
+
+    def _click_variable(self, point: Coords, aimed: bool) -> Callable[[], None]:
+        def change():
+            if hits(point, self.layout.input_field) and not self.field_open:
+                self.field_open, self.text = True, ""
+            elif hits(point, self.layout.confirm_expand_button) and self.field_open:
+                self.received.append(self.text)
+                self.field_open, self.text = False, ""
+        return change
+
+    def _click_list_create(self, point: Coords, aimed: bool) -> Callable[[], None]:
+        def change():
+            if not aimed:
+                # Clicking where the player looks selects the List Create entry
+                if not self.field_open:
+                    self.field_open, self.field_focused, self.text = True, False, ""
+            elif self.field_open and hits(point, self.layout.input_field):
+                self.field_focused = True
+            elif self.field_open and in_box(point, self._done_button_box()):
+                self.received.extend([""] * (self.entry + 1 - len(self.received)))
+                self.received[self.entry] = self.text
+                self.field_open = self.field_focused = False
+        return change
+
+    def _click_color_picker(self, point: Coords, aimed: bool) -> Callable[[], None]:
+        def change():
+            if not aimed:
+                # Saves the custom color into the selected slot
+                if self.field_open:
+                    self.received.extend([""] * (self.entry + 1 - len(self.received)))
+                    self.received[self.entry] = rgb_to_hex(self.color)
+                self.field_open = self.field_focused = False
+            elif hits(point, self.layout.color):
+                self.field_open = True
+            elif self.field_open and hits(point, self.layout.custom):
+                self.field_focused, self.text = True, ""
+        return change
+
+    def _right_click(self) -> None:
+        if self.mode in ("list_create", "color_picker") and not self.field_open:
+            self.entry += 1
+
+    def _paste(self, text: str) -> Callable[[], None]:
+        def change():
+            if self.field_open and (self.field_focused or self.mode == "variable"):
+                self.text = text
+        return change
+
+    def _enter_color(self) -> None:
+        try:
+            if self.field_focused:
+                self.color = hex_to_rgb(self.text)
+        except ValueError:
+            pass
+
+    def _close(self) -> None:
+        self.field_open = self.field_focused = False
+
+    # The screen
+
+    def _done_button_box(self) -> Box:
+        x, y = self.done_button_at
+        return x, y, x + self.done_button.shape[1], y + self.done_button.shape[0]
+
+    def _draw(self) -> np.ndarray:
+        screen = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        screen[:] = BACKGROUND
+
+        if self.mode == "variable" and self.field_open:
+            (left, top), (right, bottom) = self.layout.color_check
+            fill(screen, (left - 10, top - 10, right + 10, bottom + 10), Importing.Colors.white)
+            if self.text:
+                fill(screen, (left, top, right, bottom), Importing.Colors.text)
+
+        elif self.mode == "list_create":
+            (left, top), (right, bottom) = self.layout.color_checking_coords
+            has_string = self.entry < len(self.received) and self.received[self.entry]
+            fill(screen, (left - 20, top - 20, right + 20, bottom + 20), PURPLE if has_string else ENTRY)
+            if self.field_open:
+                x, y = self.layout.input_field
+                fill(screen, (x - 300, y - 40, x + 300, y + 40), EDITOR)
+                if self.field_focused:
+                    fill(screen, (x - 280, y - 20, x + 280, y + 20), Importing.Colors.white)
+                if self.text:
+                    fill(screen, (x - 270, y - 6, x + 270, y + 6), Importing.Colors.text)
+                left, top, right, bottom = self._done_button_box()
+                screen[top:bottom, left:right] = self.done_button
+
+        elif self.mode == "color_picker":
+            saved = self.received[self.entry] if self.entry < len(self.received) else ""
+            fill(screen, region(self.layout.slot, 20), hex_to_rgb(saved) if saved else ENTRY)
+            if self.field_open:
+                fill(screen, region(self.layout.custom, 20), self.color)
+            if self.field_open and self.field_focused:
+                fill(screen, region(self.layout.text, 20), (250, 250, 250))
+        return screen
+
+
+def hits(point: Coords, button: Coords, radius: int = HIT_RADIUS) -> bool:
+    return abs(point[0] - button[0]) <= radius and abs(point[1] - button[1]) <= radius
+
+
+def in_box(point: Coords, box: Box) -> bool:
+    return box[0] <= point[0] < box[2] and box[1] <= point[1] < box[3]
+
+
+def fill(screen: np.ndarray, box: Box, color: Tuple[int, int, int]) -> None:
+    left, top, right, bottom = box
+    screen[max(top, 0):max(bottom, 0), max(left, 0):max(right, 0)] = color
+
+
+def sample_strings(count: int, seed: int = 0) -> List[str]:
+    """
+    :return: `count` strings of random runs, as long as encoded strings usually are
+    """
+    rng = random.Random(seed)
+    symbols = Encoding.PALETTE_SYMBOLS.tolist()
+    strings = []
+    for _ in range(count):
+        string = ""
+        while True:
+            token = Encoding.run_token(rng.randint(1, 300), rng.choice(symbols))
+            if len(string) + len(token) > Encoding.MaxStringLength:
+                break
+            string += token
+        strings.append(string)
+    return strings
+
+
+def benchmark(mode: str = "variable", strings: int = 100, delay: float = 0.3, seed: int = 0,
+              trace_path: Optional[str] = None, **options) -> Dict:
+    """
+    Import `strings` random strings (hex colors for "color_picker") into a `SimulatedBackend`
+
+    :param mode: One of `MODES`
+    :param strings: Number of strings
+    :param delay: The importing delay
+    :param seed: Seed for the strings and the backend
+    :param trace_path: Trace every step of the importer into this file, see `telemetry` (not for "color_picker")
+    :param options: More arguments for `SimulatedBackend`, e.g. `latency` or `drop_click_rate`
+    :return: `strings`, `seconds` (simulated), `strings_per_minute`, `retries`, `correct` (the game got exactly
+        the strings that were imported), the `stats` of the backend and the `clipboard` latencies (real seconds,
+        see `clipboard.Clipboard.summary`)
+    """
+    backend = SimulatedBackend(mode, seed=seed, **options)
+    if mode == "color_picker":
+        rng = random.Random(seed)
+        img_data = ["%06x" % rng.getrandbits(24) for _ in range(strings)]
+    else:
+        img_data = sample_strings(strings, seed)
+
+    # The importers print every string
+    with contextlib.redirect_stdout(io.StringIO()):
+        if mode == "variable":
+            img_data = ["BEGIN", *img_data, "END"]
+            result = Importing.copy_into_rr_variable(img_data, delay, ask_for_coords_calibration=False,
+                                                     ask_to_continue=False, backend=backend, layout=backend.layout,
+                                                     record_session=False, journal_path=None, trace_path=trace_path)
+        elif mode == "list_create":
+            result = List_Create_Importing.copy_to_recroom(img_data, delay, ask_to_continue=False, backend=backend,
+                                                           layout=backend.layout, record_session=False,
+                                                           journal_path=None, trace_path=trace_path)
+        else:
+            colors = Color_Compiler.hexinsert(img_data, delay, backend, backend.layout)
+            result = {"retries": sum(color["attempts"] - 1 for color in colors), "seconds": backend.time()}
+
+    return {"strings": len(img_data), "seconds": result["seconds"],
+            "strings_per_minute": len(img_data) / result["seconds"] * 60 if result["seconds"] else 0.0,
+            "retries": result["retries"], "correct": backend.received == img_data, "stats": dict(backend.stats),
+            "clipboard": backend.clipboard.summary()}
+
+
+def main(args: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark an importer against a simulated Rec Room.")
+    parser.add_argument("--mode", choices=MODES, default="variable")
+    parser.add_argument("--strings", type=int, default=100)
+    parser.add_argument("--delay", type=float, default=0.3, help="The importing delay")
+    parser.add_argument("--latency", type=float, nargs="+", default=[0.1],
+                        help="Seconds until the game reacts, or the min and max of a random latency")
+    parser.add_argument("--drop-clicks", type=float, default=0.0, help="Chance that a click gets lost (0 - 1)")
+    parser.add_argument("--paste-fails", type=float, default=0.0, help="Chance that a paste gets lost (0 - 1)")
+    parser.add_argument("--copy-fails", type=float, default=0.0,
+                        help="Chance that a copy doesn't reach the clipboard (0 - 1)")
+    parser.add_argument("--verify-clipboard", action="store_true",
+                        help="Read every string back from the clipboard before pasting it")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--trace", help="Trace every step into this JSONL file, for `telemetry.py report`")
+    args = parser.parse_args(args)
+
+    latency = args.latency[0] if len(args.latency) == 1 else tuple(args.latency[:2])
+    result = benchmark(args.mode, args.strings, args.delay, args.seed, args.trace, latency=latency,
+                       drop_click_rate=args.drop_clicks, paste_fail_rate=args.paste_fails,
+                       copy_fail_rate=args.copy_fails, verify_clipboard=args.verify_clipboard)
+    print(f"{result['strings']} strings in {result['seconds']:.1f} simulated sec: "
+          f"{result['strings_per_minute']:.1f} strings/min, {result['retries']} retries, "
+          f"{'all strings arrived' if result['correct'] else 'WRONG STRINGS ARRIVED'}")
+    print(", ".join(f"{name}: {count}" for name, count in sorted(result["stats"].items())))
+    print(", ".join(f"clipboard {operation}: {summary['count']}" for operation, summary in result["clipboard"].items()))
+
+
+if __name__ == "__main__":
+    main()
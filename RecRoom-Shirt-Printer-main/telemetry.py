@@ -0,0 +1,237 @@
+"""
+Traces of where the import time goes. The importers time every step of every string as a span - waiting for the
+focus, copying into the clipboard, clicking, pasting, waiting for the pasted text (verify), confirming, the extra
+actions of a retry - and append them to a JSONL file (`TRACE_PATH`), one JSON object per line:
+    {"type": "session", "session": "...", "method": "variable", "time": <unix time>, "delay": 0.3}
+    {"type": "span", "session": "...", "step": "paste", "string": 12, "start": 31.52, "seconds": 0.1, "ok": true}
+`start` is in seconds since the session started. Every string also gets a "string" span over all its steps, with its
+`retries`.
+
+    Tracer - writes the spans of one import session
+
+The report shows p50/p95/p99 of every step, the retry rate over time and the throughput in strings/min.
+
+Examples:
+    python telemetry.py                                    (list the sessions in the trace)
+    python telemetry.py report
+    python telemetry.py --trace import_trace.jsonl report --session 20240501-201500-3fa2-variable --window 120
+"""
+import argparse
+import json
+import os
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+
+from backend import Backend
+from ui_state import UIState
+
+TRACE_PATH: str = "import_trace.jsonl"
+WINDOW: float = 60.0  # Seconds per row of the retry rate over time
+PERCENTILES = (50, 95, 99)
+
+
+class Span:
+    """
+    A running span; set `ok` (and other `fields`) before it ends
+    """
+
+    def __init__(self, fields: Dict):
+        self.ok: Optional[bool] = None
+        self.fields = fields
+
+
+class Tracer:
+    """
+    The trace of one import session. Without a path nothing is written, but the steps still run.
+    """
+
+    def __init__(self, path: Optional[str], method: str, backend: Backend, **session):
+        """
+        :param path: The JSONL file the spans are appended to, None to not trace
+        :param method: The import method, see `job_history.IMPORT_METHODS`
+        :param backend: Its clock times the spans
+        :param session: More fields for the session line, e.g. `delay`
+        """
+        self.backend = backend
+        self.session = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.urandom(2).hex()}-{method}"
+        self.started = backend.time()
+        self.file = open(path, "a", encoding="UTF-8") if path else None
+        self._write({"type": "session", "method": method, "time": time.time(), **session})
+
+    def _write(self, entry: Dict) -> None:
+        if self.file:
+            # One line per span, flushed, so the trace survives a crash
+            self.file.write(json.dumps({"session": self.session, **entry}) + "\n")
+            self.file.flush()
+
+    def record(self, step: str, index: Optional[int], start: float, seconds: float, ok: bool = None,
+               **fields) -> None:
+        """
+        Write one span
+
+        :param step: What was done, e.g. "paste"
+        :param index: Index of the string
+        :param start: Backend time when the step started
+        :param seconds: How long it took
+        :param ok: Whether it worked, None if that's not known
+        """
+        self._write({"type": "span", "step": step, "string": index, "start": round(start - self.started, 4),
+                     "seconds": round(seconds, 4), "ok": ok, **fields})
+
+    @contextmanager
+    def span(self, step: str, index: int = None, **fields) -> Iterator[Span]:
+        """
+        Time the code in the `with` block as one span; it's also written if the block fails (with `ok` false)
+        """
+        span = Span(fields)
+        started = self.backend.time()
+        try:
+            yield span
+        except BaseException:
+            span.ok = False
+            raise
+        finally:
+            self.record(step, index, started, self.backend.time() - started, span.ok, **span.fields)
+
+    def ui_step(self, ui: UIState, step: str, index: int, action: Callable[[], None], state: str,
+                timeout: float = None, verify: str = None, **fields) -> bool:
+        """
+        `UIState.step` as a span
+
+        :param ui: The part of the UI
+        :param step: Name of the span
+        :param index: Index of the string
+        :param action: See `UIState.step`
+        :param state: See `UIState.step`
+        :param timeout: See `UIState.step`
+        :param verify: If given, the wait for `state` is written as a separate span with this name
+        :return: See `UIState.step`
+        """
+        started = self.backend.time()
+        reached = ui.step(action, state, timeout)
+        seconds = self.backend.time() - started
+        if verify:
+            waited = ui.waits[-1][1]
+            self.record(step, index, started, seconds - waited, **fields)
+            self.record(verify, index, started + seconds - waited, waited, reached, **fields)
+        else:
+            self.record(step, index, started, seconds, reached, **fields)
+        return reached
+
+    def close(self) -> None:
+        if self.file:
+            self.file.close()
+            self.file = None
+
+
+def load(path: str = TRACE_PATH) -> Dict[str, Dict]:
+    """
+    :return: {session: {"session": the session line, "spans": [the spans]}}, in the order of the file
+    """
+    sessions: Dict[str, Dict] = {}
+    with open(path, "r", encoding="UTF-8") as trace_file:
+        for line in trace_file:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # A line cut off by a crash
+            session = sessions.setdefault(entry["session"], {"session": {}, "spans": []})
+            if entry["type"] == "session":
+                session["session"] = entry
+            else:
+                session["spans"].append(entry)
+    return sessions
+
+
+def report(spans: List[Dict], window: float = WINDOW) -> Dict:
+    """
+    :param spans: Spans of one session
+    :param window: Seconds per row of the `timeline`
+    :return: `strings`, `seconds`, `strings_per_minute`, `retries`; `steps` with `count`, `failed`, p50/p95/p99 and
+        `total_seconds` of every step; and the `timeline`: `start`, `strings`, `retries`, `retry_rate` (retries per
+        string) and `strings_per_minute` of every `window`
+    """
+    steps = {}
+    for step in dict.fromkeys(span["step"] for span in spans):
+        of_step = [span for span in spans if span["step"] == step]
+        seconds = np.array([span["seconds"] for span in of_step])
+        steps[step] = {"count": len(of_step), "failed": sum(span["ok"] is False for span in of_step),
+                       **{f"p{p}": float(np.percentile(seconds, p)) for p in PERCENTILES},
+                       "total_seconds": float(seconds.sum())}
+
+    strings = [span for span in spans if span["step"] == "string"]
+    duration = max((span["start"] + span["seconds"] for span in spans), default=0.0)
+    # Every string counts in the window it ended in
+    windows = max(1, int(np.ceil(duration / window)))
+    counts, retries = np.zeros(windows, dtype=int), np.zeros(windows, dtype=int)
+    for span in strings:
+        row = min(int((span["start"] + span["seconds"]) // window), windows - 1)
+        counts[row] += 1
+        retries[row] += span.get("retries", 0)
+    timeline = []
+    for row in range(windows):
+        seconds = min(window, duration - row * window)
+        timeline.append({"start": row * window, "strings": int(counts[row]), "retries": int(retries[row]),
+                         "retry_rate": float(retries[row] / counts[row]) if counts[row] else 0.0,
+                         "strings_per_minute": float(counts[row] / seconds * 60) if seconds > 0 else 0.0})
+
+    return {"strings": len(strings), "seconds": duration,
+            "strings_per_minute": len(strings) / duration * 60 if duration else 0.0,
+            "retries": sum(span.get("retries", 0) for span in strings), "steps": steps, "timeline": timeline}
+
+
+def describe_report(result: Dict) -> List[str]:
+    """
+    :return: `report` as lines, for printing
+    """
+    lines = [f"{result['strings']} strings in {result['seconds']:.1f} sec: {result['strings_per_minute']:.1f} "
+             f"strings/min, {result['retries']} retries",
+             "",
+             f"{'Step':12} {'Count':>6} {'Failed':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'Total sec':>10} "
+             f"{'Share':>6}"]
+    for step, stats in result["steps"].items():
+        share = stats["total_seconds"] / result["seconds"] if result["seconds"] and step != "string" else None
+        lines.append(f"{step:12} {stats['count']:>6} {stats['failed']:>6} "
+                     + " ".join(f"{stats[f'p{p}'] * 1000:>9.1f}" for p in PERCENTILES)
+                     + f" {stats['total_seconds']:>10.1f} {'' if share is None else f'{share:.0%}':>6}")
+    lines += ["", f"{'Minute':>8} {'Strings':>8} {'Retries':>8} {'Per string':>10} {'Strings/min':>12}"]
+    for row in result["timeline"]:
+        lines.append(f"{row['start'] / 60:>8.1f} {row['strings']:>8} {row['retries']:>8} {row['retry_rate']:>10.2f} "
+                     f"{row['strings_per_minute']:>12.1f}")
+    return lines
+
+
+def main(args: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Show where the time of imports went.")
+    subparsers = parser.add_subparsers(dest="command")
+    report_parser = subparsers.add_parser("report", help="Percentiles of every step, retries over time, throughput")
+    report_parser.add_argument("--session", help="The session to report, defaults to the last one")
+    report_parser.add_argument("--window", type=float, default=WINDOW, help="Seconds per row of the retries over time")
+    parser.add_argument("--trace", default=TRACE_PATH, help="The JSONL trace")
+    args = parser.parse_args(args)
+
+    try:
+        sessions = load(args.trace)
+    except FileNotFoundError:
+        sessions = {}
+    if not sessions:
+        print(f"There are no sessions in `{args.trace}`")
+        return
+    if args.command == "report":
+        name = args.session or list(sessions)[-1]
+        if name not in sessions:
+            print(f"There is no session {name!r} in `{args.trace}`")
+            return
+        print(f"Session {name}")
+        print("\n".join(describe_report(report(sessions[name]["spans"], args.window))))
+    else:
+        for name, session in sessions.items():
+            strings = sum(span["step"] == "string" for span in session["spans"])
+            print(f"{name:30} {strings:>6} strings")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+"""
+Finding buttons on the screen by how they look (template matching), e.g. the "Done" button of a List Create.
+
+    TemplateMatcher - one button: searches around where it was found last time first, then the whole screen
+
+The whole screen is searched on a smaller grayscale copy first (an image pyramid), and only the best places are
+checked again at full size. A match only counts if its confidence (normalized correlation, -1 - 1) reaches the
+threshold, so nothing is clicked when the button isn't shown. Templates can be tried at several scales for screens
+with another resolution than the one the template was cut from.
+
+OpenCV (`cv2.matchTemplate`) is used if it's installed, otherwise the same correlation is computed with NumPy FFTs.
+"""
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+from backend import Backend, Box, Coords, get_backend
+
+try:
+    import cv2
+except ModuleNotFoundError:
+    cv2 = None
+
+THRESHOLD: float = 0.8  # Lowest confidence that counts as found
+MARGIN: int = 32  # Pixels around the last location that are searched first
+PYRAMID_LEVELS: int = 2  # The full screen is searched at 1 / 2**levels of its size first
+MIN_TEMPLATE_SIZE: int = 12  # Pixels; the pyramid is never reduced so far that the template gets smaller
+CANDIDATES: int = 3  # Best places of the reduced search that are checked at full size
+
+
+class Match(NamedTuple):
+    left: int
+    top: int
+    width: int
+    height: int
+    confidence: float
+    scale: float
+
+    @property
+    def center(self) -> Coords:
+        return self.left + self.width // 2, self.top + self.height // 2
+
+    @property
+    def box(self) -> Box:
+        return self.left, self.top, self.left + self.width, self.top + self.height
+
+
+def to_gray(image: Union[Image.Image, np.ndarray]) -> np.ndarray:
+    """
+    :return: The image in grayscale as float32
+    """
+    if isinstance(image, np.ndarray):
+        if image.ndim == 2:
+            return image.astype(np.float32)
+        image = Image.fromarray(image.astype(np.uint8))
+    return np.asarray(image.convert("L"), dtype=np.float32)
+
+
+def resize_gray(gray: np.ndarray, scale: float) -> np.ndarray:
+    """
+    :return: The grayscale image scaled by `scale` (area averaging when reducing)
+    """
+    height, width = gray.shape
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    return np.asarray(Image.fromarray(gray, mode="F").resize(size, Image.BOX if scale < 1 else Image.BILINEAR))
+
+
+def fft_size(size: int) -> int:
+    """
+    :return: The smallest size >= `size` that only has the factors 2, 3 and 5 (FFTs of other sizes are slow)
+    """
+    while True:
+        rest = size
+        for factor in (2, 3, 5):
+            while rest % factor == 0:
+                rest //= factor
+        if rest == 1:
+            return size
+        size += 1
+
+
+def window_sums(values: np.ndarray, height: int, width: int) -> np.ndarray:
+    """
+    :return: Sum of every `height` x `width` window of `values` (only windows that fit), from an integral image
+    """
+    integral = np.pad(values, ((1, 0), (1, 0))).cumsum(axis=0).cumsum(axis=1)
+    return (integral[height:, width:] - integral[:-height, width:]
+            - integral[height:, :-width] + integral[:-height, :-width])
+
+
+def correlate(image: np.ndarray, template: np.ndarray) -> np.ndarray:
+    """
+    Normalized correlation of the template at every place it fits into the image, like `cv2.TM_CCOEFF_NORMED`
+
+    :param image: Grayscale image
+    :param template: Grayscale template, not larger than the image
+    :return: Confidence (-1 - 1) of every top left corner, shape (image height - template height + 1, ...width)
+    """
+    if cv2 is not None:
+        return cv2.matchTemplate(image, template, cv2.TM_CCOEFF_NORMED)
+
+    height, width = template.shape
+    image = image.astype(np.float64)
+    template = template.astype(np.float64) - template.mean()
+    # Correlation with the zero-mean template; the mean of the image window drops out because the template sums to 0
+    shape = (fft_size(image.shape[0] + height - 1), fft_size(image.shape[1] + width - 1))
+    product = np.fft.irfft2(np.fft.rfft2(image, shape) * np.conj(np.fft.rfft2(template, shape)), shape)
+    numerator = product[:image.shape[0] - height + 1, :image.shape[1] - width + 1]
+
+    count = height * width
+    sums = window_sums(image, height, width)
+    variance = window_sums(image ** 2, height, width) - sums ** 2 / count
+    denominator = np.sqrt(np.maximum(variance, 0) * (template ** 2).sum())
+    # Flat windows (or a flat template) don't match anything
+    return np.where(denominator > 1e-6 * count, numerator / np.maximum(denominator, 1e-12), 0.0)
+
+
+def best_places(scores: np.ndarray, count: int, distance: Tuple[int, int]) -> List[Tuple[int, int, float]]:
+    """
+    :param scores: Result of `correlate`
+    :param count: How many places
+    :param distance: (height, width) around a place that can't hold another one
+    :return: (x, y, score) of the best places, best first
+    """
+    scores = scores.copy()
+    places = []
+    for _ in range(count):
+        y, x = np.unravel_index(np.argmax(scores), scores.shape)
+        if not np.isfinite(scores[y, x]) or scores[y, x] <= -1:
+            break
+        places.append((int(x), int(y), float(scores[y, x])))
+        scores[max(0, y - distance[0]):y + distance[0] + 1, max(0, x - distance[1]):x + distance[1] + 1] = -np.inf
+    return places
+
+
+class TemplateMatcher:
+    """
+    Finds one template (a button) on the screen and remembers where it was
+    """
+
+    def __init__(self, template: Union[str, Path, Image.Image, np.ndarray], threshold: float = THRESHOLD,
+                 scales: Sequence[float] = (1.0,), margin: int = MARGIN, pyramid_levels: int = PYRAMID_LEVELS):
+        """
+        :param template: Path of the template image, or the image; a path is only read when it's first needed
+        :param threshold: Lowest confidence that counts as found (0 - 1)
+        :param scales: Sizes of the template to try, in order; the first one that is found is used
+        :param margin: Pixels around the last location that are searched first
+        :param pyramid_levels: See `PYRAMID_LEVELS`
+        """
+        self.source = template
+        self.threshold = threshold
+        self.scales = tuple(scales)
+        self.margin = margin
+        self.pyramid_levels = pyramid_levels
+        self.last: Optional[Match] = None
+        self._templates: Dict[float, np.ndarray] = {}  # Grayscale template by scale
+        self.searches = {"region": 0, "screen": 0, "missed": 0}
+
+    def template(self, scale: float = 1.0) -> np.ndarray:
+        """
+        :return: The grayscale template at `scale`
+        """
+        if scale not in self._templates:
+            if 1.0 not in self._templates:
+                source = self.source
+                if isinstance(source, (str, Path)):
+                    with Image.open(source) as image:
+                        source = image.convert("RGB")
+                self._templates[1.0] = to_gray(source)
+            if scale != 1.0:
+                self._templates[scale] = resize_gray(self._templates[1.0], scale)
+        return self._templates[scale]
+
+    def find(self, backend: Backend = None) -> Optional[Match]:
+        """
+        Look for the template on the screen: around the last location first, then everywhere
+
+        :param backend: The screen, defaults to `backend.get_backend()`
+        :return: The match, or None if nothing reaches the threshold
+        """
+        backend = backend or get_backend()
+        if self.last is not None:
+            left, top, right, bottom = self.last.box
+            width, height = backend.screen_size()
+            box = (max(0, left - self.margin), max(0, top - self.margin),
+                   min(width, right + self.margin), min(height, bottom + self.margin))
+            match = self.match_region(to_gray(backend.grab(box)), self.last.scale, box[:2])
+            if match is not None and match.confidence >= self.threshold:
+                self.searches["region"] += 1
+                self.last = match
+                return match
+
+        self.searches["screen"] += 1
+        match = self.match(backend.grab())
+        if match is None:
+            self.searches["missed"] += 1
+        else:
+            self.last = match
+        return match
+
+    def match(self, screenshot: Union[Image.Image, np.ndarray]) -> Optional[Match]:
+        """
+        Search the whole screenshot at every scale
+
+        :return: The first match that reaches the threshold (or the best one, if the scales are all tried), or None
+        """
+        screen = to_gray(screenshot)
+        best = None
+        for scale in self.scales:
+            match = self.match_pyramid(screen, scale)
+            if match is not None and (best is None or match.confidence > best.confidence):
+                best = match
+            if best is not None and best.confidence >= self.threshold:
+                break
+        return best if best is not None and best.confidence >= self.threshold else None
+
+    def match_pyramid(self, screen: np.ndarray, scale: float) -> Optional[Match]:
+        """
+        Search a reduced copy of `screen`, then check the best places at full size
+        """
+        template = self.template(scale)
+        height, width = template.shape
+        if height > screen.shape[0] or width > screen.shape[1]:
+            return None
+
+        levels = self.pyramid_levels
+        while levels and min(height, width) >> levels < MIN_TEMPLATE_SIZE:
+            levels -= 1
+        if not levels:
+            return self.match_region(screen, scale)
+
+        factor = 1 << levels
+        scores = correlate(resize_gray(screen, 1 / factor), resize_gray(template, 1 / factor))
+        best = None
+        for x, y, _ in best_places(scores, CANDIDATES, (height // factor, width // factor)):
+            # Search the full size screen around the place, with room for the rounding of the reduced search
+            left, top = max(0, (x - 2) * factor), max(0, (y - 2) * factor)
+            right = min(screen.shape[1], (x + 2) * factor + width)
+            bottom = min(screen.shape[0], (y + 2) * factor + height)
+            match = self.match_region(screen[top:bottom, left:right], scale, (left, top))
+            if match is not None and (best is None or match.confidence > best.confidence):
+                best = match
+        return best
+
+    def match_region(self, region: np.ndarray, scale: float, offset: Coords = (0, 0)) -> Optional[Match]:
+        """
+        :param region: Grayscale part of the screen
+        :param scale: Scale of the template
+        :param offset: Where `region` is on the screen
+        :return: The best place of the template in `region`, None if it doesn't fit into it
+        """
+        template = self.template(scale)
+        height, width = template.shape
+        if height > region.shape[0] or width > region.shape[1]:
+            return None
+        scores = correlate(region, template)
+        y, x = np.unravel_index(np.argmax(scores), scores.shape)
+        return Match(int(x) + offset[0], int(y) + offset[1], width, height, float(scores[y, x]), scale)
@@ -0,0 +1,41 @@
+import os
+
+import pytest
+
+from clipboard import LATENCY_SAMPLES, Latencies, MemoryClipboard, TkClipboard, checksum
+
+
+def test_verify_copies_again():
+    clipboard = MemoryClipboard(fail_rate=0.5, seed=3)
+    for num in range(50):
+        assert clipboard.copy(f"{num}!", verify=True, retries=20)
+        assert clipboard.paste() == f"{num}!"
+    assert clipboard.failed_checks > 0
+    assert checksum("1!") != checksum("1#")
+
+
+def test_latencies_are_bounded():
+    latencies = Latencies()
+    for num in range(LATENCY_SAMPLES + 500):
+        latencies.add(num / 1000)
+
+    summary = latencies.summary()
+    assert len(latencies.recent) == LATENCY_SAMPLES
+    assert summary["count"] == LATENCY_SAMPLES + 500
+    assert summary["max_ms"] == pytest.approx(LATENCY_SAMPLES + 499)
+    assert summary["mean_ms"] == pytest.approx((LATENCY_SAMPLES + 499) / 2)
+    assert Latencies().summary() == {"count": 0}
+
+
+def test_summary_counts_every_copy():
+    clipboard = MemoryClipboard()
+    for num in range(LATENCY_SAMPLES + 1):
+        clipboard.copy(str(num), verify=True)
+    summary = clipboard.summary()
+    assert summary["write"]["count"] == summary["read"]["count"] == LATENCY_SAMPLES + 1
+
+
+@pytest.mark.skipif(bool(os.environ.get("DISPLAY")), reason="needs a computer without a display")
+def test_tk_without_display():
+    with pytest.raises(OSError):
+        TkClipboard()
@@ -0,0 +1,22 @@
+import pytest
+
+import Color_Compiler
+from simulated_backend import SimulatedBackend
+
+COLORS = ["ff0000", "00ff00", "0000ff", "123456"]
+
+
+def test_only_is_checked_before_importing(tmp_path, capsys):
+    path = tmp_path / "logo-Hex.txt"
+    path.write_text("\n".join(COLORS), encoding="UTF-8")
+
+    with pytest.raises(SystemExit):
+        Color_Compiler.main(["import", str(path), "--only", "2", "5", "0"])
+    assert "5, 0 not between 1 and 4" in capsys.readouterr().err
+
+
+def test_hexinsert_rejects_missing_colors():
+    backend = SimulatedBackend("color_picker")
+    with pytest.raises(ValueError):
+        Color_Compiler.hexinsert(COLORS, 0.1, backend, backend.layout, only=[1, 4])
+    assert backend.time() == 0  # Nothing was done in the game
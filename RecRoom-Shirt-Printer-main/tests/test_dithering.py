@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+import Encoding
+from color_lookup import METRICS, nearest_indices
+from dithering import METHODS, ordered_dither, threshold_map
+
+
+def random_photo(seed: int, width: int = 67, height: int = 45) -> Image:
+    return Image.fromarray(np.random.default_rng(seed).integers(0, 256, (height, width, 3), dtype=np.uint8))
+
+
+@pytest.mark.parametrize("method", METHODS)
+def test_threshold_map(method):
+    thresholds = threshold_map(method)
+    assert -0.5 < thresholds.min() < thresholds.max() < 0.5
+    assert len(np.unique(thresholds)) == thresholds.size
+
+
+@pytest.mark.parametrize("metric", METRICS)
+def test_no_strength_is_the_closest_color(metric):
+    img = random_photo(0)
+    pixels = np.asarray(img).reshape(-1, 3)
+    expected = Encoding.PALETTE_COLORS[nearest_indices(pixels, Encoding.PALETTE_COLORS, metric)]
+
+    dithered = ordered_dither(img, Encoding.DEFAULT_PALETTE.rgb, strength=0, metric=metric)
+    assert np.array_equal(np.asarray(dithered).reshape(-1, 3), expected)
+    if metric == "rgb":
+        # The same colors the encoder maps off-palette pixels to
+        assert np.array_equal(Encoding.palette_indices(dithered), Encoding.palette_indices(img))
+
+
+@pytest.mark.parametrize("method", METHODS)
+def test_only_palette_colors(method):
+    palette = [(0, 0, 0), (255, 255, 255), (200, 30, 30)]
+    dithered = np.asarray(ordered_dither(random_photo(1), palette, method))
+    assert set(map(tuple, dithered.reshape(-1, 3).tolist())) <= set(palette)
+
+
+def test_gray_becomes_a_pattern():
+    # Halfway between black and white, half the pixels become white
+    dithered = np.asarray(ordered_dither(Image.new("RGB", (32, 32), (128, 128, 128)), [(0, 0, 0), (255, 255, 255)],
+                                         "bayer4", strength=2))
+    assert 0.4 < (dithered[..., 0] == 255).mean() < 0.6
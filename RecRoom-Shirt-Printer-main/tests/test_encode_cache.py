@@ -0,0 +1,88 @@
+import os
+import threading
+
+from PIL import Image
+
+from encode_cache import EncodeCache
+
+
+def test_hit_and_miss(tmp_path):
+    cache = EncodeCache(tmp_path)
+    img = Image.new("RGB", (4, 3), (1, 2, 3))
+    key = cache.key(img, dither=0)
+
+    assert cache.get_strings(key) is None
+    cache.put_strings(key, ["10!", "2#"])
+    cache.put_image(key, img)
+    assert cache.get_strings(key) == ["10!", "2#"]
+    assert cache.get_image(key).tobytes() == img.tobytes()
+    assert cache.key(img, dither=1) != key
+    assert cache.stats()["hits"] == 2 and cache.stats()["misses"] == 1
+
+    # A new cache (e.g. the next start of the program) finds the stored entries
+    assert EncodeCache(tmp_path).get_strings(key) == ["10!", "2#"]
+
+
+def test_hits_dont_write_the_index(tmp_path):
+    cache = EncodeCache(tmp_path)
+    cache.put_strings("a", ["1!"])
+    written = os.stat(cache.index_path).st_mtime_ns
+    os.utime(cache.index_path, ns=(0, 0))
+
+    assert cache.get_strings("a") == ["1!"]
+    assert cache.get_strings("b") is None
+    assert os.stat(cache.index_path).st_mtime_ns == 0 != written
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_unreadable_entry_is_a_miss(tmp_path):
+    cache = EncodeCache(tmp_path)
+    cache.put_image("a", Image.new("RGB", (2, 2)))
+    cache.put_strings("b", ["1!"])
+    (tmp_path / "a.png").write_bytes(b"not a png")
+    (tmp_path / "b.txt").write_bytes(b"\xff\xfe\xfa")
+
+    assert cache.get_image("a") is None
+    assert cache.get_strings("b") is None
+    assert cache.stats() == {"hits": 0, "misses": 2, "entries": 0, "size": 0}
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = EncodeCache(tmp_path, max_size=25)
+    cache.put_strings("a", ["x" * 10])
+    cache.put_strings("b", ["x" * 10])
+    cache.get_strings("a")
+    cache.put_strings("c", ["x" * 10])
+
+    assert cache.get_strings("b") is None
+    assert cache.get_strings("a") and cache.get_strings("c")
+    assert not (tmp_path / "b.txt").exists()
+
+
+def test_shared_between_threads(tmp_path):
+    cache = EncodeCache(tmp_path, max_size=2000)
+
+    def work(thread: int) -> None:
+        for num in range(40):
+            cache.put_strings(f"{thread}-{num}", [str(num) * 20])
+            cache.get_strings(f"{thread}-{num // 2}")
+
+    threads = [threading.Thread(target=work, args=(thread,)) for thread in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = cache.stats()
+    assert stats["size"] <= 2000
+    assert stats["entries"] == len(list(tmp_path.glob("*.txt")))
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_keeps_entries_of_other_processes(tmp_path):
+    first, second = EncodeCache(tmp_path), EncodeCache(tmp_path)
+    first.put_strings("a", ["1!"])
+    second.put_strings("b", ["2#"])
+    first.put_strings("c", ["3$"])
+
+    assert EncodeCache(tmp_path).stats()["entries"] == 3
@@ -0,0 +1,145 @@
+"""
+Round trips of the encoder: every image that is encoded has to decode into the same pixels.
+The images are random (seeded, so a failure can be reproduced) palette images with runs of every length and rows
+that repeat the one above.
+"""
+import numpy as np
+import pytest
+from PIL import Image
+
+import Encoding
+from palette import Palette
+from scan_order import ORDERS, previous_line, scan_permutation
+
+SEEDS = range(4)
+SIZES = ((1, 1), (1, 37), (53, 1), (37, 23), (96, 70))
+BAND_SIZES = (1, 7, 64, 1000)
+
+
+def random_image(seed: int, width: int, height: int, colors: np.ndarray = Encoding.PALETTE_COLORS) -> Image:
+    """
+    :return: An image in `colors` with short and long runs; some rows repeat the one above
+    """
+    rng = np.random.default_rng(seed)
+    used = rng.choice(len(colors), size=min(len(colors), 6), replace=False)
+    indices = np.empty((height, width), dtype=np.intp)
+    for y in range(height):
+        if y and rng.random() < 0.3:
+            indices[y] = indices[y - 1]
+            continue
+        lengths = rng.geometric(rng.choice((0.9, 0.3, 0.02)), size=width)
+        indices[y] = np.repeat(rng.choice(used, size=width), lengths)[:width]
+    return Image.fromarray(colors[indices].astype(np.uint8))
+
+
+def assert_round_trip(img: Image, img_data, **options) -> None:
+    decoded = Encoding.decode(img_data, img.width, **options)
+    assert decoded.size == img.size
+    assert np.array_equal(np.asarray(decoded), np.asarray(img.convert("RGB")))
+    assert Encoding.verify(img, img_data, **options) == 0
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+@pytest.mark.parametrize("width, height", SIZES)
+@pytest.mark.parametrize("order", ORDERS)
+@pytest.mark.parametrize("row_delta", (False, True))
+@pytest.mark.parametrize("split_runs", (False, True))
+def test_round_trip(seed, width, height, order, row_delta, split_runs):
+    img = random_image(seed, width, height)
+    img_data = Encoding.encode(img, dither_=False, split_runs=split_runs, row_delta=row_delta, order=order)
+
+    assert all(0 < len(string) <= Encoding.MaxStringLength for string in img_data)
+    if split_runs:
+        assert all(len(string) == Encoding.MaxStringLength for string in img_data[:-1])
+    assert_round_trip(img, img_data, order=order)
+
+
+@pytest.mark.parametrize("vertical_print, order", ((False, "row"), (True, "column")))
+def test_vertical_print(vertical_print, order):
+    img = random_image(0, 41, 29)
+    img_data = Encoding.encode(img, vertical_print, dither_=False)
+
+    assert img_data == Encoding.encode(img, dither_=False, order=order)
+    assert_round_trip(img, img_data, vertical_print=vertical_print)
+
+
+@pytest.mark.parametrize("order", ORDERS)
+@pytest.mark.parametrize("band_size", BAND_SIZES)
+@pytest.mark.parametrize("row_delta", (False, True))
+def test_band_sizes(order, band_size, row_delta):
+    # The strings can't depend on how many lines are read at once
+    img = random_image(1, 45, 38)
+    img_data = list(Encoding.iter_encode(img, order=order, band_size=band_size, row_delta=row_delta))
+
+    assert img_data == Encoding.encode(img, dither_=False, row_delta=row_delta, order=order)
+    assert_round_trip(img, img_data, order=order)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+@pytest.mark.parametrize("order", ORDERS)
+def test_custom_palette(seed, order):
+    palette = Palette([(255, 0, 0), (0, 255, 0), (0, 0, 255), (255, 255, 255), (20, 20, 20)])
+    img = random_image(seed, 33, 27, palette.colors)
+    img_data = Encoding.encode(img, dither_=False, row_delta=True, order=order, palette=palette)
+
+    assert set("".join(img_data)) <= set("0123456789`" + "".join(palette.symbols))
+    assert_round_trip(img, img_data, order=order, palette=palette)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+@pytest.mark.parametrize("width, height", SIZES)
+def test_legacy_matches_numpy(seed, width, height):
+    img = random_image(seed, width, height)
+    assert Encoding.encode(img, dither_=False, legacy=True) == Encoding.encode(img, dither_=False)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_legacy_matches_numpy_vertical(seed):
+    # The legacy encoder reads the pixels at (y, x) when printing vertically, so only square images work with it
+    img = random_image(seed, 31, 31)
+    assert (Encoding.encode(img, vertical_print=True, dither_=False, legacy=True)
+            == Encoding.encode(img, vertical_print=True, dither_=False))
+
+
+@pytest.mark.parametrize("order", ORDERS)
+def test_row_delta_has_fewer_strings(order):
+    # Every line repeats the first one, so v2 only needs the first line and copy runs, in every order
+    img = random_image(2, 200, 1).resize((200, 100), Image.NEAREST)
+    img = img.transpose(Image.TRANSPOSE) if order == "column" else img
+    report = Encoding.compare_formats(img, order=order)
+    assert report["row_delta"]["strings"] == 1
+    assert report["strings_saved"] > 0
+
+    img_data = Encoding.encode(img, dither_=False, row_delta=True, order=order)
+    assert_round_trip(img, img_data, order=order)
+
+
+@pytest.mark.parametrize("order", ORDERS)
+@pytest.mark.parametrize("width, height", ((1, 1), (7, 1), (1, 7), (21, 19)))
+def test_previous_line(order, width, height):
+    earlier = previous_line(width, height, order)
+    positions = np.asarray(scan_permutation(width, height, order))
+    ys, xs = np.divmod(positions, width)
+
+    first_line = xs == 0 if order == "column" else ys == 0
+    assert (earlier[first_line] == -1).all()
+    assert (earlier[~first_line] < np.flatnonzero(~first_line)).all()  # Printed before the pixel
+    above = positions[earlier[~first_line]]
+    assert (above == (positions[~first_line] - (1 if order == "column" else width))).all()
+
+
+def test_decode_rejects_corrupted_data():
+    img_data = Encoding.encode(random_image(0, 37, 23), dither_=False)
+    with pytest.raises(ValueError):
+        Encoding.decode(img_data, 36)
+    with pytest.raises(ValueError):
+        Encoding.decode(img_data + ["12"], 37)
+    with pytest.raises(ValueError):
+        Encoding.decode(["12☃"], 12)  # Not a color symbol
+    with pytest.raises(ValueError):
+        Encoding.decode(["12`"], 12)  # A copy in the first line
+
+
+@pytest.mark.parametrize("strings, lists", ((0, 0), (1, 1), (63, 1), (64, 1), (65, 2), (640, 10), (641, 11)))
+def test_count_lists(strings, lists):
+    assert Encoding.count_lists(strings) == lists
@@ -0,0 +1,55 @@
+import threading
+import time
+
+from focus_monitor import FocusMonitor, get_monitor
+
+
+class RealClock:
+    """
+    Just enough of a backend on the real clock for the thread of the monitor
+    """
+    realtime = True
+
+    def __init__(self):
+        self.title = "Rec Room"
+
+    def active_window_title(self) -> str:
+        return self.title
+
+    def time(self) -> float:
+        return time.perf_counter()
+
+
+def monitor_threads() -> int:
+    return sum(thread.name == "focus monitor" for thread in threading.enumerate())
+
+
+def test_thread_runs_while_held():
+    backend = RealClock()
+    monitor = FocusMonitor(backend=backend, interval=0.01)
+    with monitor:
+        with monitor:
+            assert monitor_threads() == 1
+        assert monitor_threads() == 1  # Still held once
+
+        backend.title = "Desktop"
+        time.sleep(0.1)
+        assert not monitor.focused.is_set() and monitor.losses == 1
+    assert monitor_threads() == 0
+    monitor.release()  # One release too many doesn't matter
+    assert monitor_threads() == 0
+
+
+def test_shared_monitor_starts_no_thread():
+    backend = RealClock()
+    monitor = get_monitor("Rec Room", backend)
+    assert monitor is get_monitor("Rec Room", backend)
+    assert monitor.wait() == 0.0
+    assert monitor_threads() == 0
+
+    monitor.hold()
+    try:
+        assert monitor_threads() == 1
+    finally:
+        monitor.release()
+    assert monitor_threads() == 0
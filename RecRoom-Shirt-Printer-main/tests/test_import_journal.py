@@ -0,0 +1,70 @@
+import json
+
+from import_journal import ImportJournal, checksum, job_hash
+
+STRINGS = [f"{num}!{num * 7}#" for num in range(10)]
+
+
+def journal_up_to(path, index: int, method: str = "variable") -> ImportJournal:
+    journal = ImportJournal(method, path)
+    for num, string in journal.pending(STRINGS):
+        journal.record(num, string)
+        if num == index:
+            break
+    return journal
+
+
+def test_resumes_after_the_last_recorded_string(tmp_path):
+    path = tmp_path / "journal.json"
+    journal_up_to(path, 3)
+
+    entry = json.loads(path.read_text(encoding="UTF-8"))
+    assert entry["index"] == 3 and entry["checksum"] == checksum(STRINGS[3])
+    assert entry["job"] == job_hash(STRINGS[:4], "variable")
+    assert list(ImportJournal("variable", path).pending(STRINGS, resume=True)) == list(enumerate(STRINGS))[4:]
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_resumed_journal_goes_on(tmp_path):
+    path = tmp_path / "journal.json"
+    journal_up_to(path, 3)
+
+    journal = ImportJournal("variable", path)
+    for num, string in journal.pending(STRINGS, resume=True):
+        journal.record(num, string)
+        if num == 6:
+            break
+    assert list(ImportJournal("variable", path).pending(STRINGS, resume=True)) == list(enumerate(STRINGS))[7:]
+
+
+def test_other_strings_start_from_the_beginning(tmp_path):
+    path = tmp_path / "journal.json"
+    journal_up_to(path, 3)
+    changed = STRINGS[:2] + ["0!"] + STRINGS[3:]
+
+    assert list(ImportJournal("variable", path).pending(changed, resume=True)) == list(enumerate(changed))
+    assert list(ImportJournal("list_create", path).pending(STRINGS, resume=True)) == list(enumerate(STRINGS))
+    assert list(ImportJournal("variable", tmp_path / "none.json").pending(STRINGS, True)) == list(enumerate(STRINGS))
+    # Without `resume` the journal isn't read at all
+    assert list(ImportJournal("variable", path).pending(STRINGS)) == list(enumerate(STRINGS))
+
+
+def test_broken_journal_starts_from_the_beginning(tmp_path):
+    path = tmp_path / "journal.json"
+    path.write_text("{not json", encoding="UTF-8")
+    assert list(ImportJournal("variable", path).pending(STRINGS, resume=True)) == list(enumerate(STRINGS))
+
+
+def test_pending_reads_only_as_far_as_needed(tmp_path):
+    path = tmp_path / "journal.json"
+    journal_up_to(path, 3)
+    read = []
+
+    def strings():
+        for string in STRINGS:
+            read.append(string)
+            yield string
+
+    pending = ImportJournal("variable", path).pending(strings(), resume=True)
+    assert next(pending) == (4, STRINGS[4])
+    assert len(read) == 5
@@ -0,0 +1,110 @@
+"""
+The importers against `simulated_backend.SimulatedBackend`, a Rec Room on a simulated clock
+"""
+from pathlib import Path
+
+import random
+
+import pytest
+
+import Color_Compiler
+import Importing
+import List_Create_Importing
+import job_history
+from simulated_backend import SimulatedBackend, sample_strings
+
+# Lost inputs on the way to the game; the importers have to notice them and try again
+FLAKY = dict(drop_click_rate=0.1, paste_fail_rate=0.15, copy_fail_rate=0.1, verify_clipboard=True)
+
+
+@pytest.fixture(autouse=True)
+def in_repo(monkeypatch, tmp_path):
+    # The "Done" button template is found relative to the working directory
+    monkeypatch.chdir(Path(__file__).resolve().parent.parent)
+    # The estimates before an import read the history, don't create one in the repo
+    history = job_history.JobHistory(tmp_path / "history.sqlite")
+    monkeypatch.setattr(job_history, "_default_history", history)
+    yield
+    history.close()
+
+
+def import_variable(backend, img_data, **options):
+    return Importing.copy_into_rr_variable(img_data, 0.3, ask_for_coords_calibration=False, ask_to_continue=False,
+                                           backend=backend, layout=backend.layout, record_session=False,
+                                           trace_path=None, **options)
+
+
+def import_list_create(backend, img_data, **options):
+    return List_Create_Importing.copy_to_recroom(img_data, 0.3, backend=backend, layout=backend.layout,
+                                                 record_session=False, trace_path=None, **options)
+
+
+def test_resume_tells_the_entry_before_asking(tmp_path, monkeypatch, capsys):
+    img_data = sample_strings(70)
+    journal = str(tmp_path / "journal.json")
+    backend = SimulatedBackend("list_create")
+    import_list_create(backend, img_data[:66], ask_to_continue=False, journal_path=journal)
+    capsys.readouterr()
+
+    asked = []
+    monkeypatch.setattr("builtins.input", lambda prompt: asked.append(capsys.readouterr().out) or "y")
+    result = import_list_create(backend, img_data, ask_to_continue=True, journal_path=journal, resume=True)
+
+    assert "Select entry #3 of List Create #2" in asked[0]
+    assert result["imported"] == 4
+    assert backend.received == img_data
+
+
+@pytest.mark.parametrize("seed", range(2))
+def test_variable_gets_every_string(seed):
+    img_data = sample_strings(30, seed)
+    backend = SimulatedBackend("variable", seed=seed, **FLAKY)
+    result = import_variable(backend, img_data, journal_path=None)
+
+    assert backend.received == img_data
+    assert result["imported"] == len(img_data)
+    assert result["retries"] > 0 and backend.stats["failed_pastes"] > 0
+
+
+def test_list_create_gets_every_string():
+    img_data = sample_strings(20, 1)
+    backend = SimulatedBackend("list_create", seed=1, **FLAKY)
+    result = import_list_create(backend, img_data, ask_to_continue=False, journal_path=None)
+
+    assert backend.received == img_data
+    assert result["retries"] > 0
+
+
+def test_color_picker_gets_every_color():
+    rng = random.Random(2)
+    colors = ["%06x" % rng.getrandbits(24) for _ in range(15)]
+    backend = SimulatedBackend("color_picker", seed=2, drop_click_rate=0.1)
+    results = Color_Compiler.hexinsert(colors, 0.1, backend, backend.layout)
+
+    assert backend.received == colors
+    assert all(result["verified"] for result in results)
+    assert backend.stats["dropped_clicks"] > 0
+
+
+def test_variable_resumes_from_the_journal(tmp_path, monkeypatch):
+    img_data = sample_strings(30, 3)
+    journal = str(tmp_path / "journal.json")
+    backend = SimulatedBackend("variable", seed=3, **FLAKY)
+
+    # The import crashes while copying string #12
+    copy = backend.copy
+
+    def crashing_copy(text):
+        if text == img_data[12]:
+            raise KeyboardInterrupt
+        return copy(text)
+
+    monkeypatch.setattr(backend, "copy", crashing_copy)
+    with pytest.raises(KeyboardInterrupt):
+        import_variable(backend, img_data, journal_path=journal)
+    assert backend.received == img_data[:12]
+
+    monkeypatch.setattr(backend, "copy", copy)
+    result = import_variable(backend, img_data, journal_path=journal, resume=True)
+    assert result["imported"] == 18
+    assert backend.received == img_data
@@ -0,0 +1,71 @@
+import threading
+
+import pytest
+
+import job_history
+from job_history import DEFAULT_IMPORT_MODELS, MIN_SESSIONS, JobHistory
+
+
+@pytest.fixture
+def history(tmp_path):
+    history = JobHistory(tmp_path / "history.sqlite")
+    yield history
+    history.close()
+
+
+def test_default_plan(history):
+    plans = history.plan(100, 5000)
+    a, b, c = DEFAULT_IMPORT_MODELS["variable"]
+    assert plans["variable"]["import_seconds"] == pytest.approx(100 * (a + b * job_history.DEFAULT_DELAY))
+    assert plans["variable"]["calibrated_from"] == 0
+    assert plans["list_create"]["print_seconds"] == pytest.approx(5000 * job_history.DEFAULT_PRINT_SECONDS_PER_CHAR)
+
+
+def test_import_model_is_fitted(history):
+    a, b, c = 0.4, 2.0, 3.0
+    sessions = [(100, 0.3, 5), (250, 0.5, 0), (80, 0.2, 12), (400, 0.4, 7), (150, 0.6, 3)]
+    for strings, delay, retries in sessions[:MIN_SESSIONS - 1]:
+        history.record("import", strings * (a + b * delay) + retries * c * delay, method="list_create",
+                       strings=strings, delay=delay, retries=retries)
+    assert history.import_model("list_create")[2] == 0  # Not enough sessions yet
+
+    for strings, delay, retries in sessions[MIN_SESSIONS - 1:]:
+        history.record("import", strings * (a + b * delay) + retries * c * delay, method="list_create",
+                       strings=strings, delay=delay, retries=retries)
+    model, retry_rate, fitted_on = history.import_model("list_create")
+    assert model == pytest.approx((a, b, c))
+    assert retry_rate == pytest.approx(27 / 980)
+    assert fitted_on == len(sessions)
+    assert history.plan(10, 400, delay=0.5)["list_create"]["import_seconds"] == pytest.approx(
+        10 * (a + b * 0.5) + 10 * 27 / 980 * c * 0.5)
+    # The other method still uses the default
+    assert history.plan(10, 400)["variable"]["calibrated_from"] == 0
+
+
+def test_stopped_prints_are_not_a_rate(history):
+    for _ in range(MIN_SESSIONS):
+        history.record("print", 10.0, chars=100)
+        history.record("print", 1.0, chars=100, completed=False)
+    assert history.rate("print", "chars", 1.0) == (pytest.approx(0.1), MIN_SESSIONS)
+
+
+def test_record_from_threads(history):
+    def work():
+        for _ in range(20):
+            history.record("encode", 1.0, pixels=1000)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(history.sessions("encode")) == 80
+
+
+def test_record_never_fails(history, monkeypatch, capsys):
+    monkeypatch.setattr(job_history, "_default_history", history)
+    assert job_history.record("import", 5.0, method="variable", strings=10) is not None
+
+    history.close()
+    assert job_history.record("import", 5.0, method="variable", strings=10) is None
+    assert "Could not save the session" in capsys.readouterr().out
@@ -0,0 +1,131 @@
+"""
+Waiting for the Rec Room UI instead of sleeping. Every step of an import does an action (a click, a paste) and then
+checks a small part of the screen, many times a second, until the game shows the state the action leads to, e.g.
+"input field open", "text pasted" or "field closed". The import goes on as soon as the game is ready; the timeout is
+only reached when it isn't, and then the importers retry like they always did.
+
+    UIState - the states one part of the UI can be in, as checks of the screen, and the state it was last seen in
+
+The checks run on a `backend.Backend`, see `Importing.variable_field` and `List_Create_Importing.entry_states`.
+"""
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+from backend import Backend, Box, Coords
+from common import color_fraction, color_mask
+
+CHECK_RADIUS: int = 4  # Half the size of the squares that are checked for changes
+STEP_TIMEOUT: float = 1.0  # Seconds to wait for the game to react to a step
+
+# States
+CLOSED = "closed"
+OPEN = "open"
+FOCUSED = "focused"
+PASTED = "pasted"
+SAVED = "saved"
+EMPTY = "empty"
+
+Check = Callable[[], bool]
+
+
+def region(point: Coords, radius: int = CHECK_RADIUS) -> Box:
+    """
+    :return: The square of pixels around `point`
+    """
+    return point[0] - radius, point[1] - radius, point[0] + radius + 1, point[1] + radius + 1
+
+
+def screen_changed(backend: Backend, box: Box) -> Check:
+    """
+    :return: A check that is true once `box` looks different from how it looks now
+    """
+    before = np.asarray(backend.grab(box), dtype=np.int16)
+    return lambda: bool((np.abs(np.asarray(backend.grab(box), dtype=np.int16) - before).max(axis=-1) > 8).mean()
+                        >= 0.1)
+
+
+def shows_color(backend: Backend, box: Box, color: Tuple[int, int, int], tolerance: int = 30) -> Check:
+    """
+    :return: A check that is true when most pixels of `box` are `color` (± `tolerance` per channel)
+    """
+    return lambda: color_fraction(backend.grab(box), color, tolerance) >= 0.5
+
+
+def turns_color(backend: Backend, box: Box, color: Tuple[int, int, int], tolerance: int = 30) -> Check:
+    """
+    :return: A check that is true once most pixels of `box` are `color` (± `tolerance` per channel) and `box` looks
+        different from how it looks now, so a color close to the one it shows already doesn't count - unless that is
+        `color` (± 8) already, then there is no change to wait for
+    """
+    shows = shows_color(backend, box, color, tolerance)
+    if color_fraction(backend.grab(box), color, 8) >= 0.5:
+        return shows
+    changed = screen_changed(backend, box)
+    return lambda: changed() and shows()
+
+
+def has_color(backend: Backend, box: Box, *colors: Tuple[int, int, int], tolerance: int = 30) -> Check:
+    """
+    :return: A check that is true when any pixel of `box` is one of `colors` (± `tolerance` per channel)
+    """
+    def check() -> bool:
+        pixels = np.asarray(backend.grab(box))
+        return any(color_mask(pixels, color, tolerance).any() for color in colors)
+    return check
+
+
+def negate(check: Check) -> Check:
+    return lambda: not check()
+
+
+class UIState:
+    """
+    One part of the UI (a text field, a List Create entry). `checks` make the check for every state; they are called
+    right before the action of a step, so a check can compare the screen with how it looked before the action.
+    """
+
+    def __init__(self, backend: Backend, checks: Dict[str, Callable[[], Check]], state: str = CLOSED,
+                 timeout: float = STEP_TIMEOUT):
+        """
+        :param backend: Mouse, keyboard and screen
+        :param checks: {state: function that makes the check of that state}
+        :param state: The state it is in now
+        :param timeout: Seconds a step waits for its state by default
+        """
+        self.backend = backend
+        self.checks = checks
+        self.state = state
+        self.timeout = timeout
+        self.waits: List[Tuple[str, float, bool]] = []  # (state, seconds waited, reached) of every step
+
+    def step(self, action: Callable[[], None], state: str, timeout: float = None) -> bool:
+        """
+        Do `action` and wait until the screen shows `state`
+
+        :param action: Clicks or presses something
+        :param state: The state the action leads to
+        :param timeout: Seconds to wait at most, defaults to `self.timeout`
+        :return: True as soon as the state is reached, False if it wasn't reached in time
+        """
+        check = self.checks[state]()
+        action()
+        started = self.backend.time()
+        reached = self.backend.wait_until(check, self.timeout if timeout is None else timeout)
+        self.waits.append((state, self.backend.time() - started, reached))
+        if reached:
+            self.state = state
+        return reached
+
+    def wait_for(self, state: str, timeout: float = None) -> bool:
+        """
+        Wait until the screen shows `state`, without doing anything
+        """
+        return self.step(lambda: None, state, timeout)
+
+    @property
+    def timeouts(self) -> int:
+        """
+        :return: Steps that ran into their timeout
+        """
+        return sum(not reached for _, _, reached in self.waits)